@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from unique_matcher.matcher.aio import AsyncMatcher, pytesseract
+from unique_matcher.matcher.exceptions import CannotFindUniqueItemError
+from unique_matcher.matcher.result import LocatedItem
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Uses shell scripts")
+
+
+@pytest.fixture()
+def fake_tesseract(tmp_path, monkeypatch):
+    """Replace tesseract with a shell script."""
+
+    def _create(script):
+        path = tmp_path / "tesseract"
+        path.write_text(f"#!/bin/sh\n{script}\n")
+        path.chmod(0o755)
+        monkeypatch.setattr(pytesseract.pytesseract, "tesseract_cmd", str(path))
+
+        return path
+
+    return _create
+
+
+def test_read_title(matcher, fake_tesseract):
+    fake_tesseract("cat > /dev/null\nprintf 'HEADHUNTER\\nLEATHER BELT\\n'")
+    located_item = LocatedItem(
+        image=Image.new("RGB", (100, 200)),
+        title=Image.new("RGB", (300, 40)),
+        identified=True,
+    )
+
+    async def _run():
+        async with AsyncMatcher(matcher) as async_matcher:
+            return await async_matcher.read_title(located_item)
+
+    cropped_item = asyncio.run(_run())
+
+    assert cropped_item.base == "Leather Belt"
+    assert cropped_item.name == "Headhunter"
+    assert cropped_item.identified
+
+
+def test_ocr_error(matcher, fake_tesseract):
+    fake_tesseract("echo 'Failed' >&2\nexit 1")
+
+    async def _run():
+        async with AsyncMatcher(matcher) as async_matcher:
+            return await async_matcher.ocr(b"")
+
+    with pytest.raises(pytesseract.TesseractError):
+        asyncio.run(_run())
+
+
+def test_ocr_timeout_kills_tesseract(matcher, fake_tesseract, tmp_path):
+    pid_file = tmp_path / "pid"
+    fake_tesseract(f"echo $$ > {pid_file}\nexec sleep 30")
+
+    async def _run():
+        async with AsyncMatcher(matcher) as async_matcher, asyncio.timeout(0.5):
+            return await async_matcher.ocr(b"")
+
+    t_start = time.perf_counter()
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(_run())
+
+    assert time.perf_counter() - t_start < 5
+
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_find_item_errors(matcher):
+    async def _run(screenshot):
+        async with AsyncMatcher(matcher, timeout=10) as async_matcher:
+            return await async_matcher.find_item(screenshot)
+
+    with pytest.raises(ValueError, match="Cannot decode"):
+        asyncio.run(_run(b"not an image"))
+
+    with pytest.raises(CannotFindUniqueItemError):
+        asyncio.run(_run(np.zeros((1080, 1920, 3), dtype=np.uint8)))
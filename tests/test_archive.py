@@ -0,0 +1,94 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from unique_matcher.gui.archive import ScreenshotArchive
+from unique_matcher.matcher.items import Item
+from unique_matcher.matcher.result import LocatedItem, MatchedBy, MatchResult
+
+BOX = (800, 290, 1250, 530)
+
+
+@pytest.fixture()
+def screenshot(tmp_path):
+    file = tmp_path / "queue" / "1.png"
+    file.parent.mkdir()
+
+    rng = np.random.default_rng(0)
+    cv2.imwrite(str(file), rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8))
+
+    return file
+
+
+def _archive(tmp_path, **kwargs):
+    return ScreenshotArchive(done_dir=tmp_path / "done", error_dir=tmp_path / "errors", **kwargs)
+
+
+def _located():
+    return LocatedItem(
+        image=None,  # type: ignore[arg-type]
+        title=None,  # type: ignore[arg-type]
+        identified=True,
+        start=(920, 306),
+        end=(1200, 306),
+    )
+
+
+def _result():
+    item = Item(name="Headhunter", file="Headhunter", alias="", icon="", base="Leather Belt")
+
+    return MatchResult(
+        item=item,
+        loc=(0, 0),
+        identified=True,
+        matched_by=MatchedBy.TEMPLATE_MATCH,
+        min_val=0.05,
+    )
+
+
+def test_full_mode_moves_the_screenshot(tmp_path, screenshot):
+    target = _archive(tmp_path).done(screenshot, _result(), _located(), BOX)
+
+    assert target == tmp_path / "done" / "Headhunter" / "1.png"
+    assert target.exists()
+    assert not screenshot.exists()
+
+
+def test_crop_mode(tmp_path, screenshot):
+    original = cv2.imread(str(screenshot))
+    target = _archive(tmp_path, mode="crop").done(screenshot, _result(), _located(), BOX)
+
+    assert not screenshot.exists()
+    assert np.array_equal(cv2.imread(str(target)), original[290:530, 800:1250])
+
+    sidecar = json.loads(target.with_suffix(".json").read_text())
+
+    assert sidecar["size"] == [1920, 1080]
+    assert sidecar["box"] == list(BOX)
+    assert sidecar["guides"]["start"] == [920, 306]
+    assert sidecar["result"]["item"] == "Headhunter"
+
+
+def test_crop_mode_errors(tmp_path, screenshot):
+    archive = _archive(tmp_path, mode="crop")
+    target = archive.error(screenshot, ValueError("broken"), _located(), BOX)
+
+    # Full frames are kept for errors by default
+    assert target == tmp_path / "errors" / "1.png"
+    assert cv2.imread(str(target)).shape == (1080, 1920, 3)
+
+    archive.keep_error_frames = False
+    target.rename(screenshot)
+    target = archive.error(screenshot, ValueError("broken"), _located(), BOX)
+
+    assert cv2.imread(str(target)).shape == (240, 450, 3)
+    assert json.loads(target.with_suffix(".json").read_text())["error"] == "ValueError"
+
+
+def test_crop_mode_without_location(tmp_path, screenshot):
+    target = _archive(tmp_path, mode="crop").done(screenshot, _result())
+
+    assert target == tmp_path / "done" / "Headhunter" / "1.png"
+    assert not target.with_suffix(".json").exists()
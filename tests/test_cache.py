@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from unique_matcher.matcher import cache, utils
+from unique_matcher.matcher.cache import StageCache, content_key
+from unique_matcher.matcher.result import CroppedItemInfo, LocatedItem
+
+
+def _cropped_item() -> tuple[LocatedItem, CroppedItemInfo]:
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 255, (208, 104, 3), dtype=np.uint8))
+    title = Image.new("RGB", (200, 40))
+    located = LocatedItem(
+        image=image,
+        title=title,
+        identified=True,
+        start=(900, 300),
+        end=(1100, 300),
+    )
+    cropped = CroppedItemInfo(image=image, base="Leather Belt", name="Headhunter", identified=True)
+
+    return located, cropped
+
+
+def test_content_key():
+    screen = np.zeros((10, 20, 3), dtype=np.uint8)
+
+    assert content_key(screen) == content_key(screen.copy())
+    assert content_key(screen) != content_key(screen.reshape((20, 10, 3)))
+    assert content_key(b"abc") == content_key(bytearray(b"abc"))
+    assert content_key(b"abc") != content_key(b"abd")
+
+
+def test_roundtrip(tmp_path):
+    stage_cache = StageCache(tmp_path)
+    located, cropped = _cropped_item()
+
+    assert stage_cache.get("ab" * 32) is None
+
+    stage_cache.put("ab" * 32, located, cropped)
+    cached = stage_cache.get("ab" * 32)
+
+    assert cached is not None
+    assert cached.base == cropped.base
+    assert cached.name == cropped.name
+    assert cached.identified == cropped.identified
+    assert np.array_equal(np.asarray(cached.image), np.asarray(cropped.image))
+    assert (stage_cache.hits, stage_cache.misses) == (1, 1)
+
+
+def test_fingerprint_change_invalidates(tmp_path, monkeypatch):
+    located, cropped = _cropped_item()
+    StageCache(tmp_path).put("ab" * 32, located, cropped)
+
+    monkeypatch.setattr(cache, "fingerprint", lambda: "0" * cache.FINGERPRINT_LENGTH)
+
+    assert StageCache(tmp_path).get("ab" * 32) is None
+
+
+def test_find_unique_skips_stages(tmp_path, matcher, monkeypatch):
+    stage_cache = StageCache(tmp_path)
+    located, cropped = _cropped_item()
+
+    # Not an image at all, so it cannot be decoded without the cache
+    screenshot = b"cached screenshot"
+    stage_cache.put(content_key(screenshot), located, cropped)
+
+    monkeypatch.setattr(matcher, "cache", stage_cache)
+    cropped_item = matcher.find_unique(screenshot)
+
+    assert cropped_item.name == "Headhunter"
+    assert list(matcher.timings) == ["cache"]
+
+
+def test_find_unique_reads_file_once(tmp_path, matcher, monkeypatch):
+    screenshot = tmp_path / "screenshot.png"
+    screenshot.write_bytes(b"not cached")
+    sources = []
+
+    def load_screenshot(source):
+        sources.append(source)
+        msg = "not decoded"
+        raise ValueError(msg)
+
+    monkeypatch.setattr(matcher, "cache", StageCache(tmp_path / "cache"))
+    monkeypatch.setattr(utils, "load_screenshot", load_screenshot)
+
+    with pytest.raises(ValueError, match="not decoded"):
+        matcher.find_unique(screenshot)
+
+    # Decoded from the bytes read for the cache key
+    assert sources == [b"not cached"]
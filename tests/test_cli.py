@@ -0,0 +1,79 @@
+import os
+from unittest import mock
+
+from unique_matcher import cli
+
+
+def test_expand_inputs(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "1.png").touch()
+    (tmp_path / "a" / "2.txt").touch()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "b" / "3.png").touch()
+    (tmp_path / "4.jpg").touch()
+
+    assert cli.expand_inputs([str(tmp_path / "a"), str(tmp_path / "4.jpg")]) == [
+        tmp_path / "a" / "1.png",
+        tmp_path / "4.jpg",
+    ]
+    assert cli.expand_inputs([str(tmp_path / "**" / "*.png")]) == [
+        tmp_path / "a" / "1.png",
+        tmp_path / "b" / "3.png",
+    ]
+    assert cli.expand_inputs([str(tmp_path / "missing")]) == []
+
+
+def test_parser():
+    args = cli.build_parser().parse_args(["match", "-j", "4", "--unordered", "a", "b"])
+
+    assert args.inputs == ["a", "b"]
+    assert args.jobs == 4
+    assert not args.ordered
+
+
+def test_run_match_streams(tmp_path):
+    screenshots = [tmp_path / "a.png", tmp_path / "b.png"]
+
+    with (
+        mock.patch.object(cli, "Matcher"),
+        mock.patch.object(
+            cli,
+            "match_one",
+            side_effect=lambda screenshot, _: {"screenshot": screenshot},
+        ) as match_one,
+    ):
+        records = cli.run_match(screenshots)
+
+        # Every record is yielded as soon as its screenshot is done
+        assert next(records) == {"screenshot": screenshots[0]}
+        assert match_one.call_count == 1
+        assert next(records) == {"screenshot": screenshots[1]}
+
+
+def test_write_records_broken_pipe(tmp_path, monkeypatch):
+    with (tmp_path / "stdout").open("wb") as fwrite:
+        stdout = mock.Mock()
+        stdout.write.side_effect = BrokenPipeError
+        stdout.fileno.return_value = fwrite.fileno()
+        monkeypatch.setattr("sys.stdout", stdout)
+
+        assert not cli.write_records([{"item": "Headhunter"}])
+
+        # stdout now points to devnull
+        os.write(fwrite.fileno(), b"lost")
+
+    assert (tmp_path / "stdout").read_bytes() == b""
+
+
+def test_parser_batch_size():
+    assert cli.build_parser().parse_args(["match", "a"]).batch_size == 1
+    assert cli.build_parser().parse_args(["match", "--batch-size", "32", "a"]).batch_size == 32
+
+
+def test_check_match_options():
+    parser = cli.build_parser()
+
+    assert cli.check_match_options(parser.parse_args(["match", "--batch-size", "8", "a"])) is None
+    assert cli.check_match_options(
+        parser.parse_args(["match", "-j", "2", "--batch-size", "8", "a"]),
+    )
@@ -0,0 +1,50 @@
+import numpy as np
+from PIL import Image
+
+from unique_matcher.matcher import utils
+from unique_matcher.matcher.context import ScreenshotContext, crop_by_dimensions
+from unique_matcher.matcher.result import CroppedItemInfo
+
+
+def _image() -> Image.Image:
+    rng = np.random.default_rng(0)
+
+    return Image.fromarray(rng.integers(0, 255, (208, 104, 3), dtype=np.uint8))
+
+
+def _items(item_loader, width: int, height: int) -> list:
+    return [item for item in item_loader if (item.width, item.height) == (width, height)][:2]
+
+
+def test_context_shared_by_size(item_loader):
+    context = ScreenshotContext(_image())
+    small1, small2 = _items(item_loader, 1, 1)
+    large = _items(item_loader, 2, 4)[0]
+
+    assert context.crop(small1) is context.crop(small2)
+    assert context.gray(small1) is context.gray(small2)
+    assert context.hist(small1) is context.hist(small2)
+    assert context.crop(large) is not context.crop(small1)
+
+    assert context.crop(small1).size == (52, 52)
+    assert context.crop(large) is context.image
+
+
+def test_context_values(item_loader):
+    image = _image()
+    context = ScreenshotContext(image)
+
+    for item in [*_items(item_loader, 1, 3), *_items(item_loader, 2, 2)]:
+        crop = crop_by_dimensions(image, item)
+
+        assert np.array_equal(np.asarray(context.crop(item)), np.asarray(crop))
+        assert np.array_equal(context.gray(item), utils.image_to_cv(crop))
+        assert np.array_equal(context.hist(item), utils.calc_normalized_histogram(crop))
+
+
+def test_cropped_item_context():
+    image = _image()
+    cropped_item = CroppedItemInfo(image=image, base="Leather Belt", name="", identified=False)
+
+    assert cropped_item.context.image is image
+    assert "context" not in repr(cropped_item)
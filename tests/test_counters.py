@@ -0,0 +1,108 @@
+import pytest
+
+from unique_matcher.gui.counters import FileCounters
+
+
+@pytest.fixture()
+def dirs(tmp_path):
+    queue = tmp_path / "queue"
+    done = tmp_path / "done"
+    errors = tmp_path / "errors"
+
+    for folder in [queue, done, errors]:
+        folder.mkdir()
+
+    return queue, done, errors
+
+
+@pytest.fixture()
+def counters(tmp_path, dirs):
+    queue, done, errors = dirs
+
+    return FileCounters(
+        tmp_path / "counters.json",
+        queue_dir=queue,
+        done_dir=done,
+        error_dir=errors,
+    )
+
+
+def test_load_scans_without_index(counters, dirs):
+    queue, done, errors = dirs
+
+    (queue / "1.png").touch()
+    (queue / "2.png").touch()
+    (done / "Item").mkdir()
+    (done / "Item" / "3.png").touch()
+    (done / "Item" / "3.json").touch()
+    (done / "4.png").touch()
+    (errors / "5.png").touch()
+    (errors / "5.json").touch()
+
+    counters.load()
+
+    assert counters["queue"] == 2
+    assert counters["done"] == 2
+    assert counters["errors"] == 1
+    assert counters.index_file.exists()
+
+
+def test_load_from_index(counters, dirs):
+    queue, _, _ = dirs
+
+    counters.index_file.write_text('{"queue": 0, "done": 10, "errors": 3}')
+    (queue / "1.png").touch()
+
+    counters.load()
+
+    # The index is trusted, the disk is not touched
+    assert counters["queue"] == 0
+    assert counters["done"] == 10
+    assert counters["errors"] == 3
+
+
+def test_move(counters):
+    counters.load()
+    counters.set("queue", 2)
+
+    counters.move("queue", "done")
+    counters.move("queue", "errors")
+
+    assert counters["queue"] == 0
+    assert counters["done"] == 1
+    assert counters["errors"] == 1
+
+    # Restored from the index
+    restored = FileCounters(counters.index_file)
+    restored.load()
+
+    assert restored["done"] == 1
+    assert restored["errors"] == 1
+
+
+def test_remove(counters):
+    counters.load()
+    counters.set("queue", 1)
+
+    counters.remove("queue")
+    counters.remove("queue")
+
+    assert counters["queue"] == 0
+    assert counters["done"] == 0
+
+    restored = FileCounters(counters.index_file)
+    restored.load()
+
+    assert restored["queue"] == 0
+
+
+def test_rescan_repairs_drift(counters, dirs):
+    _, done, _ = dirs
+
+    counters.load()
+    counters.move("queue", "done")
+
+    assert not (done / "1.png").exists()
+    assert counters.rescan()
+    assert counters["done"] == 0
+    assert not counters.rescan()
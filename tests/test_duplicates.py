@@ -0,0 +1,139 @@
+import configparser
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from unique_matcher.gui.duplicates import (
+    DuplicateDetector,
+    ScreenshotFingerprint,
+    create_detector,
+    fingerprint_screenshot,
+)
+from unique_matcher.matcher.result import LocatedItem
+
+
+def _screenshot(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (27, 48, 3), dtype=np.uint8)
+
+    return cv2.resize(small, (1920, 1080), interpolation=cv2.INTER_LINEAR)
+
+
+def _fingerprint(sha256: str, dhash: int, timestamp: float) -> ScreenshotFingerprint:
+    return ScreenshotFingerprint(sha256=sha256, dhash=dhash, timestamp=timestamp)
+
+
+def test_fingerprint_survives_recompression(tmp_path):
+    screen = _screenshot(0)
+    cv2.imwrite(str(tmp_path / "a.png"), screen)
+    cv2.imwrite(str(tmp_path / "b.jpg"), screen, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    cv2.imwrite(str(tmp_path / "c.png"), _screenshot(1))
+
+    a = fingerprint_screenshot(tmp_path / "a.png", perceptual=True)
+    b = fingerprint_screenshot(tmp_path / "b.jpg", perceptual=True)
+    c = fingerprint_screenshot(tmp_path / "c.png", perceptual=True)
+
+    assert a.sha256 != b.sha256
+    assert a.matches(b, max_distance=4)
+    assert not a.matches(c, max_distance=4)
+
+
+def test_detector_window():
+    detector = DuplicateDetector(window=10, perceptual=True, max_distance=0)
+
+    assert detector.check("a.png", _fingerprint("a", 1, 100)) is None
+
+    original = detector.check("b.png", _fingerprint("b", 1, 105))
+    assert original is not None
+    assert original.file == "a.png"
+
+    # Same content, but taken too late
+    assert detector.check("c.png", _fingerprint("a", 1, 111)) is None
+
+    # Submitted again after an error
+    assert detector.check("a.png", _fingerprint("a", 1, 100)) is None
+
+
+def test_detector_resolve_and_expire():
+    detector = DuplicateDetector(window=10, max_distance=0)
+    detector.check("a.png", _fingerprint("a", 1, 100))
+
+    original = detector.check("b.png", _fingerprint("a", 1, 101))
+    assert original is not None
+    assert not original.done
+
+    detector.resolve("a.png", None)
+    assert original.done
+    assert original.result is None
+
+    # Done originals out of the window are forgotten
+    detector.check("c.png", _fingerprint("c", 2, 200))
+    assert detector.check("d.png", _fingerprint("a", 1, 105)) is None
+
+
+def test_detector_resolve_located():
+    detector = DuplicateDetector(window=10)
+    detector.check("a.png", _fingerprint("a", 1, 100))
+    original = detector.check("b.png", _fingerprint("a", 1, 101))
+    assert original is not None
+
+    located = LocatedItem(
+        image=Image.new("RGB", (104, 208)),
+        title=Image.new("RGB", (200, 40)),
+        identified=True,
+        start=(900, 300),
+        end=(1100, 300),
+    )
+    detector.resolve("a.png", None, located, (780, 284, 1200, 524))
+
+    # The duplicate is archived like the original
+    assert original.located is located
+    assert original.box == (780, 284, 1200, 524)
+
+
+def test_detector_exact_by_default():
+    detector = DuplicateDetector(window=10)
+    detector.check("a.png", _fingerprint("a", 1, 100))
+
+    # Looks the same, but the content differs
+    assert detector.check("b.png", _fingerprint("b", 1, 101)) is None
+
+    original = detector.check("c.png", _fingerprint("a", 2, 102))
+    assert original is not None
+    assert original.file == "a.png"
+
+
+def test_create_detector():
+    cfg = configparser.ConfigParser()
+    cfg.read_string("[duplicates]\nenabled = no\nwindow = 3\naction = delete\n")
+
+    detector = create_detector(cfg)
+
+    assert not detector.enabled
+    assert detector.window == 3
+    assert detector.action == "record"
+    assert not detector.perceptual
+
+    assert create_detector(configparser.ConfigParser()).enabled
+
+
+def test_fingerprint_timestamp(tmp_path):
+    cv2.imwrite(str(tmp_path / "a.png"), _screenshot(0))
+    os.utime(tmp_path / "a.png", (1000, 1000))
+
+    assert fingerprint_screenshot(tmp_path / "a.png").timestamp == 1000
+
+
+def test_fingerprint_without_dhash(tmp_path):
+    # Not decoded at all
+    (tmp_path / "a.png").write_bytes(b"not an image")
+    (tmp_path / "b.png").write_bytes(b"not an image")
+
+    a = fingerprint_screenshot(tmp_path / "a.png")
+    b = fingerprint_screenshot(tmp_path / "b.png")
+
+    assert a.dhash is None
+    assert a.matches(b, max_distance=4)
+    assert not a.matches(_fingerprint("c", 0, 0), max_distance=4)
@@ -0,0 +1,66 @@
+import pytest
+
+from unique_matcher.gui.history import ResultHistory
+from unique_matcher.matcher.items import Item
+from unique_matcher.matcher.result import MatchedBy, MatchResult
+
+
+@pytest.fixture()
+def history(tmp_path):
+    history = ResultHistory(tmp_path / "history.sqlite3")
+    yield history
+    history.close()
+
+
+def _result(name):
+    item = Item(name=name, file=name, alias="", icon="", base="Base")
+
+    return MatchResult(
+        item=item,
+        loc=(0, 0),
+        identified=False,
+        matched_by=MatchedBy.TEMPLATE_MATCH,
+        min_val=0.5,
+    )
+
+
+def test_record_and_aggregate(history):
+    history.start_session("2024-01-01-00-00-00")
+    history.start_session("2024-01-02-00-00-00")
+    history.start_session("2024-01-03-00-00-00")
+
+    for name in ["A", "B", "B"]:
+        history.record("2024-01-01-00-00-00", _result(name))
+
+    for name in ["A", "A", "C"]:
+        history.record("2024-01-02-00-00-00", _result(name))
+
+    history.record("2024-01-03-00-00-00", _result("C"))
+
+    assert history.aggregate(["2024-01-01-00-00-00"]) == [
+        {"item": "B", "count": 2},
+        {"item": "A", "count": 1},
+    ]
+    # Ties are ordered by the item name
+    assert history.aggregate(first="2024-01-02-00-00-00") == [
+        {"item": "A", "count": 2},
+        {"item": "C", "count": 2},
+    ]
+    assert history.aggregate(last="2024-01-02-00-00-00")[0] == {"item": "A", "count": 3}
+    assert history.aggregate([]) == []
+
+
+def test_import_and_export_csv(history, tmp_path):
+    legacy = tmp_path / "2023-01-01-00-00-00.csv"
+    legacy.write_text("item,count\nA,3\nB,1\n", encoding="utf-8")
+
+    history.import_csv(legacy)
+    history.import_csv(legacy)  # Skipped, already imported
+
+    assert history.has_session("2023-01-01-00-00-00")
+    assert history.aggregate() == [{"item": "A", "count": 3}, {"item": "B", "count": 1}]
+
+    output = tmp_path / "export.csv"
+    history.export_csv(output, ["2023-01-01-00-00-00"])
+
+    assert output.read_text(encoding="utf-8").splitlines() == ["item,count", "A,3", "B,1"]
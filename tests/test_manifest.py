@@ -0,0 +1,51 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from unique_matcher.gui import manifest
+from unique_matcher.gui.manifest import ResultManifest
+
+
+@pytest.fixture()
+def result_dir(tmp_path):
+    result_dir = tmp_path / "results"
+    result_dir.mkdir()
+
+    (result_dir / "a.csv").write_text("item,count\nA,2\nB,1\n", encoding="utf-8")
+    (result_dir / "b.csv").write_text("item,count\n", encoding="utf-8")
+    (result_dir / "a.journal").write_text("A\n", encoding="utf-8")
+
+    return result_dir
+
+
+def test_scan(tmp_path, result_dir):
+    results = ResultManifest(tmp_path / "manifest.json", result_dir)
+    entries = results.scan()
+
+    assert sorted(entries) == ["a.csv", "b.csv"]
+    assert entries["a.csv"].rows == 2
+    assert entries["a.csv"].total == 3
+    assert entries["a.csv"].counts == {"A": 2, "B": 1}
+    assert entries["b.csv"].is_empty()
+
+
+def test_scan_only_reads_changed_files(tmp_path, result_dir):
+    ResultManifest(tmp_path / "manifest.json", result_dir).scan()
+
+    # Loaded from the disk, nothing changed
+    results = ResultManifest(tmp_path / "manifest.json", result_dir)
+
+    with patch.object(manifest, "read_result_csv") as read_mock:
+        results.scan()
+
+    read_mock.assert_not_called()
+
+    (result_dir / "b.csv").write_text("item,count\nC,5\n", encoding="utf-8")
+    os.utime(result_dir / "b.csv", ns=(0, 0))
+    (result_dir / "a.csv").unlink()
+
+    entries = results.scan()
+
+    assert sorted(entries) == ["b.csv"]
+    assert entries["b.csv"].counts == {"C": 5}
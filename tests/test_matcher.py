@@ -1,11 +1,18 @@
 import os
 import pathlib
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest import mock
 
+import numpy as np
 import pytest
 from loguru import logger
 
+from unique_matcher.gui.archive import SIDECAR_SUFFIX
+from unique_matcher.matcher.exceptions import CannotFindUniqueItemError
+from unique_matcher.matcher.result import CroppedItemInfo
+
 DATA_DIR = pathlib.Path(__file__).parent / "test_data"
 
 # Enable logging by running pytest with the `-s` switch
@@ -20,7 +27,7 @@ logger.add(
 
 def _load_data(folder: pathlib.Path) -> list[tuple[str, list[Path]]]:
     return [
-        (item_dir.name, list(item_dir.iterdir()))
+        (item_dir.name, [path for path in item_dir.iterdir() if path.suffix != SIDECAR_SUFFIX])
         for item_dir in sorted(folder.iterdir())
         if item_dir.is_dir()
     ]
@@ -56,3 +63,53 @@ def test_get_base_name(base, screenshots, matcher):
     for screenshot in screenshots:
         cropped_item = matcher.find_unique(screenshot)
         assert cropped_item.base == base
+
+
+def test_find_items_errors_in_order(matcher):
+    """Test that find_items yields errors per screenshot in input order."""
+    screenshots = [
+        b"not an image",
+        np.zeros((1080, 1920, 3), dtype=np.uint8),
+        b"also not an image",
+    ]
+
+    results = list(matcher.find_items(screenshots, batch_size=2))
+
+    assert [res.screenshot for res in results] == screenshots
+    assert all(res.result is None for res in results)
+    assert isinstance(results[0].error, ValueError)
+    assert isinstance(results[1].error, CannotFindUniqueItemError)
+    assert isinstance(results[2].error, ValueError)
+    assert "guides" in results[1].timings
+
+
+def test_find_items_template_errors(matcher, item_loader):
+    """Test that find_items yields errors when an item's templates cannot be built."""
+    base = next(item.base for item in item_loader if len(item_loader.filter_base(item.base)) > 1)
+
+    cropped_item = CroppedItemInfo(
+        image=matcher.profiles.base.guides["one_line"],
+        base=base,
+        name="",
+        identified=False,
+    )
+
+    with (
+        mock.patch.object(matcher, "find_unique", return_value=cropped_item),
+        mock.patch.object(matcher.template_bank, "get", side_effect=OSError("broken icon")),
+    ):
+        results = list(matcher.find_items(["a", "b"]))
+
+    assert [res.screenshot for res in results] == ["a", "b"]
+    assert all(res.result is None for res in results)
+    assert all(isinstance(res.error, OSError) for res in results)
+
+
+def test_debug_info_per_thread(matcher):
+    matcher.debug_info["unique_image"] = "main"
+
+    with ThreadPoolExecutor(1) as executor:
+        assert executor.submit(lambda: dict(matcher.debug_info)).result() == {}
+
+    assert matcher.debug_info["unique_image"] == "main"
+    matcher.debug_info.clear()
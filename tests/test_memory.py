@@ -0,0 +1,39 @@
+from unique_matcher.matcher.memory import MemoryProfiler, current_rss
+
+
+def test_samples_every_interval():
+    profiler = MemoryProfiler(interval=3)
+    profiler.start()
+
+    for _ in range(7):
+        profiler.step()
+
+    profiler.stop()
+
+    # Start, after 3 and 6 screenshots, and the rest at the end
+    assert [sample.processed for sample in profiler.samples] == [0, 3, 6, 7]
+
+
+def test_reports_growth():
+    leak = []
+    profiler = MemoryProfiler(interval=2)
+    profiler.start()
+
+    for _ in range(10):
+        leak.append(bytearray(100_000))
+        profiler.step()
+
+    profiler.stop()
+
+    report = profiler.report()
+
+    assert report["processed"] == 10
+    assert report["growth_per_screenshot"]["traced"] > 90_000
+    assert any(__file__ in stat["location"] for stat in report["top_allocations"])
+    assert "Growth per screenshot" in profiler.format_report()
+
+
+def test_current_rss():
+    rss = current_rss()
+
+    assert rss is None or rss > 0
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from unique_matcher.matcher import metrics
+from unique_matcher.matcher.exceptions import CannotFindUniqueItemError
+
+
+@pytest.fixture()
+def registry(monkeypatch):
+    """Enable the global registry and start from zero."""
+    monkeypatch.setattr(metrics.REGISTRY, "enabled", True)
+    metrics.REGISTRY.reset()
+
+    yield metrics.REGISTRY
+
+    metrics.REGISTRY.reset()
+
+
+def test_disabled():
+    registry = metrics.Registry()
+    counter = registry.counter("test_total", "Test.")
+    histogram = registry.histogram("test_seconds", "Test.")
+
+    counter.inc()
+    histogram.observe(0.1)
+
+    assert counter.value() == 0
+    assert histogram.count() == 0
+
+
+def test_prometheus_format():
+    registry = metrics.Registry(enabled=True)
+    counter = registry.counter("test_total", "Test counter.")
+    histogram = registry.histogram("test_seconds", "Test histogram.", (0.1, 1.0))
+
+    counter.inc(error='Bad "one"')
+    counter.inc(2, error='Bad "one"')
+    histogram.observe(0.05, stage="load")
+    histogram.observe(0.5, stage="load")
+    histogram.observe(5, stage="load")
+
+    assert counter.value(error='Bad "one"') == 3
+    assert registry.to_prometheus().splitlines() == [
+        "# HELP test_total Test counter.",
+        "# TYPE test_total counter",
+        'test_total{error="Bad \\"one\\""} 3',
+        "# HELP test_seconds Test histogram.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="load",le="0.1"} 1',
+        'test_seconds_bucket{stage="load",le="1"} 2',
+        'test_seconds_bucket{stage="load",le="+Inf"} 3',
+        'test_seconds_sum{stage="load"} 5.55',
+        'test_seconds_count{stage="load"} 3',
+    ]
+
+
+def test_write_textfile(tmp_path):
+    registry = metrics.Registry(enabled=True)
+    registry.counter("test_total", "Test.").inc()
+
+    registry.start_writer(tmp_path / "metrics.prom", interval=60)
+    registry.stop_writer()
+
+    assert "test_total 1" in (tmp_path / "metrics.prom").read_text()
+
+
+def test_matcher_failures(registry, matcher):
+    with pytest.raises(CannotFindUniqueItemError):
+        matcher.find_item(np.zeros((1080, 1920, 3), dtype=np.uint8))
+
+    results = list(matcher.find_items([b"not an image"]))
+
+    assert isinstance(results[0].error, ValueError)
+    assert metrics.SCREENSHOTS.value(status="error") == 2
+    assert metrics.FAILURES.value(error="CannotFindUniqueItemError") == 1
+    assert metrics.FAILURES.value(error="ValueError") == 1
+    assert metrics.STAGE_SECONDS.count(stage="guides") == 1
+
+    snapshot = registry.snapshot()
+
+    assert snapshot["unique_matcher_failures_total"]["type"] == "counter"
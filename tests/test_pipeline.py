@@ -0,0 +1,91 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+from unique_matcher.matcher.exceptions import CannotFindUniqueItemError
+from unique_matcher.matcher.pipeline import Pipeline
+
+
+class SlowMatcher:
+    """Stand-in for Matcher, sleeps randomly in every stage."""
+
+    def _sleep(self):
+        time.sleep(random.uniform(0, 0.005))  # noqa: S311
+
+    def decode_screen(self, screenshot):
+        self._sleep()
+
+        if screenshot < 0:
+            raise ValueError
+
+        return screenshot, screenshot
+
+    def locate_unique(self, source_screen, screen):
+        self._sleep()
+        return source_screen + screen
+
+    def read_title(self, located_item):
+        self._sleep()
+        return located_item
+
+    def match_cropped(self, cropped_item, timings, counts):
+        self._sleep()
+        timings["match"] = 0.0
+        counts["candidates"] = 1
+        return cropped_item // 2
+
+
+def test_pipeline_run_ordered():
+    pipeline = Pipeline(SlowMatcher(), workers={"guides": 3, "title": 2})
+    screenshots = [*range(30), -1, *range(30, 40)]
+
+    results = list(pipeline.run(screenshots))
+
+    assert [res.screenshot for res in results] == screenshots
+    assert [res.result for res in results] == [*range(30), None, *range(30, 40)]
+    assert isinstance(results[30].error, ValueError)
+    assert set(results[0].timings) == {"load", "guides", "title", "match"}
+    assert results[0].counts == {"candidates": 1}
+
+    metrics = pipeline.metrics()
+
+    assert metrics["load"]["processed"] == len(screenshots)
+    assert metrics["load"]["errors"] == 1
+    assert metrics["match"]["processed"] == len(screenshots) - 1
+    assert metrics["guides"]["workers"] == 3
+    assert all(stage["depth"] == 0 for stage in metrics.values())
+
+
+def test_pipeline_run_unordered():
+    pipeline = Pipeline(SlowMatcher(), workers={"title": 4})
+
+    results = list(pipeline.run(range(20), ordered=False))
+
+    assert sorted(res.result for res in results) == list(range(20))
+
+
+def test_pipeline_submit():
+    pipeline = Pipeline(SlowMatcher(), queue_size=1)
+
+    submitted = [i for i in range(10) if pipeline.submit(i, block=False)]
+    pipeline.close()
+
+    assert submitted
+    assert sorted(res.result for res in pipeline.completed()) == submitted
+
+
+def test_pipeline_unknown_stage():
+    with pytest.raises(ValueError, match="ocr"):
+        Pipeline(SlowMatcher(), workers={"ocr": 2})
+
+
+def test_pipeline_matcher_errors(matcher):
+    pipeline = Pipeline(matcher)
+    screenshots = [b"not an image", np.zeros((1080, 1920, 3), dtype=np.uint8)]
+
+    results = list(pipeline.run(screenshots))
+
+    assert isinstance(results[0].error, ValueError)
+    assert isinstance(results[1].error, CannotFindUniqueItemError)
@@ -0,0 +1,136 @@
+import dataclasses
+import os
+
+import numpy as np
+from PIL import Image
+
+from unique_matcher.constants import ITEM_MAX_SIZE
+from unique_matcher.matcher import profiles as profiles_module
+from unique_matcher.matcher.profiles import GUIDES, ProfileLoader, scale_template_set
+from unique_matcher.matcher.result import ItemTemplate
+from unique_matcher.matcher.templates import (
+    TemplateBank,
+    TemplateSet,
+    build_template_set,
+)
+
+
+def _template_set(item) -> TemplateSet:
+    image = Image.new("RGBA", (100, 200), (200, 100, 50, 255))
+    mask = np.zeros((200, 100), dtype=np.uint8)
+    mask[50:150, 25:75] = 255
+
+    return build_template_set(item, [ItemTemplate(image=image, sockets=0)], mask)
+
+
+def test_scaled_guides(tmp_path):
+    profiles = ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path)
+    profile = profiles.get(1440)
+
+    assert profile.item_max_size == (
+        round(ITEM_MAX_SIZE[0] * 4 / 3),
+        round(ITEM_MAX_SIZE[1] * 4 / 3),
+    )
+    assert profile.px(6) == 8
+
+    for name, guide in profile.guides.items():
+        base = profiles.base.guides[name]
+        assert guide.size == (round(base.width * 4 / 3), round(base.height * 4 / 3))
+
+    assert profiles.get(1440) is profile
+    assert len(list(tmp_path.glob("*/*.png"))) == len(GUIDES)
+
+
+def test_scaled_guides_cached(tmp_path):
+    ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path).get(720)
+
+    cached = next(tmp_path.glob("*/*.png"))
+    Image.new("L", (3, 3)).save(cached)
+
+    profile = ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path).get(720)
+
+    assert (3, 3) in [guide.size for guide in profile.guides.values()]
+
+
+def test_scaled_guides_without_sources(tmp_path, monkeypatch):
+    # Frozen builds don't ship the sources
+    sources = (*profiles_module.PROFILE_SOURCES, tmp_path / "missing.py")
+    monkeypatch.setattr(profiles_module, "PROFILE_SOURCES", sources)
+
+    profile = ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path).get(900)
+
+    assert profile.height == 900
+    assert len(list(tmp_path.glob("*-900p/*.png"))) == len(GUIDES)
+
+
+def test_unsupported_height(tmp_path):
+    profiles = ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path)
+
+    assert profiles.get(1081) is profiles.base
+    assert profiles.get(1080) is profiles.base
+    assert not list(tmp_path.iterdir())
+
+
+def test_scaled_template_set(item_loader):
+    item = next(iter(item_loader))
+    template_set = scale_template_set(_template_set(item), 0.5)
+
+    assert template_set.variants[0].image.size == (50, 100)
+    assert template_set.grays[0].shape == (100, 50)
+    assert template_set.mask is not None
+    assert template_set.mask.shape == (100, 50)
+    assert set(np.unique(template_set.mask)) == {0, 255}
+
+
+def test_profile_template_bank(tmp_path, item_loader):
+    profiles = ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path)
+    item = next(iter(item_loader))
+
+    assert profiles.get(720).template_bank.get(item).grays[0].shape == (133, 67)
+    assert profiles.base.template_bank.hits + profiles.base.template_bank.misses == 1
+
+
+def test_profile_template_bank_cached(tmp_path, item_loader):
+    icon = tmp_path / "icon.png"
+    icon.touch()
+    os.utime(icon, (1000, 1000))
+    item = dataclasses.replace(next(iter(item_loader)), icon=icon)
+
+    ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path).get(720).template_bank.get(item)
+    assert len(list(tmp_path.glob("*/items/*.npz"))) == 1
+
+    profiles = ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path)
+    template_set = profiles.get(720).template_bank.get(item)
+
+    # Loaded from the disk, not scaled again
+    assert profiles.base.template_bank.misses == 0
+    assert template_set.variants[0].image.size == (67, 133)
+    assert template_set.mask is not None
+    assert template_set.masked is not None
+    assert template_set.variants[0].sockets == 0
+
+    # A newer icon makes the entry stale
+    mtime = next(tmp_path.glob("*/items/*.npz")).stat().st_mtime + 10
+    os.utime(icon, (mtime, mtime))
+    profiles = ProfileLoader(TemplateBank(_template_set), cache_dir=tmp_path)
+    profiles.get(720).template_bank.get(item)
+
+    assert profiles.base.template_bank.misses == 1
+
+
+def test_locate_in_crop(matcher):
+    # Crop of an unidentified item tooltip in a 1440p screenshot
+    guides = matcher.profiles.get(1440).guides
+    rng = np.random.default_rng(0)
+    crop = Image.fromarray(rng.integers(0, 60, (400, 700, 3), dtype=np.uint8))
+    crop.paste(guides["one_line"], (300, 100))
+    crop.paste(guides["one_line_end"], (500, 100))
+    source_screen = np.asarray(crop)[:, :, ::-1].copy()
+
+    source_screen, screen = matcher.decode_screen(source_screen, 1440)
+    located_item = matcher.locate_unique(source_screen, screen, 1440)
+
+    assert located_item.height == 1440
+    assert located_item.start == (300, 100)
+    assert located_item.end == (500, 100)
+    assert not located_item.identified
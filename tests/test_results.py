@@ -0,0 +1,68 @@
+import csv
+
+import pytest
+
+from unique_matcher.gui import results
+from unique_matcher.gui.results import ResultFile
+from unique_matcher.matcher.items import Item
+from unique_matcher.matcher.result import MatchedBy, MatchResult
+
+
+@pytest.fixture()
+def result_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(results, "RESULT_DIR", tmp_path)
+
+    return tmp_path
+
+
+def _result(name):
+    item = Item(name=name, file=name, alias="", icon="", base="Base")
+
+    return MatchResult(
+        item=item,
+        loc=(0, 0),
+        identified=None,
+        matched_by=MatchedBy.ITEM_NAME,
+        min_val=0,
+    )
+
+
+def _read_csv(file):
+    with file.open(newline="", encoding="utf-8") as fread:
+        return [(row["item"], int(row["count"])) for row in csv.DictReader(fread)]
+
+
+def test_add_and_close(result_dir):
+    result_file = ResultFile()
+    result_file.new()
+
+    for name in ["A", "B", "B"]:
+        result_file.add(_result(name))
+
+    # Not materialised until flushed
+    assert _read_csv(result_file.current_file) == []
+
+    result_file.close()
+
+    assert _read_csv(result_file.current_file) == [("B", 2), ("A", 1)]
+    assert list(result_dir.glob("*.journal")) == []
+
+
+@pytest.mark.usefixtures("result_dir")
+def test_flush():
+    result_file = ResultFile()
+    result_file.new()
+    result_file.add(_result("A"))
+    result_file.flush()
+
+    assert _read_csv(result_file.current_file) == [("A", 1)]
+
+
+def test_recover(result_dir):
+    (result_dir / "2024-01-01-00-00-00.csv").write_text("item,count\n")
+    (result_dir / "2024-01-01-00-00-00.journal").write_text("A\nB\nA\nincomple")
+
+    ResultFile()
+
+    assert _read_csv(result_dir / "2024-01-01-00-00-00.csv") == [("A", 2), ("B", 1)]
+    assert not (result_dir / "2024-01-01-00-00-00.journal").exists()
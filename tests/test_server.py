@@ -0,0 +1,89 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from unique_matcher.server import MatcherPool, MatchHTTPServer
+
+
+@pytest.fixture(scope="module")
+def server(matcher):
+    server = MatchHTTPServer(MatcherPool(1, factory=lambda: matcher), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    server.shutdown()
+    server.server_close()
+
+
+def _request(url, data=None, headers=None):
+    req = urllib.request.Request(url, data=data, headers=headers or {})  # noqa: S310
+
+    try:
+        with urllib.request.urlopen(req) as resp:  # noqa: S310
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_health(server):
+    status, data = _request(f"{server}/health")
+
+    assert status == 200
+    assert data["status"] == "ok"
+    assert data["workers"] == 1
+    assert data["idle"] == 1
+
+
+def test_metrics(server):
+    with urllib.request.urlopen(f"{server}/metrics") as resp:  # noqa: S310
+        assert resp.status == 200
+        assert "# TYPE unique_matcher_screenshots_total counter" in resp.read().decode()
+
+
+def test_match_bytes_no_item(server):
+    buf = io.BytesIO()
+    Image.fromarray(np.zeros((1080, 1920, 3), dtype=np.uint8)).save(buf, "PNG")
+
+    status, data = _request(f"{server}/match", buf.getvalue())
+
+    assert status == 422
+    assert data["error"] == "CannotFindUniqueItemError"
+
+
+def test_match_path_not_found(server, tmp_path):
+    body = json.dumps({"path": str(tmp_path / "missing.png")}).encode()
+    status, _ = _request(f"{server}/match", body, {"Content-Type": "application/json"})
+
+    assert status == 404
+
+
+def test_unknown_endpoint(server):
+    status, _ = _request(f"{server}/nope")
+
+    assert status == 404
+
+
+def test_match_invalid_bytes(server):
+    status, data = _request(f"{server}/match", b"not an image")
+
+    assert status == 400
+    assert data["error"] == "Cannot decode screenshot"
+
+
+@pytest.mark.parametrize(
+    ("length", "error"),
+    [("abc", "Invalid Content-Length"), ("-5", "Invalid body size")],
+)
+def test_match_invalid_content_length(server, length, error):
+    status, data = _request(f"{server}/match", b"body", {"Content-Length": length})
+
+    assert status == 400
+    assert data["error"] == error
@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from unique_matcher.matcher import sqdiff
+from unique_matcher.matcher.result import ItemTemplate
+from unique_matcher.matcher.templates import build_template_set
+
+
+def _image(rng: np.random.Generator, size: tuple[int, int]) -> np.ndarray:
+    noise = rng.integers(0, 255, size, dtype=np.uint8)
+
+    return cv2.GaussianBlur(noise, (5, 5), 0)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_sqdiff_normed(seed):
+    rng = np.random.default_rng(seed)
+    screen = _image(rng, (208, 104))
+
+    # uint8 masks are binary, 7 counts as 255
+    mask = np.zeros((180, 90), dtype=np.uint8)
+    mask[20:160, 10:80] = rng.choice([0, 7, 255], (140, 70))
+
+    grays = [
+        cv2.add(screen[10:190, 5:95], rng.integers(0, 30, (180, 90), dtype=np.uint8)),
+        _image(rng, (180, 90)),
+    ]
+    masked = sqdiff.prepare_masked(grays, mask)
+    terms = sqdiff.image_terms(screen, masked)
+
+    for index, gray in enumerate(grays):
+        expected = cv2.matchTemplate(screen, gray, cv2.TM_SQDIFF_NORMED, mask=mask)
+        result = sqdiff.sqdiff_normed(terms, masked, index)
+
+        assert result.shape == expected.shape
+        np.testing.assert_allclose(result, expected, atol=1e-4)
+
+        min_val, _, min_loc, _ = cv2.minMaxLoc(result)
+        expected_min_val, _, expected_min_loc, _ = cv2.minMaxLoc(expected)
+
+        assert min_val == pytest.approx(expected_min_val, abs=1e-5)
+        assert min_loc == expected_min_loc
+
+
+def test_trimmed_templates():
+    rng = np.random.default_rng(3)
+    screen = _image(rng, (208, 104))
+
+    # Transparent margins around the icon
+    mask = np.zeros((180, 90), dtype=np.uint8)
+    mask[40:120, 30:70] = 255
+    gray = cv2.add(screen[20:200, 10:100], rng.integers(0, 30, (180, 90), dtype=np.uint8))
+
+    masked = sqdiff.prepare_masked([gray], mask)
+
+    assert masked.box == (30, 40, 70, 120)
+    assert masked.size == (90, 180)
+    assert masked.weighted[0].shape == masked.mask.shape == (80, 40)
+
+    terms = sqdiff.image_terms(screen, masked)
+    result = sqdiff.sqdiff_normed(terms, masked, 0)
+    expected = cv2.matchTemplate(screen, gray, cv2.TM_SQDIFF_NORMED, mask=mask)
+
+    assert result.shape == expected.shape == (29, 15)
+    np.testing.assert_allclose(result, expected, atol=1e-4)
+    assert cv2.minMaxLoc(result)[2] == cv2.minMaxLoc(expected)[2] == (10, 20)
+
+
+def test_mask_box_empty():
+    assert sqdiff.mask_box(np.zeros((4, 6), dtype=np.uint8)) == (0, 0, 6, 4)
+
+
+def test_sqdiff_normed_black():
+    masked = sqdiff.prepare_masked([np.full((4, 4), 100, dtype=np.uint8)], np.ones((4, 4)))
+    terms = sqdiff.image_terms(np.zeros((8, 8), dtype=np.uint8), masked)
+
+    assert np.all(sqdiff.sqdiff_normed(terms, masked, 0) == 1)
+
+
+def test_check_template_set_masked(matcher, item_loader):
+    rng = np.random.default_rng(0)
+    screen = np.dstack([_image(rng, (208, 104))] * 3)
+    mask = np.zeros((150, 80), dtype=np.uint8)
+    mask[10:140, 5:75] = 255
+
+    variants = [
+        ItemTemplate(
+            image=Image.fromarray(
+                np.dstack([screen[30:180, 10:90], np.full((150, 80), 255, dtype=np.uint8)]),
+            ),
+            sockets=sockets,
+        )
+        for sockets in (1, 2)
+    ]
+    variants[1].image.paste((255, 0, 0, 255), (20, 20, 60, 60))
+
+    item = next(item for item in item_loader if item.width == 2 and item.height == 4)
+    template_set = build_template_set(item, variants, mask)
+
+    result = matcher.check_template_set(Image.fromarray(screen), template_set)
+    expected = cv2.minMaxLoc(
+        cv2.matchTemplate(screen[:, :, 0], template_set.grays[0], cv2.TM_SQDIFF_NORMED, mask=mask),
+    )
+
+    assert result.template is variants[0]
+    assert result.min_val == pytest.approx(expected[0], abs=1e-5)
+    assert result.loc == (10, 30)
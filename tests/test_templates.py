@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from unique_matcher.matcher.templates import TemplateBank, TemplateSet
+
+
+def test_template_bank_lru(item_loader):
+    created = []
+
+    def factory(item):
+        created.append(item.file)
+        return TemplateSet(item=item, variants=[], grays=[], hists=[])
+
+    items = list(item_loader)[:3]
+    bank = TemplateBank(factory, max_size=2)
+
+    assert bank.get(items[0]) is bank.get(items[0])
+    assert created == [items[0].file]
+    assert (bank.hits, bank.misses) == (1, 1)
+
+    bank.get(items[1])
+    bank.get(items[0])  # items[1] is now the least recently used
+    bank.get(items[2])
+
+    assert len(bank) == 2
+
+    bank.get(items[0])
+    bank.get(items[1])
+
+    assert created == [items[0].file, items[1].file, items[2].file, items[1].file]
+
+
+def test_template_bank_concurrent(item_loader):
+    slow, fast = list(item_loader)[:2]
+    started = threading.Event()
+    release = threading.Event()
+    created = []
+
+    def factory(item):
+        created.append(item.file)
+
+        if item is slow:
+            started.set()
+            assert release.wait(5)
+
+        return TemplateSet(item=item, variants=[], grays=[], hists=[])
+
+    bank = TemplateBank(factory)
+
+    with ThreadPoolExecutor(3) as executor:
+        first = executor.submit(bank.get, slow)
+        assert started.wait(5)
+        second = executor.submit(bank.get, slow)
+
+        # Not blocked by the set being created
+        assert executor.submit(bank.get, fast).result(5).item is fast
+
+        release.set()
+
+        assert first.result(5) is second.result(5)
+
+    assert sorted(created) == sorted([slow.file, fast.file])
+    assert (bank.hits, bank.misses) == (1, 2)
+
+
+def test_template_bank_factory_error(item_loader):
+    item = next(iter(item_loader))
+    calls = []
+
+    def factory(item):
+        calls.append(item.file)
+
+        if len(calls) == 1:
+            msg = "broken icon"
+            raise OSError(msg)
+
+        return TemplateSet(item=item, variants=[], grays=[], hists=[])
+
+    bank = TemplateBank(factory)
+
+    with pytest.raises(OSError, match="broken icon"):
+        bank.get(item)
+
+    # Not cached, created again
+    assert bank.get(item).item is item
+    assert len(calls) == 2
@@ -1,7 +1,93 @@
-from unique_matcher.matcher import utils
+import io
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from unique_matcher.matcher import frames, utils
 
 
 def test_normalize_item_name():
     assert utils.normalize_item_name("Bones of Ullr") == "Bones_of_Ullr"
     assert utils.normalize_item_name("Three-step Assault") == "Three-step_Assault"
     assert utils.normalize_item_name("Ungil's Harmony") == "Ungils_Harmony"
+
+
+def test_load_screenshot(tmp_path):
+    screen = np.random.default_rng(0).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    cv2.imwrite(str(tmp_path / "screen.png"), screen)
+    encoded = (tmp_path / "screen.png").read_bytes()
+
+    sources = [
+        tmp_path / "screen.png",
+        str(tmp_path / "screen.png"),
+        encoded,
+        io.BytesIO(encoded),
+        screen,
+        Image.fromarray(screen[:, :, ::-1]),
+    ]
+
+    for source in sources:
+        assert (utils.load_screenshot(source) == screen).all()
+
+    # Arrays are not copied
+    assert utils.load_screenshot(screen) is screen
+
+    with pytest.raises(ValueError, match="Cannot decode"):
+        utils.load_screenshot(b"garbage")
+
+    with pytest.raises(ValueError, match="Expected a uint8"):
+        utils.load_screenshot(np.zeros((10, 10), dtype=np.uint8))
+
+
+def test_load_raw_frame(tmp_path):
+    screen = np.random.default_rng(0).integers(0, 256, (40, 60, 4), dtype=np.uint8)
+    frames.write_raw_frame(tmp_path / "screen.raw", screen)
+
+    loaded = utils.load_screenshot(tmp_path / "screen.raw")
+
+    assert (loaded == screen).all()
+    assert not loaded.flags.writeable
+    assert (utils.load_screenshot((tmp_path / "screen.raw").read_bytes()) == screen).all()
+
+    # RGB with padded rows
+    header = frames.RAW_HEADER.pack(frames.RAW_MAGIC, 60, 40, 200, 2)
+    rows = np.zeros((40, 200), dtype=np.uint8)
+    rows[:, :180] = screen[:, :, 2::-1].reshape((40, 180))
+
+    assert (utils.load_screenshot(header + rows.tobytes()) == screen[:, :, :3]).all()
+
+    with pytest.raises(ValueError, match="too short"):
+        utils.load_screenshot(header + rows.tobytes()[:-100])
+
+
+@pytest.mark.parametrize("channels", [3, 4])
+def test_load_bmp(tmp_path, channels):
+    # Odd width, so the rows are padded
+    screen = np.random.default_rng(0).integers(0, 256, (40, 61, channels), dtype=np.uint8)
+    cv2.imwrite(str(tmp_path / "screen.bmp"), screen)
+
+    loaded = utils.load_screenshot(tmp_path / "screen.bmp")
+
+    assert (loaded == screen).all()
+    assert not loaded.flags.writeable
+
+
+def test_screen_to_gray():
+    screen = np.random.default_rng(0).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    bgra = cv2.cvtColor(screen, cv2.COLOR_BGR2BGRA)
+
+    # Same weighting as cv2.imread + COLOR_RGB2GRAY
+    expected = cv2.cvtColor(screen, cv2.COLOR_RGB2GRAY)
+
+    assert (utils.screen_to_gray(screen) == expected).all()
+    assert (utils.screen_to_gray(bgra) == expected).all()
+
+
+def test_crop_screen():
+    screen = np.random.default_rng(0).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    image = Image.fromarray(screen[:, :, ::-1])
+
+    for box in [(0, 0, 60, 40), (10, 5, 20, 30), (-10, -5, 20, 30), (50, 30, 70, 50)]:
+        assert (np.array(utils.crop_screen(screen, box)) == np.array(image.crop(box))).all()
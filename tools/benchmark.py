@@ -3,9 +3,10 @@ import argparse
 import json
 import math
 import os
+import sys
 import time
-from concurrent.futures import ProcessPoolExecutor
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from datetime import datetime
 from multiprocessing import cpu_count
 from pathlib import Path
@@ -15,17 +16,17 @@ import tabulate
 from loguru import logger
 from rich.console import Console
 from rich.panel import Panel
-from rich.progress import Progress
+from rich.progress import Progress, TaskID
 from rich.table import Table
 from simple_term_menu import TerminalMenu  # type: ignore[import]
 
-from unique_matcher.constants import ROOT_DIR
-from unique_matcher.matcher.exceptions import (
-    CannotFindUniqueItemError,
-    CannotIdentifyUniqueItemError,
-)
-from unique_matcher.matcher.items import Item, ItemLoader
+from unique_matcher.constants import CACHE_DIR, ROOT_DIR
+from unique_matcher.gui.archive import SIDECAR_SUFFIX
+from unique_matcher.matcher.cache import StageCache
+from unique_matcher.matcher.exceptions import BaseUMError
+from unique_matcher.matcher.items import SOCKET_COLORS, Item, ItemLoader
 from unique_matcher.matcher.matcher import Matcher, MatchResult
+from unique_matcher.matcher.memory import MemoryProfiler
 
 logger.remove()
 
@@ -50,17 +51,26 @@ GITHUB_DATASETS = [
     "staticf0xElin",
 ]
 
+# Default number of worker processes
+DEFAULT_JOBS = min(cpu_count(), 8)
 
-@dataclass
-class SuiteResult:
-    """Helper class for storing the result of a single benchmark run."""
+# Matching stages in the order they run (see Matcher.timings)
+STAGES = ["load", "guides", "title", "match", "plugin"]
 
-    data_set: str
-    items: int
-    screenshots: int
-    found: int
-    accuracy: float
-    item_names: set
+# Percentiles of the stage times shown in the summary
+PERCENTILES = [50, 95, 99]
+
+# Default regression limits of --compare:
+# accuracy drop of a data set (percentage points)
+MAX_ACCURACY_DROP = 0.0
+# p95 slowdown of a stage (percent)
+MAX_P95_REGRESSION = 10.0
+
+# p95 changes smaller than this are noise, never a regression (seconds)
+P95_NOISE_FLOOR = 0.002
+
+# min_val changes smaller than this are not reported
+MIN_VAL_TOLERANCE = 1e-4
 
 
 @dataclass
@@ -72,6 +82,8 @@ class CheckResult:
     found: bool
     elapsed: float
     result: MatchResult | None = None
+    stages: dict[str, float] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
 
     def json(self) -> dict:
         return {
@@ -84,59 +96,165 @@ class CheckResult:
             "file": str(self.file),
             "found": self.found,
             "elapsed": self.elapsed,
+            "stages": self.stages,
+            "counts": self.counts,
             "result": {
+                "item": self.result.item.file,
                 "identified": self.result.identified,
                 "matched_by": self.result.matched_by.name,
                 "min_val": self.result.min_val,
                 "hist_val": self.result.hist_val,
-            },
+            }
+            if self.result
+            else None,
         }
 
 
-def _run_one(item: Item, test_set: list[Path]) -> list[CheckResult]:
-    """Run benchmark for one item on a list of screenshots.
+@dataclass
+class SuiteResult:
+    """Helper class for storing the result of a single benchmark run."""
+
+    data_set: str
+    items: int
+    screenshots: int
+    found: int
+    accuracy: float
+    item_names: set
+    results: list[CheckResult] = field(default_factory=list)
+
+
+def stage_percentiles(results: list[CheckResult]) -> dict[str, dict[str, float]]:
+    """Return the percentiles of the time spent in each stage (seconds).
+
+    "total" is the whole find_item call.
+    """
+    return _percentiles([(result.elapsed, result.stages) for result in results])
+
+
+def _percentiles(
+    results: list[tuple[float, dict[str, float]]],
+) -> dict[str, dict[str, float]]:
+    """Return the stage percentiles of (elapsed, stages) pairs, see stage_percentiles."""
+    times: dict[str, list[float]] = {"total": [elapsed for elapsed, _ in results]}
+
+    for _, result_stages in results:
+        for stage, elapsed in result_stages.items():
+            times.setdefault(stage, []).append(elapsed)
+
+    order = [*STAGES, "total"]
+    stages = sorted(times, key=lambda stage: order.index(stage) if stage in order else len(order))
+
+    return {
+        stage: {f"p{q}": float(np.percentile(times[stage], q)) for q in PERCENTILES}
+        for stage in stages
+    }
+
+
+# Matcher of a worker process, created once by the pool initializer
+_matcher: Matcher | None = None
+
+# Directory of the stage cache of the worker Matchers, see --cache
+_cache_dir: Path | None = None
+
+
+def _get_matcher() -> Matcher:
+    """Return the Matcher of this worker process, create it if needed."""
+    global _matcher  # noqa: PLW0603
+
+    if _matcher is None:
+        _matcher = Matcher(cache=StageCache(_cache_dir) if _cache_dir is not None else None)
+
+    return _matcher
+
+
+def _init_worker(cache_dir: Path | None = None) -> None:
+    """Warm up the worker process before it gets any screenshots."""
+    global _cache_dir  # noqa: PLW0603
+
+    _cache_dir = cache_dir
+    _get_matcher()
+
+
+def _check_one(item: Item, screen: Path) -> CheckResult:
+    """Run benchmark for one item in one screenshot.
 
     This must be a function because if it was a class method,
     then ProcessPoolExecutor will not be able to pickle it.
     """
-    results = []
+    matcher = _get_matcher()
+    t_start = time.perf_counter()
+
+    try:
+        result = matcher.find_item(screen)
+    except BaseUMError:
+        return CheckResult(
+            item=item,
+            file=screen,
+            found=False,
+            elapsed=time.perf_counter() - t_start,
+            stages=dict(matcher.timings),
+            counts=dict(matcher.counts),
+        )
+
+    return CheckResult(
+        item=item,
+        file=screen,
+        found=result.item == item,
+        elapsed=time.perf_counter() - t_start,
+        result=result,
+        stages=dict(matcher.timings),
+        counts=dict(matcher.counts),
+    )
 
-    # Matcher is not thread-safe so we need one per worker
-    matcher = Matcher()
 
-    for screen in test_set:
-        t_start = time.perf_counter()
+def estimate_cost(item: Item, item_loader: ItemLoader) -> int:
+    """Estimate how expensive matching a screenshot of an item is.
 
-        try:
-            result = matcher.find_item(screen)
-            t_end = time.perf_counter()
-
-            res = CheckResult(
-                item=item,
-                file=screen,
-                found=result.item == item,
-                elapsed=t_end - t_start,
-                result=result,
-            )
-        except (CannotFindUniqueItemError, CannotIdentifyUniqueItemError):
-            t_end = time.perf_counter()
-            res = CheckResult(
-                item=item,
-                file=screen,
-                found=False,
-                elapsed=t_end - t_start,
-            )
+    That's the number of template variants of all items of its base.
+    """
+    return sum(
+        candidate.sockets * len(SOCKET_COLORS) or 1
+        for candidate in item_loader.filter_base(item.base)
+    )
 
-        results.append(res)
 
-    return results
+def stage_lines(results: list[CheckResult]) -> list[str]:
+    """Format the stage percentiles and counts for the summary panel."""
+    lines = ["Stage (ms)" + "".join(f"{f'p{q}':>9}" for q in PERCENTILES)]
+
+    for stage, percentiles in stage_percentiles(results).items():
+        lines.append(
+            f"{stage:<10}" + "".join(f"{value * 1e3:9.2f}" for value in percentiles.values()),
+        )
+
+    if matched := [result for result in results if "candidates" in result.counts]:
+        lines += [
+            "",
+            "Template matched: "
+            f"{len(matched)} screenshot(s), "
+            f"{np.mean([r.counts['candidates'] for r in matched]):.1f} candidates and "
+            f"{np.mean([r.counts['variants'] for r in matched]):.1f} variants on average",
+        ]
+
+    return lines
 
 
 class Benchmark:
     """Class for running the whole benchmark suite."""
 
-    def __init__(self, *, display: bool = True, save_json: bool = False) -> None:
-        self.matcher = Matcher()
+    def __init__(
+        self,
+        executor: ProcessPoolExecutor | None,
+        *,
+        display: bool = True,
+        save_json: bool = False,
+        profiler: MemoryProfiler | None = None,
+    ) -> None:
+        # Without an executor, the checks run in this process
+        self.executor = executor
+        self.profiler = profiler
+        self.item_loader = ItemLoader()
+        self.item_loader.load()
         self.to_benchmark: list[Item] = []
         self._report: list[bool] = []
         self._times: list[float] = []
@@ -146,12 +264,16 @@ class Benchmark:
 
     def add(self, name: str) -> None:
         """Add item to benchmark suite."""
-        item = self.matcher.item_loader.get(name)
+        item = self.item_loader.get(name)
         self.to_benchmark.append(item)
 
     def _get_test_set(self, name: str) -> list[Path]:
-        """Return the screenshot test set for an item."""
-        return sorted(DATA_DIR.joinpath(self.data_set, name).iterdir())
+        """Return the screenshot test set for an item, without the sidecars of cropped ones."""
+        return sorted(
+            path
+            for path in DATA_DIR.joinpath(self.data_set, name).iterdir()
+            if path.suffix != SIDECAR_SUFFIX
+        )
 
     def report(self, found: bool) -> None:  # noqa: FBT001
         """Add report (whether the item was correctly identified) for a single test."""
@@ -211,7 +333,58 @@ class Benchmark:
         date = datetime.now().strftime("%Y%m%d-%H%M%S")
 
         with Path(f".benchmark/benchmark-{data_set}-{date}.json").open("w") as fwrite:
-            json.dump([res.json() for res in results], fwrite)
+            json.dump(
+                {
+                    "results": [res.json() for res in results],
+                    "stages": stage_percentiles(results),
+                },
+                fwrite,
+            )
+
+    def _run_inline(
+        self,
+        tasks: list[tuple[Item, Path]],
+        progress: Progress,
+        progress_task: TaskID,
+    ) -> list[CheckResult]:
+        """Run the checks one by one in this process (for memory profiling)."""
+        results = []
+
+        for item, screen in tasks:
+            results.append(_check_one(item, screen))
+            progress.advance(progress_task)
+
+            if self.profiler is not None:
+                self.profiler.step()
+
+        return results
+
+    def _run_parallel(
+        self,
+        tasks: list[tuple[Item, Path]],
+        progress: Progress,
+        progress_task: TaskID,
+    ) -> list[CheckResult]:
+        """Run the checks in the worker processes."""
+        if self.executor is None:
+            raise RuntimeError
+
+        # The most expensive screenshots first,
+        # so that no worker is left with a long tail at the end
+        order = sorted(
+            range(len(tasks)),
+            key=lambda i: estimate_cost(tasks[i][0], self.item_loader),
+            reverse=True,
+        )
+        futures = {self.executor.submit(_check_one, *tasks[i]): i for i in order}
+        results: list[CheckResult | None] = [None] * len(tasks)
+
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            progress.advance(progress_task)
+
+        # Back in the order of items and screenshots
+        return [result for result in results if result is not None]
 
     def run(self, data_set: str) -> SuiteResult:
         """Run the whole benchmark suite."""
@@ -223,29 +396,17 @@ class Benchmark:
         for name in sorted(os.listdir(DATA_DIR / self.data_set)):
             self.add(name)
 
-        with ProcessPoolExecutor(max_workers=min(cpu_count(), 8)) as executor:
-            futures = []
-
-            for item in self.to_benchmark:
-                f = executor.submit(_run_one, item, self._get_test_set(item.file))
-                futures.append(f)
-
-            with Progress() as progress:
-                task = progress.add_task(f"Benchmarking {data_set}", total=len(futures))
-
-                while True:
-                    completed = sum(f.done() for f in futures)
-                    progress.update(task, completed=completed)
+        tasks = [
+            (item, screen) for item in self.to_benchmark for screen in self._get_test_set(item.file)
+        ]
 
-                    if completed == len(futures):
-                        break
+        with Progress() as progress:
+            progress_task = progress.add_task(f"Benchmarking {data_set}", total=len(tasks))
 
-                    time.sleep(0.1)
-
-        all_results: list[CheckResult] = []
-
-        for check_results in [f.result() for f in futures]:
-            all_results.extend(check_results)
+            if self.executor is None:
+                all_results = self._run_inline(tasks, progress, progress_task)
+            else:
+                all_results = self._run_parallel(tasks, progress, progress_task)
 
         found = sum(result.found for result in all_results)
         total = len(all_results)
@@ -279,6 +440,8 @@ class Benchmark:
                 f"Average time: {np.mean(times)*1e3:6.2f} ms ± {np.std(times)*1e3:.2f} ms",
                 f"Fastest:      {np.min(times)*1e3:6.2f} ms",
                 f"Slowest:      {np.max(times)*1e3:6.2f} ms",
+                "",
+                *stage_lines(all_results),
             ]
 
             panel = Panel("\n".join(lines), title="Summary")
@@ -291,40 +454,285 @@ class Benchmark:
             found=found,
             accuracy=accuracy,
             item_names={item.file for item in self.to_benchmark},
+            results=all_results,
         )
 
 
-def run(*, github: bool = False, save_json: bool = False) -> None:
-    """Run the benchmark."""
-    results: list[SuiteResult] = []
-    run_multiple = True
+def baseline_data(results: list[SuiteResult]) -> dict:
+    """Return benchmark results in the format of a baseline file."""
+    return {
+        "data_sets": {
+            res.data_set: {
+                "items": res.items,
+                "screenshots": res.screenshots,
+                "found": res.found,
+                "accuracy": res.accuracy,
+                "stages": stage_percentiles(res.results),
+                "results": [check.json() for check in res.results],
+            }
+            for res in results
+        },
+    }
+
 
+def _screenshot_key(record: dict) -> str:
+    """Return a stable identifier of a screenshot in a baseline."""
+    path = Path(record["file"])
+
+    return str(path.relative_to(DATA_DIR)) if path.is_relative_to(DATA_DIR) else str(path)
+
+
+def _describe(record: dict) -> str:
+    """Return a short description of the result of a screenshot in a baseline."""
+    if record["result"] is None:
+        return "not found"
+
+    found = "found" if record["found"] else f"wrong item: {record['result']['item']}"
+
+    return f"{found}, min_val {record['result']['min_val']:.4f}"
+
+
+def _has_changed(old: dict, new: dict) -> bool:
+    """Return True if the result of a screenshot changed between two baselines."""
+    if old["found"] != new["found"] or (old["result"] is None) != (new["result"] is None):
+        return True
+
+    if old["result"] is None or new["result"] is None:
+        return False
+
+    return (
+        old["result"].get("item") != new["result"].get("item")
+        or old["result"]["matched_by"] != new["result"]["matched_by"]
+        or abs(old["result"]["min_val"] - new["result"]["min_val"]) > MIN_VAL_TOLERANCE
+    )
+
+
+def _item_accuracy(records: list[dict]) -> dict[str, tuple[int, int]]:
+    """Return (found, screenshots) of every item in a data set."""
+    items: dict[str, tuple[int, int]] = {}
+
+    for record in records:
+        found, total = items.get(record["item"]["file"], (0, 0))
+        items[record["item"]["file"]] = (found + record["found"], total + 1)
+
+    return items
+
+
+def _compare_accuracy(
+    console: Console,
+    old_sets: dict,
+    new_sets: dict,
+    max_accuracy_drop: float,
+) -> list[str]:
+    """Print the accuracy deltas of data sets and items, return the regressions."""
+    regressions = []
+    item_lines = []
+
+    table = Table(title="Accuracy")
+    table.add_column("Data set")
+    table.add_column("Baseline")
+    table.add_column("Current")
+    table.add_column("Delta")
+
+    for data_set, new in new_sets.items():
+        old = old_sets[data_set]
+        delta = (new["accuracy"] - old["accuracy"]) * 100
+        color = "red" if delta < 0 else "green" if delta > 0 else "white"
+
+        table.add_row(
+            data_set,
+            f"{old['accuracy']:.2%}",
+            f"{new['accuracy']:.2%}",
+            f"[{color}]{delta:+.2f} pp[/{color}]",
+        )
+
+        if -delta > max_accuracy_drop:
+            regressions.append(f"Accuracy of {data_set} dropped by {-delta:.2f} pp")
+
+        old_items = _item_accuracy(old["results"])
+
+        for item, (found, total) in _item_accuracy(new["results"]).items():
+            old_found, old_total = old_items.get(item, (0, 0))
+
+            if old_total and found / total != old_found / old_total:
+                item_lines.append(
+                    f"{data_set}/{item}: {old_found}/{old_total} -> {found}/{total}",
+                )
+
+    console.print(table)
+
+    if item_lines:
+        console.print(Panel("\n".join(item_lines), title="Items with changed accuracy"))
+
+    return regressions
+
+
+def _compare_latency(
+    console: Console,
+    old_sets: dict,
+    new_sets: dict,
+    max_p95_regression: float,
+) -> list[str]:
+    """Print the stage percentile shifts of all data sets together, return the regressions."""
+    regressions = []
+
+    def all_times(data_sets: dict) -> list[tuple[float, dict[str, float]]]:
+        return [
+            (record["elapsed"], record["stages"])
+            for data_set in new_sets
+            for record in data_sets[data_set]["results"]
+        ]
+
+    old_stages = _percentiles(all_times(old_sets))
+    new_stages = _percentiles(all_times(new_sets))
+
+    table = Table(title="Stage latency (ms)")
+    table.add_column("Stage")
+
+    for q in PERCENTILES:
+        table.add_column(f"p{q}")
+
+    for stage in [stage for stage in new_stages if stage in old_stages]:
+        cells = []
+
+        for name, value in new_stages[stage].items():
+            old_value = old_stages[stage][name]
+            change = (value - old_value) / old_value * 100 if old_value else 0.0
+            color = "red" if change > 0 else "green" if change < 0 else "white"
+            cells.append(f"{old_value * 1e3:.2f} -> {value * 1e3:.2f} [{color}]{change:+.1f}%[/]")
+
+            if (
+                name == "p95"
+                and change > max_p95_regression
+                and value - old_value > P95_NOISE_FLOOR
+            ):
+                regressions.append(f"p95 of {stage} is {change:.1f}% slower")
+
+        table.add_row(stage, *cells)
+
+    console.print(table)
+
+    return regressions
+
+
+def _changed_screenshots(old_sets: dict, new_sets: dict) -> list[str]:
+    """Return the screenshots whose result changed."""
+    changed = []
+
+    for data_set, new in new_sets.items():
+        old_records = {_screenshot_key(r): r for r in old_sets[data_set]["results"]}
+
+        for record in new["results"]:
+            key = _screenshot_key(record)
+
+            if (old_record := old_records.get(key)) and _has_changed(old_record, record):
+                changed.append(f"{key}: {_describe(old_record)} -> {_describe(record)}")
+
+    return changed
+
+
+def compare(
+    console: Console,
+    baseline: dict,
+    current: dict,
+    *,
+    max_accuracy_drop: float = MAX_ACCURACY_DROP,
+    max_p95_regression: float = MAX_P95_REGRESSION,
+) -> bool:
+    """Print the differences between a baseline and the current results.
+
+    Return True if there is a regression over the limits, that is
+    the accuracy of a data set dropped by more than `max_accuracy_drop`
+    percentage points, or the p95 of a stage is more than
+    `max_p95_regression` percent slower.
+    """
+    old_sets = baseline["data_sets"]
+
+    for data_set in sorted(set(old_sets) ^ set(current["data_sets"])):
+        where = "baseline" if data_set in old_sets else "current run"
+        console.print(f"[yellow]Data set {data_set} is only in the {where}[/yellow]")
+
+    # Only the data sets in both can be compared
+    new_sets = {
+        data_set: data for data_set, data in current["data_sets"].items() if data_set in old_sets
+    }
+
+    regressions = [
+        *_compare_accuracy(console, old_sets, new_sets, max_accuracy_drop),
+        *_compare_latency(console, old_sets, new_sets, max_p95_regression),
+    ]
+
+    if changed := _changed_screenshots(old_sets, new_sets):
+        console.print(Panel("\n".join(changed), title=f"Changed screenshots ({len(changed)})"))
+
+    if regressions:
+        console.print(Panel("\n".join(regressions), title="[bold red]Regressions[/bold red]"))
+    else:
+        console.print("[green]No regressions[/green]")
+
+    return bool(regressions)
+
+
+def run(
+    *,
+    github: bool = False,
+    save_json: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    memory: int | None = None,
+    cache_dir: Path | None = None,
+) -> list[SuiteResult]:
+    """Run the benchmark and return the results of all data sets."""
     if github:
         # Run the data sets for the github wiki
-        for data_set in GITHUB_DATASETS:
-            benchmark = Benchmark(display=False, save_json=save_json)
-            result = benchmark.run(data_set)
-            results.append(result)
+        data_sets = GITHUB_DATASETS
+        run_multiple = True
     else:
         # Make the user choose the data sets
-        data_sets = sorted(os.listdir(DATA_DIR))
+        all_data_sets = sorted(os.listdir(DATA_DIR))
 
         menu = TerminalMenu(
-            data_sets,
+            all_data_sets,
             multi_select=True,
             show_multi_select_hint=True,
         )
         choices = menu.show()
 
         if choices is None:
-            return
+            return []
 
-        run_multiple = len(choices) > 1
+        data_sets = [all_data_sets[choice] for choice in choices]
+        run_multiple = len(data_sets) > 1
 
-        for choice in choices:
-            benchmark = Benchmark(display=not run_multiple, save_json=save_json)
-            result = benchmark.run(data_sets[choice])
-            results.append(result)
+    if memory:
+        # Profile this process, so match here one screenshot at a time
+        _init_worker(cache_dir)
+        profiler = MemoryProfiler(memory)
+        profiler.start()
+
+        try:
+            results = [
+                Benchmark(
+                    None,
+                    display=not run_multiple,
+                    save_json=save_json,
+                    profiler=profiler,
+                ).run(data_set)
+                for data_set in data_sets
+            ]
+        finally:
+            profiler.stop()
+            print(profiler.format_report())
+    else:
+        # The workers (and their Matchers) are shared by all data sets
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(cache_dir,),
+        ) as executor:
+            results = [
+                Benchmark(executor, display=not run_multiple, save_json=save_json).run(data_set)
+                for data_set in data_sets
+            ]
 
     _il = ItemLoader()
     _il.load()
@@ -377,6 +785,8 @@ def run(*, github: bool = False, save_json: bool = False) -> None:
             ),
         )
 
+    return results
+
 
 if __name__ == "__main__":
     Path(".benchmark/").mkdir(exist_ok=True)
@@ -392,7 +802,87 @@ if __name__ == "__main__":
         action="store_true",
         help="Save benchmark results as JSON",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Number of worker processes (default: {DEFAULT_JOBS})",
+    )
+
+    parser.add_argument(
+        "--save-baseline",
+        type=Path,
+        metavar="FILE",
+        help="Save the results as a baseline for --compare",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        metavar="FILE",
+        help="Compare the results with a baseline, exit with 1 on regression",
+    )
+    parser.add_argument(
+        "--max-accuracy-drop",
+        type=float,
+        default=MAX_ACCURACY_DROP,
+        metavar="PP",
+        help=f"Allowed accuracy drop in percentage points (default: {MAX_ACCURACY_DROP})",
+    )
+    parser.add_argument(
+        "--max-p95-regression",
+        type=float,
+        default=MAX_P95_REGRESSION,
+        metavar="PERCENT",
+        help=f"Allowed p95 slowdown of a stage in percent (default: {MAX_P95_REGRESSION})",
+    )
+
+    parser.add_argument(
+        "--memory",
+        type=int,
+        metavar="N",
+        help="Profile memory every N screenshots (runs in a single process)",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        nargs="?",
+        const=CACHE_DIR,
+        metavar="DIR",
+        help=(
+            "Reuse the located items and titles of already seen screenshots"
+            " (skews the guides and title latencies, don't use with --compare)"
+        ),
+    )
 
     args = parser.parse_args()
 
-    run(github=args.github, save_json=args.json)
+    # Read the baseline first, so a typo doesn't waste the whole run
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+
+    suite_results = run(
+        github=args.github,
+        save_json=args.json,
+        jobs=args.jobs,
+        memory=args.memory,
+        cache_dir=args.cache,
+    )
+
+    if not suite_results:
+        sys.exit(0)
+
+    current = baseline_data(suite_results)
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(current))
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if baseline is not None:
+        regressed = compare(
+            Console(),
+            baseline,
+            current,
+            max_accuracy_drop=args.max_accuracy_drop,
+            max_p95_regression=args.max_p95_regression,
+        )
+        sys.exit(1 if regressed else 0)
@@ -0,0 +1,435 @@
+"""Microbenchmarks of the matcher's hot functions.
+
+benchmark.py runs whole data sets end to end, which is too coarse (and too
+slow) to see the effect of optimizing one stage. This times single functions
+on fixed inputs from tests/test_data and the item assets, so the numbers of
+two commits can be compared:
+
+    python tools/microbenchmark.py --json before.json
+    git checkout <other commit>
+    python tools/microbenchmark.py --compare before.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from collections import Counter
+from collections.abc import Callable
+from functools import cached_property
+from pathlib import Path
+
+import cv2
+import numpy as np
+from loguru import logger
+from PIL import Image
+from rich.console import Console
+from rich.table import Table
+
+from unique_matcher.constants import ROOT_DIR
+from unique_matcher.matcher import utils
+from unique_matcher.matcher.exceptions import CannotFindItemBaseError
+from unique_matcher.matcher.items import Item
+from unique_matcher.matcher.matcher import Matcher
+from unique_matcher.matcher.result import (
+    LocatedItem,
+    MatchedBy,
+    MatchingAlgorithm,
+    MatchResult,
+    get_best_result,
+)
+
+logger.remove()
+
+# The screenshot used by all benchmarks that need one
+SCREENSHOT_DIR = ROOT_DIR / "tests" / "test_data" / "contains" / "example"
+
+# How many times each benchmark is repeated, the median is reported
+REPEAT = 7
+
+# Minimum duration of one repetition, enough calls are made to reach it (seconds)
+MIN_TIME = 0.2
+
+# Median slowdown reported as a regression by --compare (percent)
+REGRESSION_THRESHOLD = 10.0
+
+# Raw titles as read by tesseract, with the typical OCR mistakes
+TITLES = [
+    ("Bones of Ullr\nSilk Slippers\n", True),
+    ("Le Heup of All\nAmethyst Ring\n", True),
+    ("Hyrrs Bite\nSuperior Lonng Bow\n", True),
+    ("Dyyaadus Infernal Mace\n", True),
+    ("SILK SLIPPERS\n", False),
+    ("RUSY RING\n", False),
+]
+
+
+class Fixtures:
+    """Inputs of the benchmarks, created on first use."""
+
+    @cached_property
+    def matcher(self) -> Matcher:
+        """Return the Matcher."""
+        return Matcher()
+
+    @cached_property
+    def screenshot(self) -> Path:
+        """Return the first screenshot of the example data set."""
+        return sorted(path for path in SCREENSHOT_DIR.rglob("*") if path.is_file())[0]
+
+    @cached_property
+    def screen(self) -> np.ndarray:
+        """Return the screenshot in grayscale."""
+        return utils.screen_to_gray(utils.load_screenshot(self.screenshot))
+
+    @cached_property
+    def located(self) -> LocatedItem:
+        """Return the unique item located in the screenshot."""
+        return self.matcher.locate_unique(utils.load_screenshot(self.screenshot), self.screen)
+
+    @cached_property
+    def large_base(self) -> list[Item]:
+        """Return the items of the base with the most items."""
+        item_loader = self.matcher.item_loader
+        base, _ = Counter(item.base for item in item_loader).most_common(1)[0]
+
+        return item_loader.filter_base(base)
+
+    @cached_property
+    def socketed_item(self) -> Item:
+        """Return the item with the most sockets (the most variants)."""
+        return max(self.matcher.item_loader, key=lambda item: (item.sockets, item.file))
+
+    @cached_property
+    def icon(self) -> Image.Image:
+        """Return the icon of socketed_item."""
+        return Image.open(self.socketed_item.icon)
+
+    @cached_property
+    def results(self) -> list[MatchResult]:
+        """Return template matching results of all items of large_base."""
+        return [
+            MatchResult(
+                item=item,
+                loc=(0, 0),
+                identified=True,
+                matched_by=MatchedBy.TEMPLATE_MATCH,
+                min_val=0.05 + n * 0.01,
+                hist_val=0.3 + n * 0.01,
+            )
+            for n, item in enumerate(self.large_base)
+        ]
+
+
+# Creates the benchmarked callable from the fixtures
+BenchmarkFactory = Callable[[Fixtures], Callable[[], object]]
+
+BENCHMARKS: dict[str, BenchmarkFactory] = {}
+
+
+def bench(name: str) -> Callable[[BenchmarkFactory], BenchmarkFactory]:
+    """Register a benchmark."""
+
+    def register(func: BenchmarkFactory) -> BenchmarkFactory:
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+@bench("utils.calc_normalized_histogram")
+def _calc_normalized_histogram(fx: Fixtures) -> Callable[[], object]:
+    image = fx.located.image
+
+    return lambda: utils.calc_normalized_histogram(image)
+
+
+@bench("utils.image_to_cv")
+def _image_to_cv(fx: Fixtures) -> Callable[[], object]:
+    image = fx.located.image
+
+    return lambda: utils.image_to_cv(image)
+
+
+@bench("ItemGenerator.generate_sockets")
+def _generate_sockets(fx: Fixtures) -> Callable[[], object]:
+    generator = fx.matcher.generator
+    item = fx.socketed_item
+
+    return lambda: generator.generate_sockets(item.sockets, item.cols, "r")
+
+
+@bench("ItemGenerator.generate_image")
+def _generate_image(fx: Fixtures) -> Callable[[], object]:
+    generator = fx.matcher.generator
+    item = fx.socketed_item
+    icon = fx.icon
+
+    # generate_image resizes the base in place, so give it a fresh copy every time
+    return lambda: generator.generate_image(icon.copy(), item, item.sockets, "r")
+
+
+@bench("Matcher.get_item_variants")
+def _get_item_variants(fx: Fixtures) -> Callable[[], object]:
+    return lambda: fx.matcher.get_item_variants(fx.socketed_item)
+
+
+@bench("Matcher.get_mask")
+def _get_mask(fx: Fixtures) -> Callable[[], object]:
+    return lambda: fx.matcher.get_mask(fx.socketed_item)
+
+
+@bench("UniqueLocator._find_unique_control_start")
+def _find_unique_control_start(fx: Fixtures) -> Callable[[], object]:
+    return lambda: fx.matcher.locator._find_unique_control_start(fx.screen)  # noqa: SLF001
+
+
+@bench("UniqueLocator._find_unique_control_end")
+def _find_unique_control_end(fx: Fixtures) -> Callable[[], object]:
+    is_identified = fx.located.identified
+
+    return lambda: fx.matcher.locator._find_unique_control_end(  # noqa: SLF001
+        fx.screen,
+        is_identified=is_identified,
+    )
+
+
+@bench("Matcher.check_one (large base)")
+def _check_one(fx: Fixtures) -> Callable[[], object]:
+    matcher = fx.matcher
+    image = fx.located.image
+
+    # Measure matching, not building the templates. The base may have more
+    # items than the template bank holds, so don't go through the bank.
+    template_sets = [matcher.create_template_set(item) for item in fx.large_base]
+
+    def run() -> None:
+        for template_set in template_sets:
+            matcher.check_template_set(image, template_set)
+
+        # Don't let the debug images pile up over thousands of calls
+        matcher.debug_info.clear()
+
+    return run
+
+
+@bench("TitleParser.parse_raw_title")
+def _parse_raw_title(fx: Fixtures) -> Callable[[], object]:
+    parser = fx.matcher.title_parser
+
+    def run() -> None:
+        for title, is_identified in TITLES:
+            try:
+                parser.parse_raw_title(title, is_identified=is_identified)
+            except CannotFindItemBaseError:
+                continue
+
+    return run
+
+
+@bench("TitleParser._clean_title")
+def _clean_title(fx: Fixtures) -> Callable[[], object]:
+    parser = fx.matcher.title_parser
+
+    def run() -> None:
+        for title, _ in TITLES:
+            parser._clean_title(title)  # noqa: SLF001
+
+    return run
+
+
+@bench("TitleParser._apply_manual_corrections")
+def _apply_manual_corrections(fx: Fixtures) -> Callable[[], object]:
+    parser = fx.matcher.title_parser
+    names = [title.split("\n")[0] for title, _ in TITLES]
+
+    def run() -> None:
+        for name in names:
+            parser._apply_manual_corrections(name, parser.BASE_CORRECTIONS)  # noqa: SLF001
+            parser._apply_manual_corrections(name, parser.ITEM_CORRECTIONS)  # noqa: SLF001
+
+    return run
+
+
+@bench("get_best_result")
+def _get_best_result(fx: Fixtures) -> Callable[[], object]:
+    results = fx.results
+
+    return lambda: get_best_result(results, MatchingAlgorithm.DEFAULT)
+
+
+def measure(func: Callable[[], object], repeat: int = REPEAT) -> dict[str, float]:
+    """Time a function, return the statistics of one call (seconds)."""
+    timer = timeit.Timer(func)
+
+    # Find the number of calls that take at least MIN_TIME
+    number = 1
+
+    while timer.timeit(number) < MIN_TIME:
+        number *= 2
+
+    times = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "calls": number,
+        "repeat": repeat,
+    }
+
+
+def environment() -> dict[str, str | bool]:
+    """Return the commit and versions the benchmarks ran with."""
+
+    def git(*args: str) -> str:
+        try:
+            return subprocess.run(
+                ["git", *args],  # noqa: S603, S607
+                cwd=ROOT_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def run(names: list[str], repeat: int = REPEAT) -> dict[str, dict[str, float]]:
+    """Run the benchmarks and print their results."""
+    fixtures = Fixtures()
+    results = {}
+
+    table = Table()
+    table.add_column("Benchmark")
+    table.add_column("Median (µs)", justify="right")
+    table.add_column("Min (µs)", justify="right")
+    table.add_column("Stdev (µs)", justify="right")
+    table.add_column("Calls", justify="right")
+
+    console = Console()
+
+    for name in names:
+        with console.status(name):
+            stats = measure(BENCHMARKS[name](fixtures), repeat)
+
+        results[name] = stats
+        table.add_row(
+            name,
+            f"{stats['median'] * 1e6:.1f}",
+            f"{stats['min'] * 1e6:.1f}",
+            f"{stats['stdev'] * 1e6:.1f}",
+            str(stats["calls"]),
+        )
+
+    console.print(table)
+
+    return results
+
+
+def compare(
+    console: Console,
+    baseline: dict,
+    current: dict,
+    threshold: float = REGRESSION_THRESHOLD,
+) -> bool:
+    """Print the median changes against a previous run.
+
+    Return True if a benchmark is more than `threshold` percent slower.
+    """
+    table = Table(
+        title=f"{baseline['environment']['commit'][:10]} -> "
+        f"{current['environment']['commit'][:10]}",
+    )
+    table.add_column("Benchmark")
+    table.add_column("Before (µs)", justify="right")
+    table.add_column("After (µs)", justify="right")
+    table.add_column("Change", justify="right")
+
+    regressed = False
+
+    for name, stats in current["benchmarks"].items():
+        if (old := baseline["benchmarks"].get(name)) is None:
+            continue
+
+        change = (stats["median"] - old["median"]) / old["median"] * 100
+
+        if change > threshold:
+            color = "red"
+            regressed = True
+        elif change < -threshold:
+            color = "green"
+        else:
+            color = "white"
+
+        table.add_row(
+            name,
+            f"{old['median'] * 1e6:.1f}",
+            f"{stats['median'] * 1e6:.1f}",
+            f"[{color}]{change:+.1f}%[/{color}]",
+        )
+
+    console.print(table)
+
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the matcher microbenchmarks")
+    parser.add_argument(
+        "-k",
+        "--filter",
+        help="Only run benchmarks whose name contains this",
+    )
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=REPEAT,
+        help=f"Repetitions of each benchmark (default: {REPEAT})",
+    )
+    parser.add_argument("--json", type=Path, metavar="FILE", help="Save the results as JSON")
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        metavar="FILE",
+        help="Compare with the JSON of a previous run, exit with 1 on regression",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        metavar="PERCENT",
+        help=f"Slowdown reported as a regression (default: {REGRESSION_THRESHOLD})",
+    )
+
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+
+    if args.list:
+        Console().print("\n".join(names))
+        sys.exit(0)
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+
+    current = {"environment": environment(), "benchmarks": run(names, args.repeat)}
+
+    if args.json:
+        args.json.write_text(json.dumps(current, indent=2))
+
+    if baseline is not None:
+        sys.exit(1 if compare(Console(), baseline, current, args.threshold) else 0)
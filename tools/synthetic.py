@@ -0,0 +1,377 @@
+"""Generate synthetic screenshots of unique item tooltips.
+
+The labelled screenshots in tests/test_data/contains only cover a part of
+the items and are too few for load testing. This composes 1920x1080
+screenshots from the control guide templates and items rendered by
+ItemGenerator (random sockets, socket colors, identified/unidentified,
+compressed title bar) on a cluttered background.
+
+The screenshots are saved in the tests/test_data/contains layout, i.e.
+<output>/<item file>/<n>.png, so they can be used by the CLI and the queue
+right away. The output directory has to be given explicitly; to benchmark
+them, generate into a data set under tests/test_data/contains (and don't
+commit it).
+"""
+import argparse
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import cpu_count
+from pathlib import Path
+
+import cv2
+import numpy as np
+from loguru import logger
+from PIL import Image, ImageDraw, ImageFont
+from rich.progress import Progress
+
+from unique_matcher.constants import ITEM_MAX_SIZE, TEMPLATES_DIR
+from unique_matcher.matcher.generator import ItemGenerator
+from unique_matcher.matcher.items import SOCKET_COLORS, Item, ItemLoader
+
+logger.remove()
+
+SCREEN_SIZE = (1920, 1080)
+
+# Colors of the tooltip (RGB)
+TITLE_COLOR = (175, 96, 37)
+HEADER_COLOR = (26, 17, 8)
+BODY_COLOR = (8, 8, 8)
+MOD_COLOR = (136, 136, 255)
+INVENTORY_COLOR = (10, 10, 24)
+
+FONT_SIZE = 19
+
+# Width of the tooltip body, the title bar is at least as wide
+MIN_TOOLTIP_WIDTH = 320
+
+# Share of unidentified items and compressed title bars (of identified items)
+UNIDENTIFIED_RATIO = 0.3
+COMPRESSED_RATIO = 0.2
+
+
+@dataclass
+class Sample:
+    """Description of one generated screenshot."""
+
+    item: Item
+    sockets: int
+    color: str
+    identified: bool
+    compressed: bool
+
+    @property
+    def name(self) -> str:
+        """Return the file name (without the index)."""
+        return "-".join(
+            [
+                f"{self.sockets}{self.color}" if self.sockets else "0",
+                "id" if self.identified else "unid",
+                *(["cmp"] if self.compressed else []),
+            ],
+        )
+
+
+class ScreenshotGenerator:
+    """Compose synthetic tooltip screenshots."""
+
+    def __init__(self) -> None:
+        self.item_loader = ItemLoader()
+        self.item_loader.load()
+        self.generator = ItemGenerator()
+        self.font = ImageFont.load_default(size=FONT_SIZE)
+
+        # (start, end) guides of unidentified, identified and compressed title bars
+        self.one_line = self._load_guides("unique-one-line")
+        self.two_line = self._load_guides("unique-two-line")
+        self.two_line_cmp = self._load_guides("unique-two-line", "-compressed")
+
+    def _load_guides(self, prefix: str, suffix: str = "") -> tuple[Image.Image, Image.Image]:
+        # Paste the guides as they are, the matcher ignores their alpha as well
+        return (
+            Image.open(TEMPLATES_DIR / f"{prefix}-fullhd{suffix}.png").convert("RGB"),
+            Image.open(TEMPLATES_DIR / f"{prefix}-end-fullhd{suffix}.png").convert("RGB"),
+        )
+
+    def render_item(self, item: Item, rng: random.Random) -> tuple[Image.Image, int, str]:
+        """Render an item with random sockets, return (image, sockets, color)."""
+        icon = Image.open(item.icon)
+
+        if item.sockets == 0:
+            icon.thumbnail(
+                (
+                    int(ITEM_MAX_SIZE[0] * (item.width / Item.MAX_WIDTH)),
+                    int(ITEM_MAX_SIZE[1] * (item.height / Item.MAX_HEIGHT)),
+                ),
+                Image.Resampling.BILINEAR,
+            )
+            return icon.convert("RGBA"), 0, ""
+
+        if not item.is_smaller_than_full():
+            # Same as Matcher.get_item_variants
+            icon.thumbnail((100, 200), Image.Resampling.BILINEAR)
+
+        sockets = rng.randint(1, item.sockets)
+        color = rng.choice(SOCKET_COLORS)
+
+        return self.generator.generate_image(icon, item, sockets, color), sockets, color
+
+    def draw_background(self, rng: random.Random) -> Image.Image:
+        """Draw a dark background with random shapes and noise."""
+        width, height = SCREEN_SIZE
+        base = [rng.randint(10, 60) for _ in range(3)]
+        screen = Image.new("RGB", SCREEN_SIZE, tuple(base))  # type: ignore[arg-type]
+        draw = ImageDraw.Draw(screen)
+
+        for _ in range(rng.randint(20, 60)):
+            color = tuple(min(255, max(0, c + rng.randint(-40, 60))) for c in base)
+            x, y = rng.randrange(width), rng.randrange(height)
+            w, h = rng.randint(10, 400), rng.randint(10, 300)
+
+            match rng.randrange(3):
+                case 0:
+                    draw.rectangle((x, y, x + w, y + h), fill=color)  # type: ignore[arg-type]
+                case 1:
+                    draw.ellipse((x, y, x + w, y + h), fill=color)  # type: ignore[arg-type]
+                case _:
+                    draw.line(
+                        (x, y, x + w, y + h),
+                        fill=color,  # type: ignore[arg-type]
+                        width=rng.randint(1, 8),
+                    )
+
+        noise = np.random.default_rng(rng.getrandbits(32)).normal(0, 6, (height, width, 3))
+
+        return Image.fromarray(np.clip(np.array(screen) + noise, 0, 255).astype(np.uint8))
+
+    def generate(self, item: Item, rng: random.Random) -> tuple[Image.Image, Sample]:
+        """Generate one screenshot of an item."""
+        identified = rng.random() >= UNIDENTIFIED_RATIO
+        compressed = identified and rng.random() < COMPRESSED_RATIO
+
+        if not identified:
+            start, end = self.one_line
+            lines = [item.base.upper()]
+        else:
+            start, end = self.two_line_cmp if compressed else self.two_line
+            lines = [item.name.upper(), item.base.upper()]
+
+        item_img, sockets, color = self.render_item(item, rng)
+        screen = self.draw_background(rng)
+        draw = ImageDraw.Draw(screen)
+
+        # Size of the tooltip
+        text_width = max(int(self.font.getlength(line)) for line in lines)
+        title_width = max(text_width + 20, MIN_TOOLTIP_WIDTH - start.width - end.width)
+        tooltip_width = start.width + title_width + end.width
+        body_height = rng.randint(150, 500)
+
+        # Position of the start guide, the item is on its left
+        x = rng.randint(ITEM_MAX_SIZE[0] + 10, SCREEN_SIZE[0] - tooltip_width - 10)
+        y = rng.randint(10, SCREEN_SIZE[1] - max(ITEM_MAX_SIZE[1], start.height + body_height) - 10)
+        end_x = x + start.width + title_width
+
+        # Item (aligned to the top right, see Matcher.crop_out_unique_by_dimensions)
+        draw.rectangle(
+            (x - item_img.width, y, x - 1, y + item_img.height - 1),
+            fill=INVENTORY_COLOR,
+        )
+        screen.paste(item_img, (x - item_img.width, y), item_img)
+
+        # Title bar
+        draw.rectangle((x, y, end_x + end.width - 1, y + start.height - 1), fill=HEADER_COLOR)
+        screen.paste(start, (x, y))
+        screen.paste(end, (end_x, y))
+
+        line_height = start.height // (len(lines) + 1)
+
+        for n, line in enumerate(lines, 1):
+            draw.text(
+                (
+                    x + start.width + (title_width - self.font.getlength(line)) / 2,
+                    y + n * line_height,
+                ),
+                line,
+                fill=TITLE_COLOR,
+                font=self.font,
+                anchor="lm",
+            )
+
+        # Body with some mods
+        body_top = y + start.height
+        draw.rectangle(
+            (x, body_top, end_x + end.width - 1, body_top + body_height),
+            fill=BODY_COLOR,
+        )
+
+        for n in range(body_height // (FONT_SIZE + 6)):
+            words = [
+                "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 9)))
+                for _ in range(rng.randint(2, 5))
+            ]
+            mod = f"+{rng.randint(1, 120)} {' '.join(words)}"
+
+            # Keep the mods inside the tooltip
+            while len(words) > 1 and self.font.getlength(mod) > tooltip_width - 20:
+                words.pop()
+                mod = mod.rsplit(" ", 1)[0]
+
+            draw.text(
+                (x + tooltip_width / 2, body_top + 12 + n * (FONT_SIZE + 6)),
+                mod,
+                fill=MOD_COLOR,
+                font=self.font,
+                anchor="mt",
+            )
+
+        sample = Sample(
+            item=item,
+            sockets=sockets,
+            color=color,
+            identified=identified,
+            compressed=compressed,
+        )
+
+        return screen, sample
+
+
+# Generator of a worker process, created once by the pool initializer
+_generator: ScreenshotGenerator | None = None
+
+
+def _get_generator() -> ScreenshotGenerator:
+    """Return the generator of this worker process, create it if needed."""
+    global _generator  # noqa: PLW0603
+
+    if _generator is None:
+        _generator = ScreenshotGenerator()
+
+    return _generator
+
+
+def _init_worker() -> None:
+    """Load the items and templates before the worker gets any screenshots."""
+    _get_generator()
+
+
+def generate_one(
+    index: int,
+    item_file: str,
+    output: Path,
+    *,
+    seed: int,
+    jpeg_quality: int | None = None,
+) -> Path:
+    """Generate and save one screenshot, return its path.
+
+    Every screenshot has its own random generator seeded by (seed, index),
+    so the output doesn't depend on the number of workers.
+    """
+    generator = _get_generator()
+    rng = random.Random(f"{seed}-{index}")
+    screen, sample = generator.generate(generator.item_loader.get(item_file), rng)
+
+    # BGR for OpenCV
+    screen_cv = cv2.cvtColor(np.array(screen), cv2.COLOR_RGB2BGR)
+
+    if jpeg_quality is not None:
+        # Add the compression artifacts of a JPEG screenshot, but keep it lossless from here
+        quality = rng.randint(jpeg_quality, 95)
+        _, buffer = cv2.imencode(".jpg", screen_cv, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        screen_cv = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+    path = output / item_file / f"{index:06d}-{sample.name}.png"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(path), screen_cv)
+
+    return path
+
+
+def run(  # noqa: PLR0913
+    output: Path,
+    count: int | None = None,
+    *,
+    items: list[str] | None = None,
+    seed: int = 0,
+    jobs: int = 1,
+    jpeg_quality: int | None = None,
+) -> None:
+    """Generate `count` screenshots (one of every item by default) into `output`."""
+    item_loader = ItemLoader()
+    item_loader.load()
+
+    item_files = sorted(items or (item.file for item in item_loader))
+
+    # Cycle through the shuffled items, so that any count covers as many items as possible
+    random.Random(seed).shuffle(item_files)
+    count = len(item_files) if count is None else count
+
+    with (
+        ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor,
+        Progress() as progress,
+    ):
+        futures = [
+            executor.submit(
+                generate_one,
+                index,
+                item_files[index % len(item_files)],
+                output,
+                seed=seed,
+                jpeg_quality=jpeg_quality,
+            )
+            for index in range(count)
+        ]
+        task = progress.add_task(f"Generating into {output}", total=count)
+
+        for future in as_completed(futures):
+            future.result()
+            progress.advance(task)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic tooltip screenshots")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        required=True,
+        help="Output directory",
+    )
+    parser.add_argument(
+        "-n",
+        "--count",
+        type=int,
+        help="Number of screenshots (default: one of every item)",
+    )
+    parser.add_argument(
+        "--item",
+        action="append",
+        help="Only generate this item (file name), can be repeated",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument(
+        "--jpeg-quality",
+        type=int,
+        metavar="MIN",
+        help="Add JPEG compression artifacts with a random quality between MIN and 95",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=min(cpu_count(), 8),
+        help="Number of worker processes",
+    )
+
+    args = parser.parse_args()
+
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    run(
+        args.output,
+        args.count,
+        items=args.item,
+        seed=args.seed,
+        jobs=args.jobs,
+        jpeg_quality=args.jpeg_quality,
+    )
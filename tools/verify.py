@@ -1,10 +1,13 @@
 """Verification tool for items processed by Unique Matcher.
 
 Use this to interactively verify data/done items and move them int
-tests/test_data/contains/gathered.
+tests/test_data/contains/gathered. The sidecars of cropped screenshots
+are moved along with them.
 """
+import json
 import shutil
 import sys
+from pathlib import Path
 
 import rich
 from loguru import logger
@@ -12,10 +15,33 @@ from PIL import Image
 from simple_term_menu import TerminalMenu  # type: ignore[import]
 
 from unique_matcher.constants import DONE_DIR, ERROR_DIR, ROOT_DIR
+from unique_matcher.gui.archive import SIDECAR_SUFFIX
 from unique_matcher.matcher.matcher import Matcher
 
 DATA_SET = ROOT_DIR / "tests" / "test_data" / "contains" / "gathered"
 
+
+def move(file: Path, target: Path) -> None:
+    """Move a screenshot, together with its metadata sidecar if it was cropped."""
+    print(f"Move:\n  source: {file}\n  dest:   {target}")
+    shutil.move(file, target)
+
+    sidecar = file.with_suffix(SIDECAR_SUFFIX)
+
+    if sidecar.exists():
+        shutil.move(sidecar, target.with_suffix(SIDECAR_SUFFIX))
+
+
+def source_height(file: Path) -> int | None:
+    """Return the height of the screenshot a crop was taken from, None if not cropped."""
+    sidecar = file.with_suffix(SIDECAR_SUFFIX)
+
+    if not sidecar.exists():
+        return None
+
+    return json.loads(sidecar.read_text(encoding="utf-8"))["size"][1]
+
+
 logger.remove()
 
 matcher = Matcher()
@@ -27,6 +53,10 @@ for item_dir in sorted(DONE_DIR.iterdir()):
     for screenshot in (DONE_DIR / item_dir).iterdir():
         file = DONE_DIR / item_dir / screenshot
 
+        if file.suffix == SIDECAR_SUFFIX:
+            # Metadata of a cropped screenshot, moved along with it
+            continue
+
         item_name = file.parent.name
         item = matcher.item_loader.get(item_name)
 
@@ -48,8 +78,7 @@ for item_dir in sorted(DONE_DIR.iterdir()):
                 rich.print("[bold red]Target already exist![/bold red]")
                 continue
 
-            print(f"Move:\n  source: {file}\n  dest:   {target}")
-            shutil.move(file, target)
+            move(file, target)
 
             if len(list((DONE_DIR / item_dir).iterdir())) == 0:
                 (DONE_DIR / item_dir).rmdir()
@@ -59,9 +88,13 @@ for item_dir in sorted(DONE_DIR.iterdir()):
         with Image.open(item.icon) as image:
             image.show()
 
-        cropped = matcher.find_unique(file)
+        # Crops are located and matched with the profile of the original screenshot
+        cropped = matcher.find_unique(file, height=source_height(file))
         cropped.image.show()
 
+        result = matcher.match_cropped(cropped)
+        rich.print(f"Matched again as: [bold]{result.item.name}[/bold]")
+
         print()
 
         menu = TerminalMenu(["[y] yes", "[n] no"], title="Is this item correct? (Ctrl+C to exit)")
@@ -80,14 +113,12 @@ for item_dir in sorted(DONE_DIR.iterdir()):
                 rich.print("[bold red]Target already exist![/bold red]")
                 continue
 
-            print(f"Move:\n  source: {file}\n  dest:   {target}")
-            shutil.move(file, target)
+            move(file, target)
         else:
             target_dir = ERROR_DIR
             target = target_dir / screenshot.name
 
-            print(f"Move:\n  source: {file}\n  dest:   {target}")
-            shutil.move(file, target)
+            move(file, target)
 
         if len(list((DONE_DIR / item_dir).iterdir())) == 0:
             (DONE_DIR / item_dir).rmdir()
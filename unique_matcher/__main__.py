@@ -0,0 +1,7 @@
+"""Allow running the CLI as `python -m unique_matcher`."""
+
+import sys
+
+from unique_matcher.cli import main
+
+sys.exit(main())
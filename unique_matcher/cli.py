@@ -0,0 +1,435 @@
+"""Headless command line interface.
+
+Run as `python -m unique_matcher match <files, dirs or globs>`
+or `python -m unique_matcher serve`.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from unique_matcher.constants import CACHE_DIR, VERSION
+from unique_matcher.matcher import metrics
+from unique_matcher.matcher.cache import StageCache
+from unique_matcher.matcher.exceptions import BaseUMError
+from unique_matcher.matcher.matcher import Matcher
+from unique_matcher.matcher.memory import MemoryProfiler
+from unique_matcher.matcher.pipeline import STAGES, Pipeline
+from unique_matcher.matcher.result import BatchResult
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".raw"}
+
+# Matcher is not thread-safe, so every worker process has its own
+_matcher: Matcher | None = None
+
+
+def expand_inputs(inputs: Iterable[str]) -> list[Path]:
+    """Expand files, directories (recursively) and glob patterns into screenshot paths."""
+    paths: list[Path] = []
+
+    for arg in inputs:
+        path = Path(arg)
+
+        if path.is_dir():
+            paths.extend(
+                sorted(
+                    file
+                    for file in path.rglob("*")
+                    if file.is_file() and file.suffix.lower() in IMAGE_SUFFIXES
+                ),
+            )
+        elif path.is_file():
+            paths.append(path)
+        else:
+            matches = sorted(glob.glob(arg, recursive=True))  # noqa: PTH207
+
+            if not matches:
+                logger.warning("No screenshots found for {}", arg)
+
+            paths.extend(Path(match) for match in matches if Path(match).is_file())
+
+    return paths
+
+
+def _setup_logging(level: str) -> None:
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        format="{time:YYYY-MM-DD HH:mm:ss.SSS} | <level>{level:7s}</level> | {message}",
+        level=level,
+        diagnose=False,
+    )
+
+
+def _init_worker(log_level: str, cache_dir: Path | None = None) -> None:
+    """Initialize the worker process with its own Matcher."""
+    global _matcher  # noqa: PLW0603
+
+    _setup_logging(log_level)
+    _matcher = Matcher(cache=StageCache(cache_dir) if cache_dir is not None else None)
+
+
+def to_record(batch_result: BatchResult, elapsed: float | None = None) -> dict[str, Any]:
+    """Convert a result into a JSON-serializable record.
+
+    Without `elapsed`, it's the time spent in all the stages.
+    """
+    record: dict[str, Any] = {"screenshot": str(batch_result.screenshot)}
+
+    if batch_result.result is not None:
+        record.update(batch_result.result.as_dict())
+    elif batch_result.error is not None:
+        record["error"] = batch_result.error.__class__.__name__
+        record["message"] = str(batch_result.error)
+
+    record["elapsed"] = sum(batch_result.timings.values()) if elapsed is None else elapsed
+    record["timings"] = batch_result.timings
+    record["counts"] = batch_result.counts
+
+    return record
+
+
+def match_one(screenshot: Path, matcher: Matcher | None = None) -> dict[str, Any]:
+    """Match one screenshot and return a JSON-serializable record."""
+    matcher = matcher or _matcher
+
+    if matcher is None:
+        msg = "No matcher, call _init_worker first or pass one"
+        raise RuntimeError(msg)
+
+    batch_result = BatchResult(screenshot=screenshot)
+    t_start = time.perf_counter()
+
+    try:
+        batch_result.result = matcher.find_item(screenshot)
+    except Exception as e:  # noqa: BLE001
+        # A broken screenshot must not stop the whole batch
+        batch_result.error = e
+
+        if not isinstance(e, BaseUMError):
+            logger.exception("Unexpected error while processing {}", screenshot)
+
+    batch_result.timings = dict(matcher.timings)
+    batch_result.counts = dict(matcher.counts)
+
+    return to_record(batch_result, time.perf_counter() - t_start)
+
+
+def run_match(  # noqa: PLR0913
+    screenshots: list[Path],
+    *,
+    jobs: int = 1,
+    ordered: bool = True,
+    log_level: str = "WARNING",
+    cache_dir: Path | None = None,
+    batch_size: int = 1,
+) -> Iterator[dict[str, Any]]:
+    """Match all screenshots and yield the records as soon as they're done.
+
+    With `cache_dir`, the outputs of find_unique are cached there, see StageCache.
+
+    With one job and `batch_size` > 1, screenshots are matched in batches
+    (see Matcher.find_items) and the records of a batch are only yielded
+    once the whole batch is done.
+    """
+    if jobs <= 1:
+        matcher = Matcher(cache=StageCache(cache_dir) if cache_dir is not None else None)
+
+        if batch_size > 1:
+            # Batches share the templates of the same bases
+            for batch_result in matcher.find_items(screenshots, batch_size=batch_size):
+                yield to_record(batch_result)
+        else:
+            for screenshot in screenshots:
+                yield match_one(screenshot, matcher)
+
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(log_level, cache_dir),
+    ) as executor:
+        futures: list[Future[dict[str, Any]]] = [
+            executor.submit(match_one, screenshot) for screenshot in screenshots
+        ]
+
+        for future in futures if ordered else as_completed(futures):
+            record = future.result()
+
+            # Worker processes have their own metrics, so record them here
+            metrics.record_screenshot(record["timings"], record["counts"], record.get("error"))
+
+            yield record
+
+
+def run_pipeline(
+    screenshots: list[Path],
+    *,
+    workers: dict[str, int] | None = None,
+    ordered: bool = True,
+) -> Iterator[dict[str, Any]]:
+    """Match all screenshots in a single process with overlapping stages."""
+    pipeline = Pipeline(workers=workers)
+
+    for batch_result in pipeline.run(screenshots, ordered=ordered):
+        yield to_record(batch_result)
+
+    logger.info("Pipeline metrics: {}", json.dumps(pipeline.metrics()))
+
+
+def parse_stage_workers(values: list[str]) -> dict[str, int]:
+    """Parse STAGE=N pairs of --stage-workers."""
+    workers = {}
+
+    for value in values:
+        stage, _, count = value.partition("=")
+
+        if stage not in STAGES or not count.isdigit() or int(count) < 1:
+            msg = f"Expected STAGE=N with STAGE one of {', '.join(STAGES)}, got: {value}"
+            raise argparse.ArgumentTypeError(msg)
+
+        workers[stage] = int(count)
+
+    return workers
+
+
+def check_match_options(args: argparse.Namespace) -> str | None:
+    """Return an error message if options of the match command cannot be combined."""
+    if args.pipeline and args.jobs > 1:
+        return "--pipeline runs in a single process, it cannot be used with --jobs"
+
+    if args.pipeline and args.cache is not None:
+        return "--pipeline runs the stages separately, it cannot be used with --cache"
+
+    if args.batch_size > 1 and (args.jobs > 1 or args.pipeline):
+        return "--batch-size only applies to a single process, without --jobs or --pipeline"
+
+    if args.memory and args.jobs > 1:
+        return "--memory profiles this process only, it cannot be used with --jobs"
+
+    return None
+
+
+def cmd_match(args: argparse.Namespace) -> int:
+    """Run the match command."""
+    if (error := check_match_options(args)) is not None:
+        logger.error(error)
+        return 2
+
+    try:
+        stage_workers = parse_stage_workers(args.stage_workers)
+    except argparse.ArgumentTypeError as e:
+        logger.error(str(e))
+        return 2
+
+    screenshots = expand_inputs(args.inputs)
+
+    if not screenshots:
+        logger.error("No screenshots to process")
+        return 2
+
+    if args.pipeline:
+        logger.info("Processing {} screenshot(s) in a pipeline", len(screenshots))
+        records = run_pipeline(screenshots, workers=stage_workers, ordered=args.ordered)
+    else:
+        logger.info("Processing {} screenshot(s) with {} job(s)", len(screenshots), args.jobs)
+        records = run_match(
+            screenshots,
+            jobs=args.jobs,
+            ordered=args.ordered,
+            log_level=args.log_level,
+            cache_dir=args.cache,
+            batch_size=args.batch_size,
+        )
+
+    profiler = MemoryProfiler(args.memory) if args.memory else None
+
+    if profiler is not None:
+        profiler.start()
+
+    try:
+        written = write_records(records, profiler)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            sys.stderr.write(profiler.format_report() + "\n")
+
+    return 0 if written else 1
+
+
+def write_records(
+    records: Iterable[dict[str, Any]],
+    profiler: MemoryProfiler | None = None,
+) -> bool:
+    """Write the records to stdout as JSON lines.
+
+    Return False if the reader went away before all were written.
+    """
+    try:
+        for record in records:
+            sys.stdout.write(json.dumps(record) + "\n")
+            sys.stdout.flush()
+
+            if profiler is not None:
+                profiler.step()
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head). Point stdout at devnull,
+        # so flushing it at exit doesn't raise again
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return False
+
+    return True
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    """Run the serve command."""
+    # Imported here, the server is not needed for the other commands
+    from unique_matcher import server
+
+    if args.no_http and args.socket is None:
+        logger.error("Nothing to listen on, use --socket with --no-http")
+        return 2
+
+    if args.metrics:
+        metrics.REGISTRY.enabled = True
+
+    server.serve(
+        workers=args.workers,
+        port=None if args.no_http else args.port,
+        socket_path=args.socket,
+    )
+
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(prog="unique_matcher", description="PoE unique item matcher")
+    parser.add_argument("--version", action="version", version=VERSION)
+    parser.add_argument(
+        "--log-level",
+        default="WARNING",
+        choices=["TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL"],
+        help="Log level of the messages written to stderr (default: WARNING)",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        help="Collect metrics and write them into this file in the Prometheus text format",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    match_parser = subparsers.add_parser(
+        "match",
+        help="Match screenshots and write one JSON line per screenshot to stdout",
+    )
+    match_parser.add_argument("inputs", nargs="+", help="Screenshots, directories or globs")
+    match_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes (default: 1)",
+    )
+    match_parser.add_argument(
+        "--unordered",
+        dest="ordered",
+        action="store_false",
+        help="Write the results as soon as they're done, not in input order",
+    )
+    match_parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Run the matching stages (load, guides, title, match) concurrently in threads",
+    )
+    match_parser.add_argument(
+        "--stage-workers",
+        action="append",
+        default=[],
+        metavar="STAGE=N",
+        help="Number of threads of a pipeline stage, e.g. title=3 (can be repeated)",
+    )
+    match_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        metavar="N",
+        help=(
+            "Match N screenshots at a time, sharing the templates of the same bases;"
+            " the results are written when the whole batch is done (default: 1)"
+        ),
+    )
+    match_parser.add_argument(
+        "--memory",
+        type=int,
+        metavar="N",
+        help="Sample memory usage every N screenshots and write a report to stderr",
+    )
+    match_parser.add_argument(
+        "--cache",
+        type=Path,
+        nargs="?",
+        const=CACHE_DIR,
+        metavar="DIR",
+        help=(
+            "Cache the located items and their titles on disk and skip these stages"
+            f" for already seen screenshots (default DIR: {CACHE_DIR})"
+        ),
+    )
+    match_parser.set_defaults(func=cmd_match)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Run a local matching service with a pool of warm matchers",
+    )
+    serve_parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of Matcher instances in the pool (default: 1)",
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="Port on 127.0.0.1 to listen on (default: 8765)",
+    )
+    serve_parser.add_argument("--no-http", action="store_true", help="Don't listen on HTTP")
+    serve_parser.add_argument("--socket", type=Path, help="Also listen on this Unix socket")
+    serve_parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Collect metrics, available at GET /metrics",
+    )
+    serve_parser.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the CLI."""
+    args = build_parser().parse_args(argv)
+    _setup_logging(args.log_level)
+
+    if args.metrics_file is None:
+        return args.func(args)
+
+    metrics.REGISTRY.start_writer(args.metrics_file)
+
+    try:
+        return args.func(args)
+    finally:
+        metrics.REGISTRY.stop_writer()
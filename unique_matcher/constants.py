@@ -18,12 +18,31 @@ DONE_DIR = DATA_DIR / "done"
 LOG_DIR = DATA_DIR / "logs"
 RESULT_DIR = DATA_DIR / "results"
 
+# Index of the queue/done/errors counters, restored at startup
+COUNTERS_FILE = DATA_DIR / "counters.json"
+
+# SQLite DB with all match results across sessions
+HISTORY_DB = DATA_DIR / "history.sqlite3"
+
+# Cached row counts and aggregates of the result CSVs
+RESULT_MANIFEST = DATA_DIR / "results-manifest.json"
+
+# Metrics of the matching in the Prometheus text format, see OPT_METRICS
+METRICS_FILE = DATA_DIR / "metrics.prom"
+
+# Cached outputs of locating the item and reading its title, see matcher.cache
+CACHE_DIR = DATA_DIR / "cache"
+
 TESSERACT_PATH = ROOT_DIR / "Tesseract-OCR" / "tesseract.exe"
 
 # Maximum size of an item image for comparison
 # (might differ from artwork found on wiki)
 ITEM_MAX_SIZE: tuple[int, int] = (104, 208)
 
+# Screen height the guide templates and ITEM_MAX_SIZE are for,
+# other heights are scaled from it, see matcher.profiles
+TEMPLATE_HEIGHT = 1080
+
 # If enabled, the Matcher object will gather debug data for later use
 DEBUG: bool = True
 
@@ -47,3 +66,8 @@ OPT_FIND_BY_NAME_RAISE: bool = False
 # Whether to generate and use masks for template matching
 # Default: True
 OPT_USE_MASK: bool = True
+
+# Collect metrics (counters and histograms) of the matching,
+# see unique_matcher.matcher.metrics
+# Default: False
+OPT_METRICS: bool = False
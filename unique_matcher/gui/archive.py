@@ -0,0 +1,168 @@
+"""Module for archiving processed screenshots in done/ and errors/.
+
+By default, the full screenshots are kept. In the crop mode, only the
+tooltip region (the item and its title, with some padding so that the
+control guides can be found in it again) is saved as a PNG, next to a
+JSON sidecar with the original size, the guide locations and the result.
+That's a fraction of the size of a full frame, both on the disk and in
+the zipped data set.
+"""
+
+import configparser
+import json
+import shutil
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from unique_matcher.constants import DONE_DIR, ERROR_DIR
+from unique_matcher.matcher import utils
+from unique_matcher.matcher.result import LocatedItem, MatchResult
+
+# How to store processed screenshots:
+# - full: move the whole screenshot
+# - crop: save the tooltip region and a JSON sidecar
+ARCHIVE_MODES = ["full", "crop"]
+
+# Suffix of the metadata sidecar of a cropped screenshot
+SIDECAR_SUFFIX = ".json"
+
+# Margin around the tooltip region of a cropped screenshot (px)
+CROP_PADDING = 16
+
+
+def write_crop(
+    screenshot: Path,
+    target: Path,
+    box: tuple[int, int, int, int],
+    metadata: dict[str, Any],
+) -> None:
+    """Save the box of a screenshot as a PNG and its metadata into a sidecar."""
+    screen = utils.load_screenshot(screenshot)
+    height, width = screen.shape[:2]
+
+    utils.crop_screen(screen, box).save(target)
+
+    sidecar = {
+        "source": screenshot.name,
+        "size": [width, height],
+        "box": list(box),
+        **metadata,
+    }
+    target.with_suffix(SIDECAR_SUFFIX).write_text(json.dumps(sidecar, indent=2), encoding="utf-8")
+
+
+def _guides(located_item: LocatedItem) -> dict[str, Any]:
+    return {
+        "start": list(located_item.start),
+        "end": list(located_item.end),
+        "identified": located_item.identified,
+    }
+
+
+class ScreenshotArchive:
+    """Move processed screenshots out of the queue, see the module docstring.
+
+    With `keep_error_frames`, failed screenshots are always kept whole,
+    otherwise they're cropped if the item was located before the failure.
+    """
+
+    def __init__(
+        self,
+        *,
+        mode: str = "full",
+        keep_error_frames: bool = True,
+        done_dir: Path = DONE_DIR,
+        error_dir: Path = ERROR_DIR,
+    ) -> None:
+        if mode not in ARCHIVE_MODES:
+            msg = f"Unknown archive mode: {mode}, expected one of {ARCHIVE_MODES}"
+            raise ValueError(msg)
+
+        self.mode = mode
+        self.keep_error_frames = keep_error_frames
+        self.done_dir = done_dir
+        self.error_dir = error_dir
+
+    def _crop(
+        self,
+        screenshot: Path,
+        target_dir: Path,
+        box: tuple[int, int, int, int],
+        metadata: dict[str, Any],
+    ) -> Path:
+        """Crop a screenshot into target_dir and remove it, fall back to moving it."""
+        target = target_dir / f"{screenshot.stem}.png"
+
+        try:
+            write_crop(screenshot, target, box, metadata)
+        except (OSError, ValueError):
+            logger.exception("Cannot crop {}, keeping the full screenshot", screenshot.name)
+            return self._move(screenshot, target_dir)
+
+        screenshot.unlink()
+
+        return target
+
+    def _move(self, screenshot: Path, target_dir: Path) -> Path:
+        target = target_dir / screenshot.name
+        shutil.move(screenshot, target)
+
+        return target
+
+    def done(
+        self,
+        screenshot: Path,
+        result: MatchResult,
+        located_item: LocatedItem | None = None,
+        box: tuple[int, int, int, int] | None = None,
+    ) -> Path:
+        """Archive a matched screenshot in done/<item>/, return its new path.
+
+        Without the located item and its tooltip box, the full screenshot is kept.
+        """
+        item_folder = self.done_dir / result.item.file
+        item_folder.mkdir(exist_ok=True, parents=True)
+
+        if self.mode == "full" or located_item is None or box is None:
+            return self._move(screenshot, item_folder)
+
+        metadata = {"guides": _guides(located_item), "result": result.as_dict()}
+
+        return self._crop(screenshot, item_folder, box, metadata)
+
+    def error(
+        self,
+        screenshot: Path,
+        error: Exception | None = None,
+        located_item: LocatedItem | None = None,
+        box: tuple[int, int, int, int] | None = None,
+    ) -> Path:
+        """Archive a failed screenshot in errors/, return its new path."""
+        self.error_dir.mkdir(exist_ok=True, parents=True)
+
+        if self.mode == "full" or self.keep_error_frames or located_item is None or box is None:
+            return self._move(screenshot, self.error_dir)
+
+        metadata = {
+            "guides": _guides(located_item),
+            "error": error.__class__.__name__ if error else None,
+            "message": str(error) if error else None,
+        }
+
+        return self._crop(screenshot, self.error_dir, box, metadata)
+
+
+def create_archive(cfg: configparser.ConfigParser) -> ScreenshotArchive:
+    """Create the archive from the [archive] section of config.ini."""
+    mode = cfg.get("archive", "mode", fallback="full")
+
+    if mode not in ARCHIVE_MODES:
+        logger.warning("Unknown archive mode in config.ini: {}, using full", mode)
+        mode = "full"
+
+    return ScreenshotArchive(
+        mode=mode,
+        keep_error_frames=cfg.getboolean("archive", "keep_error_frames", fallback=True),
+    )
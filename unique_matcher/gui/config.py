@@ -11,6 +11,17 @@ from unique_matcher.constants import ROOT_DIR
 CONFIG_TEMPLATE = """[screenshot]
 screen = -1
 shortcut = Win+S
+
+[duplicates]
+enabled = yes
+window = 10
+perceptual = no
+max_distance = 4
+action = record
+
+[archive]
+mode = full
+keep_error_frames = yes
 """
 
 AHK_TEMPLATE = """{{ shortcut }}::
@@ -0,0 +1,180 @@
+"""Module for keeping track of the number of screenshots in the working dirs."""
+
+import json
+import os
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import ClassVar
+
+from loguru import logger
+
+from unique_matcher.constants import COUNTERS_FILE, DONE_DIR, ERROR_DIR, QUEUE_DIR
+from unique_matcher.gui.archive import SIDECAR_SUFFIX
+
+
+def count_files(folder: Path) -> int:
+    """Return the number of screenshots in a folder (0 if it doesn't exist).
+
+    Metadata sidecars of cropped screenshots are not counted.
+    """
+    try:
+        return sum(not name.endswith(SIDECAR_SUFFIX) for name in os.listdir(folder))
+    except FileNotFoundError:
+        return 0
+
+
+def count_done(folder: Path) -> int:
+    """Return the number of screenshots in done/, including the item subfolders."""
+    if not folder.exists():
+        return 0
+
+    total = 0
+
+    for entry in os.scandir(folder):
+        if entry.is_dir():
+            total += count_files(Path(entry.path))
+        elif not entry.name.endswith(SIDECAR_SUFFIX):
+            total += 1
+
+    return total
+
+
+class FileCounters:
+    """In-memory counters of the queue, done and errors folders.
+
+    The counters are updated on every move and saved into an index file,
+    from which they are restored at startup. Because files can be added
+    or removed behind our back, the counters are periodically reconciled
+    with the disk in a background thread.
+    """
+
+    KEYS: ClassVar[list[str]] = ["queue", "done", "errors"]
+
+    def __init__(
+        self,
+        index_file: Path = COUNTERS_FILE,
+        *,
+        queue_dir: Path = QUEUE_DIR,
+        done_dir: Path = DONE_DIR,
+        error_dir: Path = ERROR_DIR,
+    ) -> None:
+        self.index_file = index_file
+        self.queue_dir = queue_dir
+        self.done_dir = done_dir
+        self.error_dir = error_dir
+
+        self._counts: dict[str, int] = dict.fromkeys(self.KEYS, 0)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._reconcile_thread: threading.Thread | None = None
+
+    def __getitem__(self, key: str) -> int:
+        return self._counts[key]
+
+    def load(self) -> None:
+        """Restore the counters from the index file, or scan the disk if there's none."""
+        try:
+            with self.index_file.open(encoding="utf-8") as fread:
+                data = json.load(fread)
+
+            counts = {key: int(data[key]) for key in self.KEYS}
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.info("Counter index missing or invalid, scanning the disk")
+            self.rescan()
+            return
+
+        with self._lock:
+            self._counts = counts
+
+        logger.debug("Loaded counters: {}", counts)
+
+    def save(self) -> None:
+        """Write the counters into the index file."""
+        with self._lock:
+            data = dict(self._counts)
+
+        self.index_file.parent.mkdir(exist_ok=True, parents=True)
+        tmp_file = self.index_file.with_suffix(".tmp")
+
+        with tmp_file.open("w", encoding="utf-8") as fwrite:
+            json.dump(data, fwrite)
+
+        tmp_file.replace(self.index_file)
+
+    def set(self, key: str, value: int) -> bool:
+        """Set a counter to a known value, return True if it changed."""
+        with self._lock:
+            changed = self._counts[key] != value
+            self._counts[key] = value
+            self._generation += 1
+
+        return changed
+
+    def move(self, source: str, target: str) -> None:
+        """Record that one screenshot was moved from source to target."""
+        with self._lock:
+            self._counts[source] = max(self._counts[source] - 1, 0)
+            self._counts[target] += 1
+            self._generation += 1
+
+        self.save()
+
+    def remove(self, source: str) -> None:
+        """Record that one screenshot was deleted from source."""
+        with self._lock:
+            self._counts[source] = max(self._counts[source] - 1, 0)
+            self._generation += 1
+
+        self.save()
+
+    def scan(self) -> dict[str, int]:
+        """Count the screenshots on the disk."""
+        return {
+            "queue": count_files(self.queue_dir),
+            "done": count_done(self.done_dir),
+            "errors": count_files(self.error_dir),
+        }
+
+    def rescan(self) -> bool:
+        """Replace the counters with a fresh scan, return True if anything changed."""
+        with self._lock:
+            generation = self._generation
+
+        counts = self.scan()
+
+        with self._lock:
+            if generation != self._generation:
+                # A move happened during the scan, so the scan may already
+                # be outdated. Keep the in-memory values, next reconcile
+                # will take care of the drift.
+                logger.debug("Counters changed during reconcile, skipping")
+                return False
+
+            changed = counts != self._counts
+            self._counts = counts
+
+        if changed:
+            logger.info("Reconciled counters: {}", counts)
+
+        self.save()
+
+        return changed
+
+    def reconcile_in_background(self, on_changed: Callable[[], None] | None = None) -> None:
+        """Rescan the disk in a background thread and call on_changed if there was a drift."""
+        if self._reconcile_thread is not None and self._reconcile_thread.is_alive():
+            return
+
+        def _reconcile() -> None:
+            try:
+                changed = self.rescan()
+            except OSError:
+                logger.exception("Cannot reconcile counters")
+                return
+
+            if changed and on_changed is not None:
+                on_changed()
+
+        self._reconcile_thread = threading.Thread(target=_reconcile, daemon=True)
+        self._reconcile_thread.start()
@@ -0,0 +1,210 @@
+"""Module for detecting duplicate screenshots in the queue.
+
+Pressing the capture hotkey twice, or capturing the same tooltip again,
+puts several copies of one drop into the queue. Every new screenshot is
+fingerprinted by the hash of its content. A screenshot with the same
+content as one taken within the time window is a duplicate and is
+resolved with the result of the original, without running OCR and
+matching again.
+
+Optionally (`perceptual`), screenshots whose perceptual difference hash
+(dHash) of the whole frame is close enough are duplicates too, which
+survives recompression and small changes like a moved cursor. It's off
+by default: the tooltip is a small part of the frame, so two different
+items captured in the same inventory slot can have nearly the same
+dHash, and a duplicate is never added to the results.
+"""
+
+import configparser
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from unique_matcher.matcher import frames, utils
+from unique_matcher.matcher.result import LocatedItem, MatchResult
+
+# Screenshots taken within this many seconds can be duplicates
+DUPLICATE_WINDOW = 10.0
+
+# Size of the difference hash, it has DHASH_SIZE^2 bits
+DHASH_SIZE = 16
+
+# Maximum number of differing dHash bits of two duplicates
+DHASH_MAX_DISTANCE = 4
+
+# What to do with duplicates:
+# - record: show them and move them next to the original, but don't count them
+# - discard: delete them
+DUPLICATE_ACTIONS = ["record", "discard"]
+
+
+def dhash(image: np.ndarray, size: int = DHASH_SIZE) -> int:
+    """Return the difference hash of a grayscale image.
+
+    Every bit says whether a pixel of the downscaled image
+    is brighter than its right neighbour.
+    """
+    small = cv2.resize(image, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+@dataclass
+class ScreenshotFingerprint:
+    """Content hash, perceptual hash and capture time of a screenshot.
+
+    `dhash` is None if the screenshot was fingerprinted without it.
+    """
+
+    sha256: str
+    dhash: int | None
+    timestamp: float
+
+    def matches(self, other: "ScreenshotFingerprint", max_distance: int) -> bool:
+        """Return True if the screenshots have the same content or look the same."""
+        if self.sha256 == other.sha256:
+            return True
+
+        if self.dhash is None or other.dhash is None:
+            return False
+
+        return (self.dhash ^ other.dhash).bit_count() <= max_distance
+
+
+def fingerprint_screenshot(file: Path, *, perceptual: bool = False) -> ScreenshotFingerprint:
+    """Fingerprint a screenshot file, the capture time is its mtime.
+
+    The screenshot is only decoded for the dHash, with `perceptual`.
+    """
+    data = file.read_bytes()
+    sha256 = hashlib.sha256(data).hexdigest()
+    timestamp = file.stat().st_mtime
+
+    if not perceptual:
+        return ScreenshotFingerprint(sha256=sha256, dhash=None, timestamp=timestamp)
+
+    if frames.is_raw_frame(data):
+        gray = utils.screen_to_gray(frames.parse_raw_frame(np.frombuffer(data, dtype=np.uint8)))
+    else:
+        gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+
+    if gray is None:
+        msg = f"Cannot decode screenshot: {file}"
+        raise ValueError(msg)
+
+    return ScreenshotFingerprint(sha256=sha256, dhash=dhash(gray), timestamp=timestamp)
+
+
+@dataclass
+class Original:
+    """A screenshot that duplicates are resolved with.
+
+    `done` is set when its matching finished, `result` is None if it failed.
+    `located` and `box` (see ScreenshotArchive) are set if the item was
+    located, duplicates are archived with them.
+    """
+
+    file: str
+    fingerprint: ScreenshotFingerprint
+    done: bool = False
+    result: MatchResult | None = None
+    located: LocatedItem | None = None
+    box: tuple[int, int, int, int] | None = None
+
+
+class DuplicateDetector:
+    """Recent screenshots of the queue, see the module docstring."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        enabled: bool = True,
+        window: float = DUPLICATE_WINDOW,
+        perceptual: bool = False,
+        max_distance: int = DHASH_MAX_DISTANCE,
+        action: str = "record",
+    ) -> None:
+        if action not in DUPLICATE_ACTIONS:
+            msg = f"Unknown duplicate action: {action}, expected one of {DUPLICATE_ACTIONS}"
+            raise ValueError(msg)
+
+        self.enabled = enabled
+        self.window = window
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.action = action
+        self._originals: dict[str, Original] = {}
+
+    def _expire(self, timestamp: float) -> None:
+        """Forget finished originals that are out of the window of a new screenshot.
+
+        Screenshots come in roughly in the order they were taken,
+        even when the queue is processed long after.
+        """
+        for file, original in list(self._originals.items()):
+            if original.done and timestamp - original.fingerprint.timestamp > self.window:
+                del self._originals[file]
+
+    def _matches(self, fingerprint: ScreenshotFingerprint, other: ScreenshotFingerprint) -> bool:
+        if self.perceptual:
+            return fingerprint.matches(other, self.max_distance)
+
+        return fingerprint.sha256 == other.sha256
+
+    def check(self, file: str, fingerprint: ScreenshotFingerprint) -> Original | None:
+        """Return the original of a duplicate screenshot.
+
+        Screenshots that are not duplicates become originals
+        and None is returned.
+        """
+        self._expire(fingerprint.timestamp)
+
+        if file in self._originals:
+            # Submitted again after an error
+            return None
+
+        for original in self._originals.values():
+            in_window = abs(fingerprint.timestamp - original.fingerprint.timestamp) <= self.window
+
+            if in_window and self._matches(fingerprint, original.fingerprint):
+                return original
+
+        self._originals[file] = Original(file, fingerprint)
+
+        return None
+
+    def resolve(
+        self,
+        file: str,
+        result: MatchResult | None,
+        located_item: LocatedItem | None = None,
+        box: tuple[int, int, int, int] | None = None,
+    ) -> None:
+        """Store the result of an original screenshot, None if it failed."""
+        if (original := self._originals.get(file)) is not None:
+            original.done = True
+            original.result = result
+            original.located = located_item
+            original.box = box
+
+
+def create_detector(cfg: configparser.ConfigParser) -> DuplicateDetector:
+    """Create the detector from the [duplicates] section of config.ini."""
+    action = cfg.get("duplicates", "action", fallback="record")
+
+    if action not in DUPLICATE_ACTIONS:
+        logger.warning("Unknown duplicate action in config.ini: {}, using record", action)
+        action = "record"
+
+    return DuplicateDetector(
+        enabled=cfg.getboolean("duplicates", "enabled", fallback=True),
+        window=cfg.getfloat("duplicates", "window", fallback=DUPLICATE_WINDOW),
+        perceptual=cfg.getboolean("duplicates", "perceptual", fallback=False),
+        max_distance=cfg.getint("duplicates", "max_distance", fallback=DHASH_MAX_DISTANCE),
+        action=action,
+    )
@@ -0,0 +1,182 @@
+"""Module for the SQLite history of all match results."""
+
+import csv
+import sqlite3
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from loguru import logger
+
+from unique_matcher.constants import HISTORY_DB
+from unique_matcher.gui.manifest import read_result_csv
+from unique_matcher.matcher.result import MatchResult
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    source TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    session TEXT NOT NULL REFERENCES sessions (name),
+    item TEXT NOT NULL,
+    base TEXT,
+    matched_by TEXT,
+    identified INTEGER,
+    min_val REAL,
+    hist_val REAL,
+    count INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS idx_matches_session_item ON matches (session, item, count);
+CREATE INDEX IF NOT EXISTS idx_matches_timestamp ON matches (timestamp);
+"""
+
+
+class ResultHistory:
+    """Store every match result in an SQLite DB.
+
+    Sessions are named after the result CSVs (without the suffix),
+    so their names sort chronologically. Legacy CSVs, which only
+    have item counts, are imported as one row per item with `count` set.
+    """
+
+    SOURCE_LIVE = "live"
+    SOURCE_CSV = "csv"
+
+    def __init__(self, db_file: Path = HISTORY_DB) -> None:
+        db_file.parent.mkdir(exist_ok=True, parents=True)
+
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the DB connection."""
+        self.conn.close()
+
+    def start_session(self, session: str, source: str = SOURCE_LIVE) -> None:
+        """Register a new session."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO sessions (name, source) VALUES (?, ?)",
+                (session, source),
+            )
+
+    def has_session(self, session: str) -> bool:
+        """Return True if the session is already in the DB."""
+        cur = self.conn.execute("SELECT 1 FROM sessions WHERE name = ?", (session,))
+        return cur.fetchone() is not None
+
+    def sessions(self) -> list[str]:
+        """Return all session names, oldest first."""
+        return [row[0] for row in self.conn.execute("SELECT name FROM sessions ORDER BY name")]
+
+    def record(self, session: str, result: MatchResult, timestamp: float | None = None) -> None:
+        """Record one match result."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO matches"
+                " (timestamp, session, item, base, matched_by, identified, min_val, hist_val)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time() if timestamp is None else timestamp,
+                    session,
+                    result.item.name,
+                    result.item.base,
+                    result.matched_by.name,
+                    result.identified,
+                    result.min_val,
+                    result.hist_val,
+                ),
+            )
+
+    def import_csv(self, file: Path, *, replace: bool = False) -> None:
+        """Import a legacy result CSV (item,count) as a session.
+
+        If the session already exists, it is skipped, unless replace is True.
+        """
+        if self.has_session(file.stem) and not replace:
+            return
+
+        self.import_counts(file.stem, read_result_csv(file), file.stat().st_mtime)
+
+    def import_counts(self, session: str, counts: dict[str, int], timestamp: float) -> None:
+        """Import item counts as a session, replacing it if it exists."""
+        with self.conn:
+            self.conn.execute("DELETE FROM matches WHERE session = ?", (session,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions (name, source) VALUES (?, ?)",
+                (session, self.SOURCE_CSV),
+            )
+            self.conn.executemany(
+                "INSERT INTO matches (timestamp, session, item, count) VALUES (?, ?, ?, ?)",
+                [(timestamp, session, item, count) for item, count in counts.items()],
+            )
+
+        logger.debug("Imported {} items into session {}", len(counts), session)
+
+    def aggregate(
+        self,
+        sessions: Iterable[str] | None = None,
+        *,
+        first: str | None = None,
+        last: str | None = None,
+    ) -> list[dict[str, str | int]]:
+        """Return item counts over sessions, sorted by count.
+
+        Either pass an explicit list of sessions, or a range of
+        session names (first and last are inclusive), or both.
+        """
+        conditions = []
+        params: list[str] = []
+
+        if sessions is not None:
+            session_list = list(sessions)
+
+            if not session_list:
+                return []
+
+            conditions.append(f"session IN ({', '.join('?' * len(session_list))})")
+            params.extend(session_list)
+
+        if first is not None:
+            conditions.append("session >= ?")
+            params.append(first)
+
+        if last is not None:
+            conditions.append("session <= ?")
+            params.append(last)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cur = self.conn.execute(
+            f"SELECT item, SUM(count) AS total FROM matches {where}"  # noqa: S608
+            " GROUP BY item ORDER BY total DESC, item",
+            params,
+        )
+
+        return [{"item": item, "count": count} for item, count in cur]
+
+    def export_csv(
+        self,
+        output: Path,
+        sessions: Iterable[str] | None = None,
+        *,
+        first: str | None = None,
+        last: str | None = None,
+    ) -> None:
+        """Write aggregated results into a CSV in the legacy format."""
+        rows = self.aggregate(sessions, first=first, last=last)
+
+        with output.open("w", newline="", encoding="utf-8") as fwrite:
+            writer = csv.DictWriter(fwrite, ["item", "count"])
+            writer.writeheader()
+
+            for row in rows:
+                writer.writerow(row)
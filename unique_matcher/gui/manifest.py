@@ -0,0 +1,132 @@
+"""Module for caching information about the result CSVs."""
+
+import csv
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from loguru import logger
+
+from unique_matcher.constants import RESULT_DIR, RESULT_MANIFEST
+
+
+@dataclass
+class ManifestEntry:
+    """Cached information about one result CSV."""
+
+    size: int
+    mtime_ns: int
+    rows: int = 0
+    total: int = 0
+    counts: dict[str, int] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        """Return True if the CSV has no results."""
+        return self.rows == 0
+
+
+def read_result_csv(file: Path) -> dict[str, int]:
+    """Read a result CSV into a dict of item counts."""
+    try:
+        with open(file, newline="", encoding="utf-8") as fread:
+            return {row["item"]: int(row["count"]) for row in csv.DictReader(fread)}
+    except UnicodeDecodeError:
+        # Using default platform encoding
+        # TODO: Remove one day
+        with open(file, newline="") as fread:
+            return {row["item"]: int(row["count"]) for row in csv.DictReader(fread)}
+
+
+class ResultManifest:
+    """Manifest of the result CSVs, keyed by file name.
+
+    Each entry is validated by the file size and mtime, so a scan
+    only parses CSVs that were added or changed since the last one.
+    """
+
+    def __init__(
+        self,
+        manifest_file: Path = RESULT_MANIFEST,
+        result_dir: Path = RESULT_DIR,
+    ) -> None:
+        self.manifest_file = manifest_file
+        self.result_dir = result_dir
+        self.entries: dict[str, ManifestEntry] = {}
+
+        self.load()
+
+    def load(self) -> None:
+        """Load the manifest from the disk."""
+        try:
+            with self.manifest_file.open(encoding="utf-8") as fread:
+                data = json.load(fread)
+
+            self.entries = {name: ManifestEntry(**entry) for name, entry in data.items()}
+        except (OSError, ValueError, TypeError):
+            self.entries = {}
+
+    def save(self) -> None:
+        """Write the manifest to the disk."""
+        self.manifest_file.parent.mkdir(exist_ok=True, parents=True)
+        tmp_file = self.manifest_file.with_suffix(".tmp")
+
+        with tmp_file.open("w", encoding="utf-8") as fwrite:
+            json.dump({name: asdict(entry) for name, entry in self.entries.items()}, fwrite)
+
+        tmp_file.replace(self.manifest_file)
+
+    def _refresh(self, name: str, stat: os.stat_result) -> bool:
+        """Re-read the CSV if it changed, return True if it did."""
+        entry = self.entries.get(name)
+
+        if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return False
+
+        counts = read_result_csv(self.result_dir / name)
+
+        self.entries[name] = ManifestEntry(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            rows=len(counts),
+            total=sum(counts.values()),
+            counts=counts,
+        )
+
+        return True
+
+    def scan(self) -> dict[str, ManifestEntry]:
+        """Update the manifest from the result dir and return all entries."""
+        changed = False
+        seen = set()
+
+        self.result_dir.mkdir(exist_ok=True, parents=True)
+
+        for dir_entry in os.scandir(self.result_dir):
+            if not dir_entry.name.endswith(".csv") or not dir_entry.is_file():
+                continue
+
+            seen.add(dir_entry.name)
+            changed |= self._refresh(dir_entry.name, dir_entry.stat())
+
+        for name in set(self.entries) - seen:
+            del self.entries[name]
+            changed = True
+
+        if changed:
+            logger.debug("Result manifest updated")
+            self.save()
+
+        return dict(self.entries)
+
+    def get(self, file: str) -> ManifestEntry:
+        """Return the entry of one CSV, re-reading it only if it changed."""
+        if self._refresh(file, (self.result_dir / file).stat()):
+            self.save()
+
+        return self.entries[file]
+
+    def forget(self, file: str) -> None:
+        """Remove a deleted file from the manifest."""
+        if self.entries.pop(file, None):
+            self.save()
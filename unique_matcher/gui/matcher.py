@@ -1,16 +1,35 @@
 """QML object to handle the matching."""
 
 import os
-import shutil
+from pathlib import Path
 
 from loguru import logger
-from PySide6.QtCore import Property, QObject, QTimer, Signal, Slot
-
-from unique_matcher.constants import DONE_DIR, ERROR_DIR, QUEUE_DIR, RESULT_DIR
+from PySide6.QtCore import Property, QCoreApplication, QObject, QTimer, Signal, Slot
+
+from unique_matcher.constants import METRICS_FILE, OPT_METRICS, QUEUE_DIR, RESULT_DIR
+from unique_matcher.gui.archive import CROP_PADDING, create_archive
+from unique_matcher.gui.config import load_config
+from unique_matcher.gui.counters import FileCounters
+from unique_matcher.gui.duplicates import (
+    Original,
+    ScreenshotFingerprint,
+    create_detector,
+    fingerprint_screenshot,
+)
+from unique_matcher.gui.history import ResultHistory
+from unique_matcher.gui.manifest import ResultManifest
 from unique_matcher.gui.results import ResultFile
+from unique_matcher.matcher import metrics
 from unique_matcher.matcher.exceptions import BaseUMError
 from unique_matcher.matcher.matcher import Matcher
-from unique_matcher.matcher.utils import is_csv_empty
+from unique_matcher.matcher.pipeline import Pipeline
+from unique_matcher.matcher.result import BatchResult
+
+# How often to check the counters against the disk (ms)
+RECONCILE_INTERVAL = 60_000
+
+# How often to write the current results into the CSV (ms)
+RESULT_FLUSH_INTERVAL = 5_000
 
 
 class QmlMatcher(QObject):
@@ -28,17 +47,62 @@ class QmlMatcher(QObject):
         # because the QML object try to access it on launch already
         self.matcher = Matcher()
 
+        self.counters = FileCounters()
+        self.counters.load()
+
         QObject.__init__(self)
 
         self.result_file = ResultFile()
         self.result_file.new()
+
+        self.history = ResultHistory()
+        self.history.start_session(self.result_file.session)
+
+        self.manifest = ResultManifest()
+
         self._cnt = 1
 
+        # Screenshots are matched in worker threads, the results
+        # are picked up by the timer in the main thread
+        self.pipeline = Pipeline(self.matcher)
+        self._in_flight: set[str] = set()
+
+        cfg = load_config()
+        self.duplicates = create_detector(cfg)
+        self.archive = create_archive(cfg)
+
+        # Duplicates waiting for their original to be done
+        self._duplicates: dict[str, Original] = {}
+
+        # Fingerprints of queued screenshots that wait for the pipeline
+        self._fingerprints: dict[str, ScreenshotFingerprint] = {}
+
         self.timer = QTimer()
         self.timer.timeout.connect(self.process_next)
         self.timer.setInterval(250)
         self.timer.start()
 
+        self.reconcile_timer = QTimer()
+        self.reconcile_timer.timeout.connect(self.reconcile_counters)
+        self.reconcile_timer.setInterval(RECONCILE_INTERVAL)
+        self.reconcile_timer.start()
+
+        self.flush_timer = QTimer()
+        self.flush_timer.timeout.connect(self.result_file.flush)
+        self.flush_timer.setInterval(RESULT_FLUSH_INTERVAL)
+        self.flush_timer.start()
+
+        if OPT_METRICS:
+            metrics.REGISTRY.start_writer(METRICS_FILE)
+
+        if app := QCoreApplication.instance():
+            app.aboutToQuit.connect(self.result_file.close)
+            app.aboutToQuit.connect(self.history.close)
+            app.aboutToQuit.connect(metrics.REGISTRY.stop_writer)
+
+        # The index may be outdated if the files were touched while the app was closed
+        self.reconcile_counters()
+
         self._errors: list[str] = []
 
     @Property(int, notify=items_changed)  # type: ignore[operator, arg-type]
@@ -49,36 +113,155 @@ class QmlMatcher(QObject):
     @Property(int, notify=queue_length_changed)  # type: ignore[operator, arg-type]
     def queue_length(self) -> int:
         """Return the size of the queue."""
-        return len(os.listdir(QUEUE_DIR))
+        return self.counters["queue"]
 
     @Property(int, notify=processed_length_changed)  # type: ignore[operator, arg-type]
     def processed_length(self) -> int:
         """Return the number of processed screenshots."""
-        inside_folders = sum(
-            len(os.listdir(DONE_DIR / item)) for item in DONE_DIR.iterdir() if item.is_dir()
-        )
-        in_root = len([file for file in DONE_DIR.iterdir() if file.is_file()])
-
-        return inside_folders + in_root
+        return self.counters["done"]
 
     @Property(int, notify=errors_length_changed)  # type: ignore[operator, arg-type]
     def errors_length(self) -> int:
         """Return the number of errors."""
-        return len(os.listdir(ERROR_DIR))
+        return self.counters["errors"]
+
+    @Slot()
+    def reconcile_counters(self) -> None:
+        """Check the counters against the disk in the background."""
+        self.counters.reconcile_in_background(self._emit_counters_changed)
+
+    def _emit_counters_changed(self) -> None:
+        self.queue_length_changed.emit()
+        self.processed_length_changed.emit()
+        self.errors_length_changed.emit()
 
     @Slot()
     def process_next(self) -> None:
-        """Process one screenshot."""
-        if len(os.listdir(QUEUE_DIR)) == 0:
-            return
+        """Feed new screenshots into the pipeline and handle the finished ones."""
+        queue = os.listdir(QUEUE_DIR)
+
+        if self.counters.set("queue", len(queue)):
+            self.queue_length_changed.emit()
+
+        for file in self._fingerprints.keys() - set(queue):
+            # Removed from the queue while waiting
+            del self._fingerprints[file]
+
+        for file in sorted(queue):
+            if file in self._in_flight:
+                continue
+
+            if self._is_duplicate(file):
+                # Resolved with the result of the original
+                self._in_flight.add(file)
+                self._fingerprints.pop(file, None)
+                continue
+
+            if not self.pipeline.submit(QUEUE_DIR / file, block=False):
+                # The pipeline is full, the rest will be added later
+                break
+
+            self._in_flight.add(file)
+            self._fingerprints.pop(file, None)
+
+        for batch_result in self.pipeline.completed():
+            self._handle_result(batch_result)
+
+        self._handle_duplicates()
+
+    def _is_duplicate(self, file: str) -> bool:
+        """Check if a new screenshot duplicates a recent one, see DuplicateDetector."""
+        if not self.duplicates.enabled:
+            return False
+
+        # A screenshot that waits for a full pipeline is checked on every tick
+        if (fingerprint := self._fingerprints.get(file)) is None:
+            try:
+                fingerprint = fingerprint_screenshot(
+                    QUEUE_DIR / file,
+                    perceptual=self.duplicates.perceptual,
+                )
+            except (OSError, ValueError):
+                # The matching will report the broken screenshot
+                return False
+
+            self._fingerprints[file] = fingerprint
+
+        if (original := self.duplicates.check(file, fingerprint)) is None:
+            return False
+
+        logger.info("Screenshot {} is a duplicate of {}", file, original.file)
+        self._duplicates[file] = original
+
+        return True
+
+    def _handle_duplicates(self) -> None:
+        """Record or discard the duplicates whose original is done.
+
+        Duplicates are never added to the results, so one drop is counted once.
+        They're archived like their original, cropped by its tooltip box in the crop mode.
+        """
+        for file, original in list(self._duplicates.items()):
+            if not original.done:
+                continue
+
+            del self._duplicates[file]
+            self._in_flight.discard(file)
+
+            if self.duplicates.action == "discard":
+                logger.info("Discarding duplicate screenshot {}", file)
+                (QUEUE_DIR / file).unlink(missing_ok=True)
+                self.counters.remove("queue")
+            elif (result := original.result) is not None:
+                self.newResult.emit(
+                    {
+                        "n": self._cnt,
+                        "item": result.item.name,
+                        "base": result.item.base,
+                        "matched_by": "Duplicate",
+                    },
+                )
+                self._cnt += 1
+
+                self.archive.done(QUEUE_DIR / file, result, original.located, original.box)
+                self.counters.move("queue", "done")
+                self.processed_length_changed.emit()
+            else:
+                self.newResult.emit(
+                    {
+                        "n": self._cnt,
+                        "item": "Error",
+                        "base": "-",
+                        "matched_by": "Duplicate",
+                    },
+                )
+                self._cnt += 1
+
+                self.archive.error(QUEUE_DIR / file, None, original.located, original.box)
+                self.counters.move("queue", "errors")
+                self.errors_length_changed.emit()
 
-        self.timer.stop()  # This is basically a lock
-        file = sorted(os.listdir(QUEUE_DIR))[0]
+            self.queue_length_changed.emit()
 
-        try:
-            result = self.matcher.find_item(QUEUE_DIR / file)
+    def _tooltip_box(self, batch_result: BatchResult) -> tuple[int, int, int, int] | None:
+        """Return the box of the cropped screenshot in done/ or errors/, if located."""
+        if batch_result.located is None:
+            return None
 
+        return self.matcher.tooltip_box(batch_result.located, CROP_PADDING)
+
+    def _handle_result(self, batch_result: BatchResult) -> None:
+        """Record the result of one screenshot and move it out of the queue."""
+        file = Path(str(batch_result.screenshot)).name
+        self._in_flight.discard(file)
+
+        located_item = batch_result.located
+        box = self._tooltip_box(batch_result)
+
+        if (result := batch_result.result) is not None:
+            self.duplicates.resolve(file, result, located_item, box)
             self.result_file.add(result)
+            self.history.record(self.result_file.session, result)
 
             self.newResult.emit(
                 {
@@ -91,12 +274,16 @@ class QmlMatcher(QObject):
             self._cnt += 1
 
             # Sort items in done/<item>/...
-            item_folder = DONE_DIR.joinpath(result.item.file)
-            item_folder.mkdir(exist_ok=True, parents=True)
-
-            shutil.move(QUEUE_DIR / file, item_folder / file)
+            self.archive.done(
+                QUEUE_DIR / file,
+                result,
+                located_item,
+                box,
+            )
+            self.counters.move("queue", "done")
             self.processed_length_changed.emit()
-        except BaseUMError as e:
+        elif isinstance(e := batch_result.error, BaseUMError):
+            self.duplicates.resolve(file, None, located_item, box)
             self.newResult.emit(
                 {
                     "n": self._cnt,
@@ -107,40 +294,53 @@ class QmlMatcher(QObject):
             )
             self._cnt += 1
 
-            shutil.move(QUEUE_DIR / file, ERROR_DIR / file)
+            self.archive.error(
+                QUEUE_DIR / file,
+                e,
+                located_item,
+                box,
+            )
+            self.counters.move("queue", "errors")
             self.errors_length_changed.emit()
-            logger.exception("Error during processing: {}", str(e))
-        except Exception as e:
-            if file in self._errors:
-                # If the file already failed once to process,
-                # mark it as failed and move to errors folder.
-                self.newResult.emit(
-                    {
-                        "n": self._cnt,
-                        "item": "Error",
-                        "base": "-",
-                        "matched_by": "Unexpected error",
-                    },
-                )
-                self._cnt += 1
+            logger.error("Error during processing: {}", str(e))
+        elif file in self._errors:
+            # If the file already failed once to process,
+            # mark it as failed and move to errors folder.
+            self.duplicates.resolve(file, None, located_item, box)
+            self.newResult.emit(
+                {
+                    "n": self._cnt,
+                    "item": "Error",
+                    "base": "-",
+                    "matched_by": "Unexpected error",
+                },
+            )
+            self._cnt += 1
 
-                shutil.move(QUEUE_DIR / file, ERROR_DIR / file)
-                self.errors_length_changed.emit()
-                logger.exception("Unexpected error during processing: {}", str(e))
+            self.archive.error(
+                QUEUE_DIR / file,
+                e,
+                located_item,
+                box,
+            )
+            self.counters.move("queue", "errors")
+            self.errors_length_changed.emit()
+            logger.error("Unexpected error during processing: {}", str(e))
 
-                # No need to store them forever
-                self._errors.remove(file)
-            else:
-                logger.error("Couldn't read file {}, retrying", file)
-                self._errors.append(file)
+            # No need to store them forever
+            self._errors.remove(file)
+        else:
+            # Not in flight anymore, so it will be submitted again
+            logger.error("Couldn't read file {}, retrying", file)
+            self._errors.append(file)
 
         self.queue_length_changed.emit()
-        self.timer.start()
 
     @Slot()
     def snapshot(self) -> None:
         """Create a new snapshot."""
         self.result_file.snapshot()
+        self.history.start_session(self.result_file.session)
 
     @Slot()
     def reset_result_counter(self) -> None:
@@ -152,17 +352,18 @@ class QmlMatcher(QObject):
         """Remove empty CSVs."""
         logger.debug("Running cleanup")
 
-        for file in RESULT_DIR.iterdir():
+        for file, entry in self.manifest.scan().items():
             if RESULT_DIR / file == self.result_file.current_file:
                 # Do not delete the currently used file
                 # This is also the reason why cleanup is here
                 # and not in utils, because we have access to result_file
                 continue
 
-            if is_csv_empty(RESULT_DIR / file):
-                logger.debug("Deleting empty CSV: {}", file.name)
+            if entry.is_empty():
+                logger.debug("Deleting empty CSV: {}", file)
 
                 try:
                     os.remove(RESULT_DIR / file)
+                    self.manifest.forget(file)
                 except OSError:
-                    logger.error("Cannot delete empty CSV: {}", file.name)
+                    logger.error("Cannot delete empty CSV: {}", file)
@@ -1,6 +1,5 @@
 """Module for combining the result CSVs in QML."""
 
-import csv
 import sys
 from pathlib import Path
 
@@ -8,7 +7,8 @@ from loguru import logger
 from PySide6.QtCore import QObject, Signal, Slot
 
 from unique_matcher.constants import RESULT_DIR
-from unique_matcher.matcher.utils import is_csv_empty
+from unique_matcher.gui.history import ResultHistory
+from unique_matcher.gui.manifest import ResultManifest
 
 
 class QmlResultCombinator(QObject):
@@ -21,46 +21,35 @@ class QmlResultCombinator(QObject):
     def __init__(self) -> None:
         QObject.__init__(self)
 
+        self.history = ResultHistory()
+        self.manifest = ResultManifest()
+
     def get_combined_results(self, files: list[str]) -> list[dict[str, str | int]]:
         """Get a list of combined results, sorted by count."""
-        combined: dict[str, int] = {}
+        sessions = []
 
         for file in files:
-            try:
-                with open(RESULT_DIR / file, newline="", encoding="utf-8") as fread:
-                    reader = csv.DictReader(fread)
-
-                    for item in reader:
-                        combined.setdefault(item["item"], 0)
-                        combined[item["item"]] += int(item["count"])
-            except UnicodeDecodeError:
-                # TODO: Remove one day
-                with open(RESULT_DIR / file, newline="") as fread:
-                    reader = csv.DictReader(fread)
-
-                    for item in reader:
-                        combined.setdefault(item["item"], 0)
-                        combined[item["item"]] += int(item["count"])
-
-        return [
-            {"item": v[0], "count": v[1]}
-            for v in sorted(
-                combined.items(),
-                key=lambda x: x[1],
-                reverse=True,
-            )
-        ]
+            path = RESULT_DIR / file
+
+            # Legacy CSVs created before the history DB are imported once
+            if not self.history.has_session(path.stem):
+                entry = self.manifest.get(file)
+                self.history.import_counts(path.stem, entry.counts, entry.mtime_ns / 1e9)
+
+            sessions.append(path.stem)
+
+        return self.history.aggregate(sessions)
 
     @Slot()
     def load_results(self) -> None:
         """Load CSV list."""
         files = []
 
-        for n, file in enumerate(sorted(RESULT_DIR.iterdir())):
-            if is_csv_empty(RESULT_DIR / file):
+        for n, (file, entry) in enumerate(sorted(self.manifest.scan().items())):
+            if entry.is_empty():
                 continue
 
-            row = {"n": n, "checked": False, "file": file.name}
+            row = {"n": n, "checked": False, "file": file}
             files.append(row)
 
         logger.debug("Loaded {} result CSVs", len(files))
@@ -72,17 +61,11 @@ class QmlResultCombinator(QObject):
         """Load a preview of one CSV."""
         logger.debug("Loading preview for {}", file)
 
-        try:
-            with open(RESULT_DIR / file, newline="", encoding="utf-8") as fread:
-                reader = csv.DictReader(fread)
-
-                self.previewLoaded.emit(list(reader))
-        except UnicodeDecodeError:
-            # TODO: Remove one day
-            with open(RESULT_DIR / file, newline="") as fread:
-                reader = csv.DictReader(fread)
+        entry = self.manifest.get(file)
 
-                self.previewLoaded.emit(list(reader))
+        self.previewLoaded.emit(
+            [{"item": item, "count": str(count)} for item, count in entry.counts.items()],
+        )
 
     @Slot(list)
     def combine_results(self, files: list[str]) -> None:
@@ -101,11 +84,7 @@ class QmlResultCombinator(QObject):
 
         logger.info("Saving combined CSV into {}", str(output_path))
 
-        combined_results = self.get_combined_results(files)
-
-        with output_path.open("w", newline="", encoding="utf-8") as fwrite:
-            writer = csv.DictWriter(fwrite, ["item", "count"])
-            writer.writeheader()
+        # Make sure all the files are imported
+        self.get_combined_results(files)
 
-            for row in combined_results:
-                writer.writerow(row)
+        self.history.export_csv(output_path, [Path(file).stem for file in files])
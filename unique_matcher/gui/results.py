@@ -1,75 +1,155 @@
 """Module for handling the result CSV files from GUI."""
 
 import csv
+import os
 import time
-from typing import TYPE_CHECKING, ClassVar
-
-if TYPE_CHECKING:
-    from pathlib import Path
+from pathlib import Path
+from typing import ClassVar, TextIO
 
 from loguru import logger
 
 from unique_matcher.constants import RESULT_DIR
 from unique_matcher.matcher.matcher import MatchResult
 
+# Number of journal entries written before forcing them to the disk
+JOURNAL_SYNC_EVERY = 16
+
 
 class ResultFile:
-    """Handle writing results."""
+    """Handle writing results.
+
+    The counts are kept in memory and every result is appended
+    to a journal next to the CSV. The sorted CSV itself is only
+    written on flush (timer), snapshot and close. If the app crashes,
+    the journal is replayed into the CSV on next start.
+    """
 
     HEADER: ClassVar[list[str]] = [
         "item",
         "count",
     ]
+    JOURNAL_SUFFIX = ".journal"
 
     def __init__(self) -> None:
         self.current_file: Path | None = None
+        self._data: dict[str, int] = {}
+        self._journal: TextIO | None = None
+        self._unsynced = 0
+        self._dirty = False
+
         RESULT_DIR.mkdir(exist_ok=True, parents=True)
 
-    def new(self) -> None:
-        """Create a new CSV."""
-        filename = RESULT_DIR / f"{time.strftime('%Y-%m-%d-%H-%M-%S')}.csv"
-        self.current_file = filename
+        self.recover()
 
-        with open(filename, "w", newline="", encoding="utf-8") as fwrite:
-            writer = csv.DictWriter(fwrite, self.HEADER)
-            writer.writeheader()
+    def recover(self) -> None:
+        """Replay journals left over from an unclean exit into their CSVs."""
+        for journal in sorted(RESULT_DIR.glob(f"*{self.JOURNAL_SUFFIX}")):
+            if self.current_file and journal == self._journal_path(self.current_file):
+                continue
 
-        logger.info("Created new result CSV: {}", self.current_file)
+            data = self._replay(journal)
+            self._save(journal.with_suffix(".csv"), data)
+            journal.unlink()
 
-    def _load(self) -> dict[str, int]:
-        """Load data from current CSV."""
-        logger.debug("Loading CSV")
+            logger.warning("Recovered {} results from {}", sum(data.values()), journal.name)
 
+    @property
+    def session(self) -> str:
+        """Return the name of the current session."""
         if not self.current_file:
             raise ValueError
 
-        with open(self.current_file, newline="", encoding="utf-8") as fread:
-            reader = csv.DictReader(fread)
+        return self.current_file.stem
+
+    def _journal_path(self, file: Path) -> Path:
+        return file.with_suffix(self.JOURNAL_SUFFIX)
+
+    def _replay(self, journal: Path) -> dict[str, int]:
+        """Count the items recorded in a journal."""
+        data: dict[str, int] = {}
+
+        with journal.open(encoding="utf-8") as fread:
+            for line in fread:
+                # An incomplete last line means we crashed mid-write
+                if not line.endswith("\n"):
+                    break
 
-            return {row["item"]: int(row["count"]) for row in reader}
+                data.setdefault(line[:-1], 0)
+                data[line[:-1]] += 1
 
-    def _save(self, data: dict[str, int]) -> None:
-        """Write data into current CSV."""
+        return data
+
+    def _save(self, file: Path, data: dict[str, int]) -> None:
+        """Write data into a CSV, sorted by count."""
         logger.debug("Writing CSV")
 
-        if not self.current_file:
-            raise ValueError
+        tmp_file = file.with_suffix(".tmp")
 
-        with open(self.current_file, "w", newline="", encoding="utf-8") as fwrite:
+        with tmp_file.open("w", newline="", encoding="utf-8") as fwrite:
             writer = csv.DictWriter(fwrite, self.HEADER)
             writer.writeheader()
 
             for item, count in sorted(data.items(), key=lambda v: v[1], reverse=True):
                 writer.writerow({"item": item, "count": str(count)})
 
+        tmp_file.replace(file)
+
+    def new(self) -> None:
+        """Create a new CSV."""
+        self.close()
+
+        filename = RESULT_DIR / f"{time.strftime('%Y-%m-%d-%H-%M-%S')}.csv"
+        self.current_file = filename
+        self._data = {}
+
+        self._save(filename, self._data)
+        self._journal = self._journal_path(filename).open("a", encoding="utf-8")
+
+        logger.info("Created new result CSV: {}", self.current_file)
+
     def add(self, result: MatchResult) -> None:
-        """Add one match result to the current CSV."""
-        current_data = self._load()
+        """Add one match result to the current session."""
+        if not self._journal:
+            raise ValueError
+
+        self._data.setdefault(result.item.name, 0)
+        self._data[result.item.name] += 1
+        self._dirty = True
+
+        self._journal.write(f"{result.item.name}\n")
+        self._journal.flush()
+        self._unsynced += 1
+
+        if self._unsynced >= JOURNAL_SYNC_EVERY:
+            self.sync()
+
+    def sync(self) -> None:
+        """Force the journal to the disk."""
+        if not self._journal or self._unsynced == 0:
+            return
+
+        os.fsync(self._journal.fileno())
+        self._unsynced = 0
+
+    def flush(self) -> None:
+        """Write the current counts into the CSV."""
+        if not self.current_file or not self._dirty:
+            return
+
+        self.sync()
+        self._save(self.current_file, self._data)
+        self._dirty = False
+
+    def close(self) -> None:
+        """Write the CSV and discard the journal, which is no longer needed."""
+        if not self.current_file or not self._journal:
+            return
 
-        current_data.setdefault(result.item.name, 0)
-        current_data[result.item.name] += 1
+        self.flush()
 
-        self._save(current_data)
+        self._journal.close()
+        self._journal = None
+        self._journal_path(self.current_file).unlink()
 
     def snapshot(self) -> None:
         """Create new CSV file."""
@@ -49,7 +49,7 @@ class QmlUtils(QObject):
     @Slot()
     def open_csv(self) -> None:
         """Open the folder with CSV results."""
-        self.open_file(RESULT_DIR / sorted(os.listdir(RESULT_DIR))[-1])
+        self.open_file(sorted(RESULT_DIR.glob("*.csv"))[-1])
 
     @Slot(str)
     def open_folder(self, folder: str) -> None:
@@ -0,0 +1,174 @@
+"""asyncio interface for matching.
+
+AsyncMatcher runs tesseract as an asyncio subprocess and the OpenCV
+stages in an executor, so matching doesn't block the event loop and
+can be cancelled or timed out per call. Cancelling kills a running
+tesseract right away, a stage already running in the executor finishes
+in the background but its result is thrown away.
+"""
+
+import asyncio
+import io
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from types import TracebackType
+from typing import Self, TypeVar
+
+import pytesseract
+from loguru import logger
+
+from unique_matcher.matcher import metrics, utils
+from unique_matcher.matcher.matcher import Matcher
+from unique_matcher.matcher.result import CroppedItemInfo, LocatedItem, MatchResult
+
+T = TypeVar("T")
+
+
+class AsyncMatcher:
+    """asyncio facade for Matcher, see the module docstring."""
+
+    def __init__(
+        self,
+        matcher: Matcher | None = None,
+        *,
+        executor: Executor | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        self.matcher = matcher or Matcher()
+
+        # Default timeout of find_item (seconds)
+        self.timeout = timeout
+
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(thread_name_prefix="async-matcher")
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the executor, if it was created by AsyncMatcher."""
+        if self._own_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func: Callable[..., T], *args: object) -> T:
+        """Run a blocking function in the executor."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def find_item(
+        self,
+        screenshot: utils.ScreenshotSource,
+        *,
+        timeout: float | None = None,
+    ) -> MatchResult:
+        """Find an item in a screenshot, see Matcher.find_item.
+
+        Raise TimeoutError if it takes longer than `timeout`
+        (or the default timeout) seconds.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        timings: dict[str, float] = {}
+        counts: dict[str, int] = {}
+
+        try:
+            async with asyncio.timeout(timeout):
+                cropped_item = await self.find_unique(screenshot, timings)
+                result = await self.match_cropped(cropped_item, timings, counts)
+        except Exception as e:
+            metrics.record_screenshot(timings, counts, e.__class__.__name__)
+            raise
+
+        metrics.record_screenshot(timings, counts)
+
+        return result
+
+    async def find_unique(
+        self,
+        screenshot: utils.ScreenshotSource,
+        timings: dict[str, float] | None = None,
+    ) -> CroppedItemInfo:
+        """Find and crop out the unique item, see Matcher.find_unique."""
+        timings = {} if timings is None else timings
+
+        with utils.timed(timings, "load"):
+            source_screen, screen = await self._run(self.matcher.decode_screen, screenshot)
+
+        with utils.timed(timings, "guides"):
+            located_item = await self._run(self.matcher.locate_unique, source_screen, screen)
+
+        with utils.timed(timings, "title"):
+            return await self.read_title(located_item)
+
+    async def read_title(self, located_item: LocatedItem) -> CroppedItemInfo:
+        """Read the item base and name from the title, see Matcher.read_title."""
+        parser = self.matcher.title_parser
+
+        with io.BytesIO() as buffer:
+            parser.prepare_image(located_item.title).save(buffer, format="PNG")
+            title_raw = await self.ocr(buffer.getvalue())
+
+        base, name = parser.parse_raw_title(title_raw, is_identified=located_item.identified)
+
+        return CroppedItemInfo(
+            image=located_item.image,
+            base=base,
+            name=name,
+            identified=located_item.identified,
+            height=located_item.height,
+        )
+
+    async def match_cropped(
+        self,
+        cropped_item: CroppedItemInfo,
+        timings: dict[str, float] | None = None,
+        counts: dict[str, int] | None = None,
+    ) -> MatchResult:
+        """Find the item in the cropped out unique item, see Matcher.match_cropped."""
+        # The executor may run several calls at once, so never use the Matcher's stats
+        return await self._run(
+            self.matcher.match_cropped,
+            cropped_item,
+            {} if timings is None else timings,
+            {} if counts is None else counts,
+        )
+
+    async def ocr(self, image: bytes) -> str:
+        """Run tesseract on an encoded image and return the text.
+
+        Raise the same errors as pytesseract.
+        """
+        metrics.OCR_CALLS.inc()
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                pytesseract.pytesseract.tesseract_cmd,
+                "stdin",
+                "stdout",
+                "-l",
+                "eng",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError as e:
+            raise pytesseract.TesseractNotFoundError from e
+
+        try:
+            stdout, stderr = await process.communicate(image)
+        except asyncio.CancelledError:
+            logger.debug("Killing tesseract (pid {})", process.pid)
+            process.kill()
+            await process.wait()
+            raise
+
+        if process.returncode:
+            raise pytesseract.TesseractError(process.returncode, stderr.decode().strip())
+
+        return stdout.decode()
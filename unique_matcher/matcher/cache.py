@@ -0,0 +1,203 @@
+"""On-disk cache of the find_unique stages.
+
+Locating the guides and reading the title with Tesseract is the same
+work every time the same screenshot is processed again (benchmarks,
+tests, re-runs of a failed batch). StageCache stores the outputs of
+these stages (guide locations, identified flag, parsed base and name
+and the cropped out item) keyed by the hash of the screenshot content.
+
+Entries live in a directory named after a fingerprint of the code and
+assets that produce them (matcher.locator and its dependencies), so
+any change to locating, reading titles, the guide templates or the
+item list starts a new, empty cache. Changes to template matching
+keep it.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from unique_matcher.constants import (
+    ASSETS_DIR,
+    CACHE_DIR,
+    ROOT_DIR,
+    SOCKET_DIR,
+    TEMPLATE_HEIGHT,
+    TEMPLATES_DIR,
+    VERSION,
+)
+from unique_matcher.matcher import metrics
+from unique_matcher.matcher.result import CroppedItemInfo, LocatedItem
+from unique_matcher.matcher.utils import ScreenshotSource
+
+# Sources that change the cached stages, template matching isn't cached
+# so its code (matcher.py, context.py, sqdiff.py, ...) is left out
+FINGERPRINT_FILES = (
+    ROOT_DIR / "unique_matcher" / "constants.py",
+    ROOT_DIR / "unique_matcher" / "matcher" / "frames.py",
+    ROOT_DIR / "unique_matcher" / "matcher" / "items.py",
+    ROOT_DIR / "unique_matcher" / "matcher" / "locator.py",
+    ROOT_DIR / "unique_matcher" / "matcher" / "profiles.py",
+    ROOT_DIR / "unique_matcher" / "matcher" / "title.py",
+    ROOT_DIR / "unique_matcher" / "matcher" / "utils.py",
+)
+
+# Length of the fingerprint in the cache directory name
+FINGERPRINT_LENGTH = 16
+
+
+@functools.cache
+def fingerprint_files(sources: tuple[Path, ...]) -> str:
+    """Return the hash of VERSION, the given sources and the assets.
+
+    The assets are items.csv and the guide and socket templates.
+    Frozen builds ship only the assets, so a missing source is skipped,
+    VERSION covers it there.
+    """
+    sha = hashlib.sha256(VERSION.encode())
+
+    assets = [
+        ASSETS_DIR / "items.csv",
+        *sorted(TEMPLATES_DIR.glob("*.png")),
+        *sorted(SOCKET_DIR.glob("*.png")),
+    ]
+
+    for path in sources:
+        sha.update(path.name.encode())
+
+        try:
+            sha.update(path.read_bytes())
+        except FileNotFoundError:
+            logger.debug("Source not found, not in the fingerprint: {}", path)
+
+    for path in assets:
+        sha.update(path.name.encode())
+        sha.update(path.read_bytes())
+
+    return sha.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def fingerprint() -> str:
+    """Return the hash of the code and assets that produce the cached outputs."""
+    return fingerprint_files(FINGERPRINT_FILES)
+
+
+def content_key(source: ScreenshotSource) -> str | None:
+    """Return the hash of the screenshot content.
+
+    Returns None if the source cannot be hashed without consuming it
+    (file objects) or if the file cannot be read, it's then not cached.
+    """
+    sha = hashlib.sha256()
+
+    if isinstance(source, np.ndarray):
+        sha.update(f"array {source.shape} {source.dtype}".encode())
+        sha.update(np.ascontiguousarray(source).data)
+    elif isinstance(source, Image.Image):
+        sha.update(f"image {source.size} {source.mode}".encode())
+        sha.update(source.tobytes())
+    elif isinstance(source, bytes | bytearray | memoryview):
+        sha.update(source)
+    elif isinstance(source, str | Path):
+        try:
+            with Path(source).open("rb") as fread:
+                sha.update(fread.read())
+        except OSError:
+            return None
+    else:
+        return None
+
+    return sha.hexdigest()
+
+
+class StageCache:
+    """Outputs of find_unique stored on disk, see the module docstring.
+
+    Can be shared between processes: entries are written into a temporary
+    file first and then moved into place.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR) -> None:
+        self.root = directory
+        self.directory = directory / fingerprint()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.npz"
+
+    def key(self, source: ScreenshotSource) -> str | None:
+        """Return the cache key of a screenshot, see content_key."""
+        return content_key(source)
+
+    def get(self, key: str) -> CroppedItemInfo | None:
+        """Return the cached outputs of a screenshot, None if not cached."""
+        try:
+            with np.load(self._path(key)) as data:
+                meta = json.loads(str(data["meta"]))
+                image = Image.fromarray(data["image"])
+        except FileNotFoundError:
+            self.misses += 1
+            metrics.STAGE_CACHE.inc(result="miss")
+            return None
+        except (OSError, ValueError, KeyError):
+            logger.warning("Ignoring a broken stage cache entry: {}", key)
+            self.misses += 1
+            metrics.STAGE_CACHE.inc(result="miss")
+            return None
+
+        self.hits += 1
+        metrics.STAGE_CACHE.inc(result="hit")
+
+        return CroppedItemInfo(
+            image=image,
+            base=meta["base"],
+            name=meta["name"],
+            identified=meta["identified"],
+            height=meta.get("height", TEMPLATE_HEIGHT),
+        )
+
+    def put(self, key: str, located_item: LocatedItem, cropped_item: CroppedItemInfo) -> None:
+        """Store the outputs of find_unique of a screenshot."""
+        path = self._path(key)
+
+        meta = {
+            "start": located_item.start,
+            "end": located_item.end,
+            "identified": cropped_item.identified,
+            "base": cropped_item.base,
+            "name": cropped_item.name,
+            "height": cropped_item.height,
+        }
+
+        # Unique per process and thread, so concurrent writers don't clash
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            with tmp_path.open("wb") as fwrite:
+                np.savez(
+                    fwrite,
+                    image=np.asarray(cropped_item.image),
+                    meta=np.array(json.dumps(meta)),
+                )
+
+            tmp_path.replace(path)
+        except OSError:
+            logger.exception("Cannot write stage cache entry: {}", path)
+            tmp_path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove all entries, including those of other fingerprints."""
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,81 @@
+"""Preprocessing of one screenshot, shared by all candidate items.
+
+Every candidate item is matched against a crop of the item area that
+depends only on the item's inventory width and height. All candidates
+of a base usually have the same size, so the crop, its grayscale array
+and its histogram are computed once per size instead of per candidate.
+"""
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from unique_matcher.matcher import utils
+from unique_matcher.matcher.items import Item
+
+
+def crop_by_dimensions(image: Image.Image, item: Item) -> Image.Image:
+    """Crop out the unique item image based on its inventory w/h."""
+    if item.is_smaller_than_full():
+        logger.debug("Cropping image based on item width and height")
+        image = image.crop(
+            (
+                int(image.width * (1 - item.width / 2)),
+                0,
+                image.width,
+                int(image.height * item.height / 4),
+            ),
+        )
+
+    return image
+
+
+def _size(item: Item) -> tuple[int, int]:
+    """Return the inventory size that determines the crop of an item."""
+    if item.is_smaller_than_full():
+        return item.width, item.height
+
+    return Item.MAX_WIDTH, Item.MAX_HEIGHT
+
+
+class ScreenshotContext:
+    """Crops of the item area of one screenshot, by item size.
+
+    Crops, grayscale arrays and histograms are created on first use.
+    """
+
+    def __init__(self, image: Image.Image) -> None:
+        self.image = image
+        self._crops: dict[tuple[int, int], Image.Image] = {}
+        self._grays: dict[tuple[int, int], np.ndarray] = {}
+        self._hists: dict[tuple[int, int], np.ndarray] = {}
+
+    def crop(self, item: Item) -> Image.Image:
+        """Return the item area cropped for an item, see crop_by_dimensions."""
+        size = _size(item)
+
+        if (crop := self._crops.get(size)) is None:
+            crop = crop_by_dimensions(self.image, item)
+            self._crops[size] = crop
+
+        return crop
+
+    def gray(self, item: Item) -> np.ndarray:
+        """Return the crop for an item in grayscale."""
+        size = _size(item)
+
+        if (gray := self._grays.get(size)) is None:
+            gray = utils.image_to_cv(self.crop(item))
+            self._grays[size] = gray
+
+        return gray
+
+    def hist(self, item: Item) -> np.ndarray:
+        """Return the normalized histogram of the crop for an item."""
+        size = _size(item)
+
+        if (hist := self._hists.get(size)) is None:
+            hist = utils.calc_normalized_histogram(self.crop(item))
+            self._hists[size] = hist
+
+        return hist
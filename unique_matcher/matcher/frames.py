@@ -0,0 +1,161 @@
+"""Uncompressed screenshots loaded without decoding.
+
+Decoding a 1080p PNG is a measurable part of find_unique. Capture tools
+can instead hand over uncompressed frames, which are memory-mapped
+and used as NumPy views, so there is nothing to decode or copy:
+
+- raw frame dumps (.raw): RAW_HEADER followed by the pixel rows, see write_raw_frame
+- uncompressed 24/32-bit BMPs
+
+The returned arrays are read-only and keep the file mapped until
+they're garbage collected.
+"""
+
+import struct
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Suffix of raw frame dumps
+RAW_SUFFIX = ".raw"
+
+# Header of a raw frame: magic, width, height, row stride (bytes), pixel format,
+# padded to 32 bytes. A stride of 0 means tightly packed rows.
+RAW_MAGIC = b"UMRF"
+RAW_HEADER = struct.Struct("<4sIIIB11x")
+
+# Pixel formats of raw frames: (channels, conversion to BGR(A) or None)
+RAW_FORMATS: dict[int, tuple[int, int | None]] = {
+    0: (3, None),  # BGR
+    1: (4, None),  # BGRA
+    2: (3, cv2.COLOR_RGB2BGR),  # RGB
+    3: (4, cv2.COLOR_RGBA2BGRA),  # RGBA
+}
+
+# BMP headers: file header (14 bytes) and the start of BITMAPINFOHEADER (40 bytes),
+# followed by the RGB channel masks of BI_BITFIELDS
+BMP_FILE_HEADER = struct.Struct("<2sIHHI")
+BMP_INFO_HEADER = struct.Struct("<IiiHHI")
+BMP_INFO_SIZE = 40
+BMP_MASKS = struct.Struct("<III")
+BGRA_MASKS = (0x00FF0000, 0x0000FF00, 0x000000FF)
+
+# BMP compression methods that store plain pixel rows
+BI_RGB = 0
+BI_BITFIELDS = 3
+
+
+def _frame_view(
+    buffer: np.ndarray,
+    offset: int,
+    shape: tuple[int, int, int],
+    stride: int,
+) -> np.ndarray:
+    """Return a view of pixel rows in a buffer, checking that they fit."""
+    height, width, channels = shape
+
+    if stride < width * channels or offset + stride * (height - 1) + width * channels > len(buffer):
+        msg = f"Frame data too short for {width}x{height}x{channels}"
+        raise ValueError(msg)
+
+    return np.ndarray(
+        shape,
+        dtype=np.uint8,
+        buffer=buffer,
+        offset=offset,
+        strides=(stride, channels, 1),
+    )
+
+
+def is_raw_frame(buffer: bytes | bytearray | memoryview) -> bool:
+    """Return True if the buffer starts with the raw frame header."""
+    return bytes(buffer[: len(RAW_MAGIC)]) == RAW_MAGIC
+
+
+def parse_raw_frame(buffer: np.ndarray) -> np.ndarray:
+    """Return the BGR(A) frame in a raw frame buffer, as a view if possible."""
+    if len(buffer) < RAW_HEADER.size:
+        msg = "Raw frame header too short"
+        raise ValueError(msg)
+
+    magic, width, height, stride, pixel_format = RAW_HEADER.unpack_from(buffer.data)
+
+    if magic != RAW_MAGIC or pixel_format not in RAW_FORMATS:
+        msg = "Invalid raw frame header"
+        raise ValueError(msg)
+
+    channels, conversion = RAW_FORMATS[pixel_format]
+    screen = _frame_view(
+        buffer,
+        RAW_HEADER.size,
+        (height, width, channels),
+        stride or width * channels,
+    )
+
+    if conversion is not None:
+        return cv2.cvtColor(screen, conversion)
+
+    return screen
+
+
+def load_raw_frame(file: str | Path) -> np.ndarray:
+    """Memory-map a raw frame dump."""
+    return parse_raw_frame(np.memmap(file, dtype=np.uint8, mode="r"))
+
+
+def write_raw_frame(file: str | Path, screen: np.ndarray) -> None:
+    """Write a BGR(A) array as a raw frame dump, tightly packed."""
+    if screen.dtype != np.uint8 or screen.shape[2:] not in ((3,), (4,)):
+        msg = f"Expected a uint8 BGR(A) array, got {screen.dtype} with shape {screen.shape}"
+        raise ValueError(msg)
+
+    height, width, channels = screen.shape
+
+    with Path(file).open("wb") as fwrite:
+        # BGR or BGRA
+        fwrite.write(RAW_HEADER.pack(RAW_MAGIC, width, height, 0, channels - 3))
+        fwrite.write(np.ascontiguousarray(screen).tobytes())
+
+
+def load_bmp(file: str | Path) -> np.ndarray | None:
+    """Memory-map an uncompressed 24/32-bit BMP as a BGR(A) view.
+
+    Return None for other BMPs (compressed, palette), they have to be decoded.
+    """
+    buffer = np.memmap(file, dtype=np.uint8, mode="r")
+
+    if len(buffer) < BMP_FILE_HEADER.size + BMP_INFO_SIZE:
+        return None
+
+    signature, _, _, _, offset = BMP_FILE_HEADER.unpack_from(buffer.data)
+    _, width, height, _, bit_count, compression = BMP_INFO_HEADER.unpack_from(
+        buffer.data,
+        BMP_FILE_HEADER.size,
+    )
+
+    if signature != b"BM" or bit_count not in (24, 32):
+        return None
+
+    if compression == BI_BITFIELDS:
+        # Only the usual BGR(A) channel order can be used as it is
+        masks = BMP_MASKS.unpack_from(buffer.data, BMP_FILE_HEADER.size + BMP_INFO_SIZE)
+
+        if bit_count != 32 or masks != BGRA_MASKS:  # noqa: PLR2004
+            return None
+    elif compression != BI_RGB:
+        return None
+
+    channels = bit_count // 8
+
+    # Rows are padded to 4 bytes
+    stride = (width * channels + 3) & ~3
+
+    if height < 0:
+        # Top-down
+        return _frame_view(buffer, offset, (-height, width, channels), stride)
+
+    # Bottom-up, the view starts at the last row and goes backwards
+    screen = _frame_view(buffer, offset, (height, width, channels), stride)
+
+    return screen[::-1]
@@ -0,0 +1,307 @@
+"""Locating a unique item in a screenshot and reading its title.
+
+These are the stages of find_unique before template matching, their
+outputs are what matcher.cache stores. They're kept apart from the
+template matching, so that changes to the matching don't invalidate
+the stage cache (see cache.FINGERPRINT_FILES).
+"""
+
+import cv2
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from unique_matcher.constants import OPT_ALLOW_NON_FULLHD, TEMPLATE_HEIGHT
+from unique_matcher.matcher import utils
+from unique_matcher.matcher.exceptions import (
+    CannotFindUniqueItemError,
+    NotInFullHDError,
+)
+from unique_matcher.matcher.profiles import ProfileLoader, ResolutionProfile
+from unique_matcher.matcher.result import CroppedItemInfo, LocatedItem
+from unique_matcher.matcher.title import TitleParser
+
+# Threshold for the control guides (item title decorations).
+# Has to be low enough to not allow other clutter to get in.
+# Typically the min_val of guides is ~0.06.
+THRESHOLD_CONTROL = 0.16
+
+
+class UniqueLocator:
+    """Find the unique item by its control guides and read its title."""
+
+    def __init__(self, profiles: ProfileLoader, title_parser: TitleParser) -> None:
+        self.profiles = profiles
+        self.title_parser = title_parser
+
+    def _find_without_resizing(
+        self,
+        image: Image.Image,
+        screen: np.ndarray,
+    ) -> tuple[float, tuple[int, int]]:
+        result = cv2.matchTemplate(
+            screen,
+            utils.image_to_cv(image),
+            cv2.TM_SQDIFF_NORMED,
+        )
+        min_val, _, min_loc, _ = cv2.minMaxLoc(result)
+
+        return min_val, min_loc  # type: ignore[return-value]
+
+    def _profile(self, screen: np.ndarray, height: int | None) -> ResolutionProfile:
+        """Return the profile of a screen, or of `height` if given (see locate_unique)."""
+        return self.profiles.get(height or screen.shape[0])
+
+    def _find_unique_control_start(
+        self,
+        screen: np.ndarray,
+        height: int | None = None,
+    ) -> tuple[tuple[int, int], bool] | None:
+        """Find the start control point of a unique item.
+
+        Return (x, y), is_identified.
+
+        Return None if neither identified nor unidentified control point
+        can be found.
+        """
+        guides = self._profile(screen, height).guides
+        min_val1, min_loc = self._find_without_resizing(guides["one_line"], screen)
+
+        logger.debug("Finding unique control start 1: min_val={}", min_val1)
+
+        if min_val1 <= THRESHOLD_CONTROL:
+            logger.info("Found unidentified item")
+            return min_loc, False
+
+        min_val2, min_loc = self._find_without_resizing(guides["two_line"], screen)
+
+        logger.debug("Finding unique control start 2: min_val={}", min_val2)
+
+        if min_val2 <= THRESHOLD_CONTROL:
+            logger.info("Found identified item")
+            return min_loc, True
+
+        min_val2, min_loc = self._find_without_resizing(guides["two_line_cmp"], screen)
+
+        logger.debug("Finding unique control start 2 (compressed): min_val={}", min_val2)
+
+        if min_val2 <= THRESHOLD_CONTROL:
+            logger.info("Found identified item")
+            return min_loc, True
+
+        logger.error(
+            "Couldn't find unique control start, threshold is {}, line1_min={}, line2_min={}",
+            THRESHOLD_CONTROL,
+            min_val1,
+            min_val2,
+        )
+
+        return None
+
+    def _find_unique_control_end(
+        self,
+        screen: np.ndarray,
+        *,
+        is_identified: bool,
+        height: int | None = None,
+    ) -> tuple[int, int] | None:
+        """Find the end control point of a unique item.
+
+        Return None if neither identified nor unidentified control point
+        can be found.
+        """
+        guides = self._profile(screen, height).guides
+
+        if is_identified:
+            min_val2, min_loc = self._find_without_resizing(guides["two_line_end"], screen)
+
+            logger.debug("Finding unique control end 2: min_val={}", min_val2)
+
+            if min_val2 <= THRESHOLD_CONTROL:
+                return min_loc
+
+            min_val2, min_loc = self._find_without_resizing(guides["two_line_end_cmp"], screen)
+
+            logger.debug("Finding unique control end 2 (compressed): min_val={}", min_val2)
+
+            if min_val2 <= THRESHOLD_CONTROL:
+                return min_loc
+
+            logger.error(
+                "Couldn't find unique control end, threshold is {}, line2_min={}",
+                THRESHOLD_CONTROL,
+                min_val2,
+            )
+        else:
+            min_val1, min_loc = self._find_without_resizing(guides["one_line_end"], screen)
+
+            logger.debug("Finding unique control end 1: min_val={}", min_val1)
+
+            if min_val1 <= THRESHOLD_CONTROL:
+                return min_loc
+
+            logger.error(
+                "Couldn't find unique control end, threshold is {}, line1_min={}",
+                THRESHOLD_CONTROL,
+                min_val1,
+            )
+
+        return None
+
+    def decode_screen(
+        self,
+        screenshot: utils.ScreenshotSource,
+        height: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Load a screenshot, return it as it is (BGR) and in grayscale.
+
+        `height` is the screen height of a crop of a screenshot, see locate_unique.
+        """
+        source_screen = utils.load_screenshot(screenshot)
+        screen = utils.screen_to_gray(source_screen)
+
+        screen_height, width = source_screen.shape[:2]
+        height = height or screen_height
+
+        if self.profiles.is_supported(height):
+            if height != TEMPLATE_HEIGHT:
+                logger.info("Screenshot height is {}px, using a scaled resolution profile", height)
+        else:
+            logger.warning(
+                "Screenshot height is not supported, accuracy will be impacted"
+                " (real size is {}x{}px)",
+                width,
+                screen_height,
+            )
+
+            if not OPT_ALLOW_NON_FULLHD:
+                logger.error(
+                    "OPT_ALLOW_NON_FULLHD is disabled and screenshot height"
+                    " isn't supported, aborting",
+                )
+                raise NotInFullHDError
+
+        return source_screen, screen
+
+    def locate_unique(
+        self,
+        source_screen: np.ndarray,
+        screen: np.ndarray,
+        height: int | None = None,
+    ) -> LocatedItem:
+        """Find the unique item by its control guides and crop out the item and title.
+
+        `source_screen` and `screen` are the result of decode_screen.
+
+        The resolution profile is picked by the screen height, for a crop
+        of a screenshot (see gui.archive) pass the height of the screenshot.
+        """
+        res = self._find_unique_control_start(screen, height)
+
+        if res is None:
+            msg = "Unique control guide start not found"
+            raise CannotFindUniqueItemError(msg)
+
+        min_loc_start, is_identified = res
+        profile = self._profile(screen, height)
+        item_width, item_height = profile.item_max_size
+        min_loc_end = self._find_unique_control_end(
+            screen,
+            is_identified=is_identified,
+            height=height,
+        )
+
+        if min_loc_end is None:
+            msg = "Unique control guide end not found"
+            raise CannotFindUniqueItemError(msg)
+
+        # Crop out the item image: (left, top, right, bottom)
+        # Left is: position of guide - item width - space
+        # Top is: position of guide + space
+        # Right is: position of guide - space
+        # Bottom is: position of guide + item height + space
+        # Space is to allow some padding
+        item_img = utils.crop_screen(
+            source_screen,
+            (
+                min_loc_start[0] - item_width,
+                min_loc_start[1],
+                min_loc_start[0],
+                min_loc_start[1] + item_height,
+            ),
+        )
+
+        logger.debug(
+            "Unique item area has size: {}x{}px",
+            item_img.width,
+            item_img.height,
+        )
+
+        # Crop out item name + base
+        if is_identified:
+            control_width, control_height = profile.guides["two_line"].size
+        else:
+            control_width, control_height = profile.guides["one_line"].size
+
+        # The extra pixels are for tesseract, without them, it fails to read
+        # anything at all
+        title_img = utils.crop_screen(
+            source_screen,
+            (
+                min_loc_start[0] + control_width - profile.px(6),
+                min_loc_start[1] + profile.px(4),
+                min_loc_end[0] + profile.px(6),
+                min_loc_end[1] + control_height - profile.px(6),
+            ),
+        )
+
+        return LocatedItem(
+            image=item_img,
+            title=title_img,
+            identified=is_identified,
+            start=min_loc_start,
+            end=min_loc_end,
+            height=profile.height,
+        )
+
+    def tooltip_box(
+        self,
+        located_item: LocatedItem,
+        padding: int = 0,
+    ) -> tuple[int, int, int, int]:
+        """Return the box (left, top, right, bottom) of the item and its title in the screenshot.
+
+        The box includes both control guides, so they're found in a crop of it again.
+        """
+        profile = self.profiles.get(located_item.height)
+        item_width, item_height = profile.item_max_size
+
+        if located_item.identified:
+            end_guide = profile.guides["two_line_end"]
+        else:
+            end_guide = profile.guides["one_line_end"]
+
+        start_x, start_y = located_item.start
+        end_x, end_y = located_item.end
+
+        return (
+            start_x - item_width - padding,
+            min(start_y, end_y) - padding,
+            end_x + end_guide.width + padding,
+            max(start_y + item_height, end_y + end_guide.height) + padding,
+        )
+
+    def read_title(self, located_item: LocatedItem) -> CroppedItemInfo:
+        """Read the item base and name from the title of a located item."""
+        base, name = self.title_parser.parse_title(
+            located_item.title,
+            is_identified=located_item.identified,
+        )
+
+        return CroppedItemInfo(
+            image=located_item.image,
+            base=base,
+            name=name,
+            identified=located_item.identified,
+            height=located_item.height,
+        )
@@ -1,6 +1,9 @@
 """Module for matching unique items."""
 
-from pathlib import Path
+import threading
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from itertools import islice
 from typing import Any
 
 import cv2
@@ -11,35 +14,39 @@ from PIL import Image
 from unique_matcher.constants import (
     DEBUG,
     ITEM_MAX_SIZE,
-    OPT_ALLOW_NON_FULLHD,
     OPT_FIND_ITEM_BY_NAME,
     OPT_USE_MASK,
-    TEMPLATES_DIR,
+    TEMPLATE_HEIGHT,
 )
-from unique_matcher.matcher import utils
+from unique_matcher.matcher import metrics, sqdiff, utils
+from unique_matcher.matcher.cache import StageCache
+from unique_matcher.matcher.context import ScreenshotContext, crop_by_dimensions
 from unique_matcher.matcher.exceptions import (
-    CannotFindUniqueItemError,
+    BaseUMError,
     InvalidTemplateDimensionsError,
-    NotInFullHDError,
 )
 from unique_matcher.matcher.generator import ItemGenerator
 from unique_matcher.matcher.items import SOCKET_COLORS, Item, ItemLoader
+from unique_matcher.matcher.locator import UniqueLocator
 from unique_matcher.matcher.plugins import PluginLoader
+from unique_matcher.matcher.profiles import ProfileLoader, ResolutionProfile
 from unique_matcher.matcher.result import (
+    BatchResult,
     CroppedItemInfo,
     ItemTemplate,
+    LocatedItem,
     MatchedBy,
     MatchingAlgorithm,
     MatchResult,
     get_best_result,
 )
+from unique_matcher.matcher.templates import (
+    TemplateBank,
+    TemplateSet,
+    build_template_set,
+)
 from unique_matcher.matcher.title import TitleParser
 
-# Threshold for the control guides (item title decorations).
-# Has to be low enough to not allow other clutter to get in.
-# Typically the min_val of guides is ~0.06.
-THRESHOLD_CONTROL = 0.16
-
 # These item bases will be excluded from using masks during template matching,
 # even when OPT_USE_MASK is True due to incorrect matching.
 EXCLUDE_MASKING = [
@@ -49,31 +56,46 @@ EXCLUDE_MASKING = [
     "Ezomyte Axe",
 ]
 
+# How many screenshots find_items locates before matching them
+BATCH_SIZE = 32
+
 
 class Matcher:
     """Main class for matching items in a screenshot."""
 
-    def __init__(self) -> None:
+    def __init__(self, *, cache: StageCache | None = None) -> None:
         self.generator = ItemGenerator()
         self.item_loader = ItemLoader()
         self.item_loader.load()
         self.title_parser = TitleParser(self.item_loader)
         self.plugin_loader = PluginLoader(self.item_loader)
+        self.template_bank = TemplateBank(self.create_template_set)
 
-        self.unique_one_line = Image.open(str(TEMPLATES_DIR / "unique-one-line-fullhd.png"))
-        self.unique_one_line_end = Image.open(str(TEMPLATES_DIR / "unique-one-line-end-fullhd.png"))
+        # Control guides and templates for each screen height
+        self.profiles = ProfileLoader(self.template_bank)
 
-        self.unique_two_line = Image.open(str(TEMPLATES_DIR / "unique-two-line-fullhd.png"))
-        self.unique_two_line_end = Image.open(str(TEMPLATES_DIR / "unique-two-line-end-fullhd.png"))
+        # Stages of find_unique before template matching
+        self.locator = UniqueLocator(self.profiles, self.title_parser)
 
-        self.unique_two_line_cmp = Image.open(
-            str(TEMPLATES_DIR / "unique-two-line-fullhd-compressed.png"),
-        )
-        self.unique_two_line_end_cmp = Image.open(
-            str(TEMPLATES_DIR / "unique-two-line-end-fullhd-compressed.png"),
-        )
+        # Holds debug_info, the pipeline matches in several threads at once
+        self._local = threading.local()
+
+        # Time spent in each stage of the last screenshot (seconds)
+        self.timings: dict[str, float] = {}
+
+        # Work done for the last screenshot (candidates, variants)
+        self.counts: dict[str, int] = {}
 
-        self.debug_info: dict[str, Any] = {}
+        # Outputs of find_unique of already seen screenshots, if enabled
+        self.cache = cache
+
+    @property
+    def debug_info(self) -> dict[str, Any]:
+        """Debug data of the last screenshot matched by the calling thread, see DEBUG."""
+        if not hasattr(self._local, "debug_info"):
+            self._local.debug_info = {}
+
+        return self._local.debug_info
 
     def get_item_variants(self, item: Item) -> list[ItemTemplate]:
         """Get a list of images for all socket variants of an item."""
@@ -133,32 +155,68 @@ class Matcher:
 
         return cv2.cvtColor(mask, cv2.COLOR_RGBA2GRAY)
 
-    def check_one(self, image: Image.Image, item: Item) -> MatchResult:
-        """Check one screenshot against one item."""
+    def create_template_set(self, item: Item) -> TemplateSet:
+        """Create all variants of an item with everything needed for matching."""
+        return build_template_set(
+            item,
+            self.get_item_variants(item),
+            self.get_mask(item) if OPT_USE_MASK and item.base not in EXCLUDE_MASKING else None,
+        )
+
+    def check_one(
+        self,
+        image: Image.Image,
+        item: Item,
+        height: int = TEMPLATE_HEIGHT,
+    ) -> MatchResult:
+        """Check one screenshot against one item, `height` is the height of the screenshot."""
+        return self.check_template_set(image, self.profiles.get(height).template_bank.get(item))
+
+    def check_template_set(
+        self,
+        image: Image.Image,
+        template_set: TemplateSet,
+        context: ScreenshotContext | None = None,
+    ) -> MatchResult:
+        """Check one screenshot against all variants of one item.
+
+        Pass the `context` of the screenshot (see CroppedItemInfo.context)
+        to reuse its crops when checking many items.
+        """
         results = []
 
-        item_variants = self.get_item_variants(item)
+        item = template_set.item
+        mask = template_set.mask
 
-        logger.info("Item {} has {} variant(s)", item.name, len(item_variants))
+        logger.info("Item {} has {} variant(s)", item.name, len(template_set.variants))
 
-        image = self.crop_out_unique_by_dimensions(image, item)
+        if context is None:
+            context = ScreenshotContext(image)
+
+        image = context.crop(item)
 
         if DEBUG:
             self.debug_info.setdefault("cropped_uniques", [])
             self.debug_info["cropped_uniques"].append(image)
 
-        screen = utils.image_to_cv(image)
-        hist_base = utils.calc_normalized_histogram(image)
+        screen = context.gray(item)
+        hist_base = context.hist(item)
 
-        # Mask
-        if OPT_USE_MASK and item.base not in EXCLUDE_MASKING:
-            mask = self.get_mask(item)
+        # Image terms of masked matching, shared by all variants
+        image_terms = None
 
-            if DEBUG:
-                self.debug_info.setdefault("masks", [])
-                self.debug_info["masks"].append(Image.fromarray(mask))
+        if DEBUG and mask is not None:
+            self.debug_info.setdefault("masks", [])
+            self.debug_info["masks"].append(Image.fromarray(mask))
 
-        for template in item_variants:
+        for index, (template, template_cv, hist) in enumerate(
+            zip(
+                template_set.variants,
+                template_set.grays,
+                template_set.hists,
+                strict=True,
+            ),
+        ):
             if template.image.width > image.width or template.image.height > image.height:
                 logger.error(
                     "Template image is larger than unique item: {}x{}px vs {}x{}px",
@@ -175,16 +233,16 @@ class Matcher:
                 )
                 raise InvalidTemplateDimensionsError(msg)
 
-            hist = utils.calc_normalized_histogram(template.image)
-
             hist_val = cv2.compareHist(hist_base, hist, cv2.HISTCMP_BHATTACHARYYA)
             logger.debug("Comparing histograms, hist_val={}", hist_val)
 
-            template_cv = np.array(template.image)
-            template_cv = cv2.cvtColor(template_cv, cv2.COLOR_RGBA2GRAY)
-
             # Match against the screenshot
-            if OPT_USE_MASK and item.base not in EXCLUDE_MASKING:
+            if template_set.masked is not None:
+                if image_terms is None:
+                    image_terms = sqdiff.image_terms(screen, template_set.masked)
+
+                result = sqdiff.sqdiff_normed(image_terms, template_set.masked, index)
+            elif mask is not None:
                 result = cv2.matchTemplate(screen, template_cv, cv2.TM_SQDIFF_NORMED, mask=mask)
             else:
                 result = cv2.matchTemplate(screen, template_cv, cv2.TM_SQDIFF_NORMED)
@@ -206,222 +264,155 @@ class Matcher:
 
         return get_best_result(results, MatchingAlgorithm.VARIANTS_ONLY)
 
-    def load_screen(self, screenshot: str | Path) -> np.ndarray:
-        """Load a screenshot from file into OpenCV format."""
-        screen = cv2.imread(str(screenshot))
-        return cv2.cvtColor(screen, cv2.COLOR_RGB2GRAY)
-
-    def _find_without_resizing(
-        self,
-        image: Image.Image,
-        screen: np.ndarray,
-    ) -> tuple[float, tuple[int, int]]:
-        result = cv2.matchTemplate(
-            screen,
-            utils.image_to_cv(image),
-            cv2.TM_SQDIFF_NORMED,
-        )
-        min_val, _, min_loc, _ = cv2.minMaxLoc(result)
+    def load_screen(self, screenshot: utils.ScreenshotSource) -> np.ndarray:
+        """Load a screenshot into grayscale OpenCV format."""
+        return utils.screen_to_gray(utils.load_screenshot(screenshot))
 
-        return min_val, min_loc  # type: ignore[return-value]
-
-    def _find_unique_control_start(self, screen: np.ndarray) -> tuple[tuple[int, int], bool] | None:
-        """Find the start control point of a unique item.
-
-        Return (x, y), is_identified.
-
-        Return None if neither identified nor unidentified control point
-        can be found.
-        """
-        min_val1, min_loc = self._find_without_resizing(self.unique_one_line, screen)
-
-        logger.debug("Finding unique control start 1: min_val={}", min_val1)
-
-        if min_val1 <= THRESHOLD_CONTROL:
-            logger.info("Found unidentified item")
-            return min_loc, False
-
-        min_val2, min_loc = self._find_without_resizing(self.unique_two_line, screen)
-
-        logger.debug("Finding unique control start 2: min_val={}", min_val2)
-
-        if min_val2 <= THRESHOLD_CONTROL:
-            logger.info("Found identified item")
-            return min_loc, True
-
-        min_val2, min_loc = self._find_without_resizing(self.unique_two_line_cmp, screen)
+    def crop_out_unique_by_dimensions(self, image: Image.Image, item: Item) -> Image.Image:
+        """Crop out the unique item image based on its inventory w/h."""
+        return crop_by_dimensions(image, item)
 
-        logger.debug("Finding unique control start 2 (compressed): min_val={}", min_val2)
+    def decode_screen(
+        self,
+        screenshot: utils.ScreenshotSource,
+        height: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Load a screenshot, see UniqueLocator.decode_screen."""
+        return self.locator.decode_screen(screenshot, height)
 
-        if min_val2 <= THRESHOLD_CONTROL:
-            logger.info("Found identified item")
-            return min_loc, True
+    def locate_unique(
+        self,
+        source_screen: np.ndarray,
+        screen: np.ndarray,
+        height: int | None = None,
+    ) -> LocatedItem:
+        """Find the unique item, see UniqueLocator.locate_unique."""
+        return self.locator.locate_unique(source_screen, screen, height)
 
-        logger.error(
-            "Couldn't find unique control start, threshold is {}, line1_min={}, line2_min={}",
-            THRESHOLD_CONTROL,
-            min_val1,
-            min_val2,
-        )
+    def tooltip_box(
+        self,
+        located_item: LocatedItem,
+        padding: int = 0,
+    ) -> tuple[int, int, int, int]:
+        """Return the box of the item and its title, see UniqueLocator.tooltip_box."""
+        return self.locator.tooltip_box(located_item, padding)
 
-        return None
+    def read_title(self, located_item: LocatedItem) -> CroppedItemInfo:
+        """Read the item base and name, see UniqueLocator.read_title."""
+        return self.locator.read_title(located_item)
 
-    def _find_unique_control_end(
+    def find_unique(
         self,
-        screen: np.ndarray,
+        screenshot: utils.ScreenshotSource,
         *,
-        is_identified: bool,
-    ) -> tuple[int, int] | None:
-        """Find the end control point of a unique item.
-
-        Return None if neither identified nor unidentified control point
-        can be found.
-        """
-        if is_identified:
-            min_val2, min_loc = self._find_without_resizing(self.unique_two_line_end, screen)
+        height: int | None = None,
+    ) -> CroppedItemInfo:
+        """Return CroppedItemInfo with data about the cropped part of a screenshot.
 
-            logger.debug("Finding unique control end 2: min_val={}", min_val2)
+        The screenshot can be a path, encoded bytes or a file object,
+        a BGR(A) NumPy array or a PIL image, see utils.load_screenshot.
+        For a crop of a screenshot, `height` is the height of the screenshot
+        (see UniqueLocator.locate_unique).
 
-            if min_val2 <= THRESHOLD_CONTROL:
-                return min_loc
+        With a stage cache, the stages are skipped for screenshots
+        whose content was already processed.
+        """
+        self.timings = {}
+        self.counts = {}
+        key = None
 
-            min_val2, min_loc = self._find_without_resizing(self.unique_two_line_end_cmp, screen)
+        if self.cache is not None:
+            with utils.timed(self.timings, "cache"):
+                # Read a file only once, to both hash and decode it
+                screenshot = utils.read_source(screenshot)
+                key = self.cache.key(screenshot)
+                cropped_item = self.cache.get(key) if key is not None else None
 
-            logger.debug("Finding unique control end 2 (compressed): min_val={}", min_val2)
+            if cropped_item is not None:
+                return cropped_item
 
-            if min_val2 <= THRESHOLD_CONTROL:
-                return min_loc
+        with utils.timed(self.timings, "load"):
+            source_screen, screen = self.decode_screen(screenshot, height)
 
-            logger.error(
-                "Couldn't find unique control end, threshold is {}, line2_min={}",
-                THRESHOLD_CONTROL,
-                min_val2,
-            )
-        else:
-            min_val1, min_loc = self._find_without_resizing(self.unique_one_line_end, screen)
+        with utils.timed(self.timings, "guides"):
+            located_item = self.locate_unique(source_screen, screen, height)
 
-            logger.debug("Finding unique control end 1: min_val={}", min_val1)
+        with utils.timed(self.timings, "title"):
+            cropped_item = self.read_title(located_item)
 
-            if min_val1 <= THRESHOLD_CONTROL:
-                return min_loc
+        if self.cache is not None and key is not None:
+            self.cache.put(key, located_item, cropped_item)
 
-            logger.error(
-                "Couldn't find unique control end, threshold is {}, line1_min={}",
-                THRESHOLD_CONTROL,
-                min_val1,
-            )
+        return cropped_item
 
-        return None
+    def find_item(self, screenshot: utils.ScreenshotSource) -> MatchResult:
+        """Find an item in a screenshot (see find_unique for the accepted sources)."""
+        logger.info("Finding item in screenshot: {}", utils.describe_source(screenshot))
 
-    def crop_out_unique_by_dimensions(self, image: Image.Image, item: Item) -> Image.Image:
-        """Crop out the unique item image based on its inventory w/h."""
-        if item.is_smaller_than_full():
-            logger.debug("Cropping image based on item width and height")
-            image = image.crop(
-                (
-                    int(image.width * (1 - item.width / 2)),
-                    0,
-                    image.width,
-                    int(image.height * item.height / 4),
-                ),
-            )
+        try:
+            result = self.match_cropped(self.find_unique(screenshot))
+        except Exception as e:
+            metrics.record_screenshot(self.timings, self.counts, e.__class__.__name__)
+            raise
 
-        return image
+        metrics.record_screenshot(self.timings, self.counts)
 
-    def find_unique(self, screenshot: str | Path) -> CroppedItemInfo:
-        """Return CroppedItemInfo with data about the cropped part of a screenshot."""
-        source_screen = Image.open(str(screenshot))  # Original screenshot
-        screen = self.load_screen(screenshot)  # CV2 screenshot
+        return result
 
-        if source_screen.size != (1920, 1080):
-            logger.warning(
-                "Screenshot size is not 1920x1080px, accuracy will be impacted"
-                " (real size is {}x{}px)",
-                source_screen.width,
-                source_screen.height,
-            )
+    def match_cropped(
+        self,
+        cropped_item: CroppedItemInfo,
+        timings: dict[str, float] | None = None,
+        counts: dict[str, int] | None = None,
+    ) -> MatchResult:
+        """Find the item in an already cropped out unique item (see find_unique).
+
+        The time spent and the number of checked candidates and variants
+        are added to `timings` and `counts`, or to self.timings and
+        self.counts if not given.
+        """
+        if timings is None:
+            timings = self.timings
 
-            if not OPT_ALLOW_NON_FULLHD:
-                logger.error(
-                    "OPT_ALLOW_NON_FULLHD is disabled and screenshot isn't 1920x1080px, aborting",
-                )
-                source_screen.close()
-                raise NotInFullHDError
-
-        res = self._find_unique_control_start(screen)
-
-        if res is None:
-            source_screen.close()
-            msg = "Unique control guide start not found"
-            raise CannotFindUniqueItemError(msg)
-
-        min_loc_start, is_identified = res
-        min_loc_end = self._find_unique_control_end(screen, is_identified=is_identified)
-
-        if min_loc_end is None:
-            source_screen.close()
-            msg = "Unique control guide end not found"
-            raise CannotFindUniqueItemError(msg)
-
-        # Crop out the item image: (left, top, right, bottom)
-        # Left is: position of guide - item width - space
-        # Top is: position of guide + space
-        # Right is: position of guide - space
-        # Bottom is: position of guide + item height + space
-        # Space is to allow some padding
-        item_img = source_screen.crop(
-            (
-                min_loc_start[0] - ITEM_MAX_SIZE[0],
-                min_loc_start[1],
-                min_loc_start[0],
-                min_loc_start[1] + ITEM_MAX_SIZE[1],
-            ),
-        )
+        if counts is None:
+            counts = self.counts
 
-        logger.debug(
-            "Unique item area has size: {}x{}px",
-            item_img.width,
-            item_img.height,
-        )
+        if DEBUG:
+            # Only keep the debug data of the last screenshot, or it piles up
+            # over a long session
+            self.debug_info["unique_image"] = cropped_item.image
+            self.debug_info["results_all"] = []
+            self.debug_info["cropped_uniques"] = []
+            self.debug_info["masks"] = []
 
-        # Crop out item name + base
-        if is_identified:
-            control_width, control_height = self.unique_two_line.size
-        else:
-            control_width, control_height = self.unique_one_line.size
-
-        # The extra pixels are for tesseract, without them, it fails to read
-        # anything at all
-        title_img = source_screen.crop(
-            (
-                min_loc_start[0] + control_width - 6,
-                min_loc_start[1] + 4,
-                min_loc_end[0] + 6,
-                min_loc_end[1] + control_height - 6,
-            ),
-        )
+        if (result := self._match_without_templates(cropped_item)) is not None:
+            return result
 
-        source_screen.close()
+        results_all = []
 
-        base, name = self.title_parser.parse_title(title_img, is_identified=is_identified)
+        template_bank = self.profiles.get(cropped_item.height).template_bank
 
-        return CroppedItemInfo(
-            image=item_img,
-            base=base,
-            name=name,
-            identified=is_identified,
-        )
+        # Check all bases
+        with utils.timed(timings, "match"):
+            for item in self.item_loader.filter_base(cropped_item.base):
+                template_set = template_bank.get(item)
+                result = self.check_template_set(
+                    cropped_item.image,
+                    template_set,
+                    cropped_item.context,
+                )
+                results_all.append(result)
 
-    def find_item(self, screenshot: str | Path) -> MatchResult:
-        """Find an item in a screenshot."""
-        logger.info("Finding item in screenshot: {}", screenshot)
+                utils.add_count(counts, "candidates")
+                utils.add_count(counts, "variants", len(template_set.variants))
 
-        cropped_item = self.find_unique(screenshot)
+        return self._pick_best_result(cropped_item, results_all, timings)
 
-        if DEBUG:
-            self.debug_info["unique_image"] = cropped_item.image
-            self.debug_info["results_all"] = []
+    def _match_without_templates(self, cropped_item: CroppedItemInfo) -> MatchResult | None:
+        """Find the item by its name or base only.
 
+        Return None if template matching is needed.
+        """
         if cropped_item.name and OPT_FIND_ITEM_BY_NAME:
             item = self.item_loader.get(cropped_item.name)
 
@@ -446,8 +437,6 @@ class Matcher:
                 template=None,
             )
 
-        results_all = []
-
         filtered_bases = self.item_loader.filter_base(cropped_item.base)
         logger.info("Searching through {} item base variants", len(filtered_bases))
 
@@ -466,16 +455,21 @@ class Matcher:
                 template=None,
             )
 
-        # Check all bases
-        for item in filtered_bases:
-            result = self.check_one(cropped_item.image, item)
-            results_all.append(result)
+        return None
 
+    def _pick_best_result(
+        self,
+        cropped_item: CroppedItemInfo,
+        results_all: list[MatchResult],
+        timings: dict[str, float],
+    ) -> MatchResult:
+        """Pick the best of the template matching results of all item variants."""
         if DEBUG:
             self.debug_info["results_all"] = results_all
 
-        plugin = self.plugin_loader.load(cropped_item)
-        best_result = plugin.match(results_all, cropped_item)
+        with utils.timed(timings, "plugin"):
+            plugin = self.plugin_loader.load(cropped_item)
+            best_result = plugin.match(results_all, cropped_item)
 
         if aliases := self.item_loader.item_aliases(best_result.item):
             logger.warning(
@@ -489,3 +483,145 @@ class Matcher:
         logger.info("Found item: {}", best_result.item.name)
 
         return best_result
+
+    def find_items(
+        self,
+        screenshots: Iterable[utils.ScreenshotSource],
+        batch_size: int = BATCH_SIZE,
+    ) -> Iterator[BatchResult]:
+        """Find items in many screenshots, yield the results in input order.
+
+        Screenshots are processed in batches: first the unique item is
+        located and its title read in all of them, then the screenshots
+        are grouped by item base (and height) and every item of the base is checked
+        against all of them at once, so its templates are only
+        generated once per batch.
+
+        Errors don't stop the batch, they're returned in BatchResult.error.
+        """
+        it = iter(screenshots)
+
+        while batch := list(islice(it, batch_size)):
+            # The debug data of a batch are not of any use afterwards
+            self.debug_info.clear()
+
+            results = [BatchResult(screenshot=screenshot) for screenshot in batch]
+            # Keyed by item base and screenshot height
+            by_base: dict[tuple[str, int], list[tuple[BatchResult, CroppedItemInfo]]]
+            by_base = defaultdict(list)
+
+            for batch_result in results:
+                logger.info(
+                    "Finding item in screenshot: {}",
+                    utils.describe_source(batch_result.screenshot),
+                )
+
+                try:
+                    cropped_item = self.find_unique(batch_result.screenshot)
+                except Exception as e:  # noqa: BLE001
+                    self._set_batch_error(batch_result, e)
+                else:
+                    by_base[cropped_item.base, cropped_item.height].append(
+                        (batch_result, cropped_item),
+                    )
+
+                batch_result.timings = self.timings
+                batch_result.counts = self.counts
+
+            for (base, height), cropped_items in by_base.items():
+                self._match_base(base, cropped_items, self.profiles.get(height))
+
+            for batch_result in results:
+                metrics.record_screenshot(
+                    batch_result.timings,
+                    batch_result.counts,
+                    batch_result.error.__class__.__name__ if batch_result.error else None,
+                )
+
+            yield from results
+
+    def _match_base(
+        self,
+        base: str,
+        cropped_items: list[tuple[BatchResult, CroppedItemInfo]],
+        profile: ResolutionProfile,
+    ) -> None:
+        """Match all cropped out items of one base and screenshot height, see find_items."""
+        logger.info("Matching {} screenshot(s) of base {}", len(cropped_items), base)
+
+        pending: list[tuple[BatchResult, CroppedItemInfo, list[MatchResult]]] = [
+            (batch_result, cropped_item, [])
+            for batch_result, cropped_item in cropped_items
+            if not self._batch_match_without_templates(batch_result, cropped_item)
+        ]
+
+        # Items first, so that each item's templates are used for
+        # all screenshots while they're still in the template bank
+        for item in self.item_loader.filter_base(base):
+            try:
+                template_set = profile.template_bank.get(item)
+            except Exception as e:  # noqa: BLE001
+                # Without the item's templates, none of the screenshots can be matched
+                for batch_result, _, _ in pending:
+                    self._set_batch_error(batch_result, e)
+
+                pending.clear()
+                break
+
+            for entry in pending.copy():
+                batch_result, cropped_item, results_all = entry
+
+                try:
+                    with utils.timed(batch_result.timings, "match"):
+                        results_all.append(
+                            self.check_template_set(
+                                cropped_item.image,
+                                template_set,
+                                cropped_item.context,
+                            ),
+                        )
+                except Exception as e:  # noqa: BLE001
+                    self._set_batch_error(batch_result, e)
+                    pending.remove(entry)
+                else:
+                    utils.add_count(batch_result.counts, "candidates")
+                    utils.add_count(batch_result.counts, "variants", len(template_set.variants))
+
+        for batch_result, cropped_item, results_all in pending:
+            try:
+                batch_result.result = self._pick_best_result(
+                    cropped_item,
+                    results_all,
+                    batch_result.timings,
+                )
+            except Exception as e:  # noqa: BLE001
+                self._set_batch_error(batch_result, e)
+
+    def _batch_match_without_templates(
+        self,
+        batch_result: BatchResult,
+        cropped_item: CroppedItemInfo,
+    ) -> bool:
+        """Try to find the item without templates, return False if they're needed."""
+        try:
+            batch_result.result = self._match_without_templates(cropped_item)
+        except Exception as e:  # noqa: BLE001
+            self._set_batch_error(batch_result, e)
+
+        return batch_result.result is not None or batch_result.error is not None
+
+    def _set_batch_error(self, batch_result: BatchResult, error: Exception) -> None:
+        """Record an error of one screenshot in find_items."""
+        batch_result.error = error
+
+        if isinstance(error, BaseUMError):
+            logger.error(
+                "Cannot process {}: {}",
+                utils.describe_source(batch_result.screenshot),
+                error,
+            )
+        else:
+            logger.exception(
+                "Unexpected error while processing {}",
+                utils.describe_source(batch_result.screenshot),
+            )
@@ -0,0 +1,241 @@
+"""Memory profiling of long matching sessions.
+
+MemoryProfiler is told about every processed screenshot and every
+`interval` screenshots records the RSS, the memory traced by tracemalloc,
+the number of live PIL images and open files. At the end it reports the
+growth per screenshot and the code that allocated the memory that's
+still alive.
+
+The first interval is a warm-up (filling the template bank, lazy imports),
+growth is measured from its end.
+"""
+
+import gc
+import os
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from PIL import Image
+
+# Take a sample every N screenshots by default
+MEMORY_INTERVAL = 50
+
+# Number of frames stored per allocation
+TRACE_FRAMES = 10
+
+# Number of allocation sites in the report
+TOP_ALLOCATIONS = 10
+
+
+def current_rss() -> int | None:
+    """Return the resident set size of this process (bytes), None if unknown."""
+    try:
+        import psutil  # type: ignore[import]
+    except ImportError:
+        pass
+    else:
+        return int(psutil.Process().memory_info().rss)
+
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def count_open_files() -> int | None:
+    """Return the number of open file descriptors, None if unknown."""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def count_pil_images() -> int:
+    """Return the number of live PIL images."""
+    return sum(isinstance(obj, Image.Image) for obj in gc.get_objects())
+
+
+def _format_size(size: float) -> str:
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(size) < 1024:  # noqa: PLR2004
+            return f"{size:.1f} {unit}"
+
+        size /= 1024
+
+    return f"{size:.1f} GiB"
+
+
+@dataclass
+class MemorySample:
+    """Memory usage after a number of processed screenshots."""
+
+    processed: int
+    rss: int | None
+    traced: int
+    peak: int
+    pil_images: int
+    open_files: int | None
+
+
+class MemoryProfiler:
+    """Track memory usage over processed screenshots, see the module docstring."""
+
+    def __init__(
+        self,
+        interval: int = MEMORY_INTERVAL,
+        *,
+        top: int = TOP_ALLOCATIONS,
+        frames: int = TRACE_FRAMES,
+    ) -> None:
+        self.interval = max(interval, 1)
+        self.top = top
+        self.frames = frames
+        self.processed = 0
+        self.samples: list[MemorySample] = []
+
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._last: tracemalloc.Snapshot | None = None
+        self._started_tracing = False
+
+    def start(self) -> None:
+        """Start tracing allocations and take the first sample."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+
+        self.sample()
+
+    def stop(self) -> None:
+        """Take the last sample and stop tracing, if it was started by start()."""
+        if self.samples and self.samples[-1].processed != self.processed:
+            self.sample()
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def step(self, count: int = 1) -> None:
+        """Count processed screenshots, take a sample every `interval` of them."""
+        before = self.processed // self.interval
+        self.processed += count
+
+        if self.processed // self.interval > before:
+            self.sample()
+
+    def sample(self) -> MemorySample:
+        """Record the memory usage now."""
+        # Only count what's really alive (and not the profiler itself)
+        gc.collect()
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(inclusive=False, filename_pattern=pattern)
+                for pattern in [__file__, tracemalloc.__file__, "<frozen importlib._bootstrap>"]
+            ],
+        )
+        traced, peak = tracemalloc.get_traced_memory()
+
+        sample = MemorySample(
+            processed=self.processed,
+            rss=current_rss(),
+            traced=traced,
+            peak=peak,
+            pil_images=count_pil_images(),
+            open_files=count_open_files(),
+        )
+        self.samples.append(sample)
+
+        # The end of the warm-up is the baseline
+        if len(self.samples) <= 2:  # noqa: PLR2004
+            self._baseline = snapshot
+
+        self._last = snapshot
+
+        return sample
+
+    def _steady_samples(self) -> list[MemorySample]:
+        """Return the samples after the warm-up."""
+        return self.samples[1:] if len(self.samples) > 2 else self.samples  # noqa: PLR2004
+
+    def growth(self) -> dict[str, float]:
+        """Return the growth per screenshot after the warm-up."""
+        samples = self._steady_samples()
+
+        if len(samples) < 2 or samples[-1].processed == samples[0].processed:  # noqa: PLR2004
+            return {}
+
+        first, last = samples[0], samples[-1]
+        processed = last.processed - first.processed
+        growth = {
+            "traced": (last.traced - first.traced) / processed,
+            "pil_images": (last.pil_images - first.pil_images) / processed,
+        }
+
+        if first.rss is not None and last.rss is not None:
+            growth["rss"] = (last.rss - first.rss) / processed
+
+        if first.open_files is not None and last.open_files is not None:
+            growth["open_files"] = (last.open_files - first.open_files) / processed
+
+        return growth
+
+    def top_allocations(self) -> list[dict[str, Any]]:
+        """Return the allocation sites that grew the most after the warm-up."""
+        if self._baseline is None or self._last is None:
+            return []
+
+        stats = self._last.compare_to(self._baseline, "lineno")
+
+        return [
+            {
+                "location": str(stat.traceback[0]),
+                "size": stat.size,
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[: self.top]
+            if stat.size_diff > 0
+        ]
+
+    def report(self) -> dict[str, Any]:
+        """Return the samples, growth and top allocations as a JSON-serializable dict."""
+        return {
+            "interval": self.interval,
+            "processed": self.processed,
+            "samples": [asdict(sample) for sample in self.samples],
+            "growth_per_screenshot": self.growth(),
+            "top_allocations": self.top_allocations(),
+        }
+
+    def format_report(self) -> str:
+        """Return the report as human readable text."""
+        lines = ["Memory over time:", "  screenshots         RSS      traced  PIL images  files"]
+
+        for sample in self.samples:
+            rss = _format_size(sample.rss) if sample.rss is not None else "-"
+            files = str(sample.open_files) if sample.open_files is not None else "-"
+            lines.append(
+                f"  {sample.processed:>11} {rss:>11} {_format_size(sample.traced):>11}"
+                f" {sample.pil_images:>11} {files:>6}",
+            )
+
+        if growth := self.growth():
+            lines += ["", "Growth per screenshot (after warm-up):"]
+            lines += [
+                f"  {name}: {_format_size(value) if name in ('rss', 'traced') else f'{value:.3f}'}"
+                for name, value in growth.items()
+            ]
+
+        if top := self.top_allocations():
+            lines += ["", "Top growing allocation sites (after warm-up):"]
+            lines += [
+                f"  {stat['location']}: +{_format_size(stat['size_diff'])}"
+                f" ({stat['count_diff']:+} blocks, {_format_size(stat['size'])} total)"
+                for stat in top
+            ]
+
+        return "\n".join(lines)
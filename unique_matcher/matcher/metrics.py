@@ -0,0 +1,352 @@
+"""Counters and histograms of the matching.
+
+Nothing is collected unless OPT_METRICS is enabled (or REGISTRY.enabled
+is set at runtime), until then every update is a single attribute check.
+
+The metrics can be read with REGISTRY.snapshot(), exported in the Prometheus
+text format with REGISTRY.to_prometheus(), or written periodically into
+a file for the node exporter's textfile collector with REGISTRY.start_writer().
+"""
+
+import bisect
+import threading
+from pathlib import Path
+from typing import Any, ClassVar
+
+from loguru import logger
+
+from unique_matcher.constants import OPT_METRICS
+
+# Histogram buckets of the stage latencies (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histogram buckets of the number of candidates
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+# How often start_writer writes the metrics file (seconds)
+WRITE_INTERVAL = 15.0
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Metric:
+    """Base class for metrics."""
+
+    kind: ClassVar[str]
+
+    def __init__(self, registry: "Registry", name: str, help_text: str) -> None:
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Drop all values."""
+        raise NotImplementedError
+
+    def samples(self) -> list[tuple[str, Labels, float]]:
+        """Return all samples as (name, labels, value)."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. the number of processed screenshots."""
+
+    kind = "counter"
+
+    def __init__(self, registry: "Registry", name: str, help_text: str) -> None:
+        super().__init__(registry, name, help_text)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, value: float = 1, **labels: str) -> None:
+        """Increase the counter (of the given labels)."""
+        if not self.registry.enabled:
+            return
+
+        key = tuple(sorted(labels.items()))
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels: str) -> float:
+        """Return the current value (of the given labels)."""
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def reset(self) -> None:
+        """Drop all values."""
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> list[tuple[str, Labels, float]]:
+        """Return all samples as (name, labels, value)."""
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """Distribution of values in buckets, e.g. latencies."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        help_text: str,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(registry, name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+        # Per labels: count in each bucket (the last one is +Inf), sum, count
+        self._values: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Add a value (of the given labels)."""
+        if not self.registry.enabled:
+            return
+
+        key = tuple(sorted(labels.items()))
+        bucket = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+
+            counts, totals = self._values[key]
+            counts[bucket] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observed values (of the given labels)."""
+        if (values := self._values.get(tuple(sorted(labels.items())))) is None:
+            return 0
+
+        return int(values[1][1])
+
+    def reset(self) -> None:
+        """Drop all values."""
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> list[tuple[str, Labels, float]]:
+        """Return the cumulative buckets, sum and count of all labels as (name, labels, value)."""
+        samples: list[tuple[str, Labels, float]] = []
+
+        with self._lock:
+            for labels, (counts, (total, count)) in self._values.items():
+                cumulative = 0
+
+                for bound, bucket_count in zip(
+                    (*self.buckets, float("inf")),
+                    counts,
+                    strict=True,
+                ):
+                    cumulative += bucket_count
+                    samples.append(
+                        (
+                            f"{self.name}_bucket",
+                            (*labels, ("le", _format_value(bound))),
+                            cumulative,
+                        ),
+                    )
+
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+
+        return samples
+
+
+class Registry:
+    """Collection of all metrics."""
+
+    def __init__(self, *, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._metrics: dict[str, Metric] = {}
+        self._writer: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """Create a new counter."""
+        counter = Counter(self, name, help_text)
+        self._metrics[name] = counter
+
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Create a new histogram."""
+        histogram = Histogram(self, name, help_text, buckets)
+        self._metrics[name] = histogram
+
+        return histogram
+
+    def reset(self) -> None:
+        """Drop the values of all metrics."""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return all metrics as a JSON-serializable dict."""
+        return {
+            name: {
+                "type": metric.kind,
+                "help": metric.help,
+                "samples": [
+                    {"name": sample, "labels": dict(labels), "value": value}
+                    for sample, labels, value in metric.samples()
+                ],
+            }
+            for name, metric in self._metrics.items()
+        }
+
+    def to_prometheus(self) -> str:
+        """Return all metrics in the Prometheus text format."""
+        lines = []
+
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(
+                f"{sample}{_format_labels(labels)} {_format_value(value)}"
+                for sample, labels, value in metric.samples()
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """Write the metrics into a file in the Prometheus text format."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_name(path.name + ".tmp")
+
+        # Replace the file at once, so the collector never reads half of it
+        tmp_file.write_text(self.to_prometheus(), encoding="utf-8")
+        tmp_file.replace(path)
+
+    def start_writer(self, path: Path, interval: float = WRITE_INTERVAL) -> None:
+        """Enable the metrics and write them into a file every `interval` seconds."""
+        self.enabled = True
+
+        if self._writer is not None:
+            return
+
+        self._stop.clear()
+        self._writer = threading.Thread(
+            target=self._write_periodically,
+            args=(path, interval),
+            name="metrics-writer",
+            daemon=True,
+        )
+        self._writer.start()
+
+    def stop_writer(self) -> None:
+        """Stop writing the metrics file, it's written one last time."""
+        if self._writer is None:
+            return
+
+        self._stop.set()
+        self._writer.join()
+        self._writer = None
+
+    def _write_periodically(self, path: Path, interval: float) -> None:
+        while True:
+            stop = self._stop.wait(interval)
+
+            try:
+                self.write_textfile(path)
+            except OSError:
+                logger.exception("Cannot write metrics into {}", path)
+
+            if stop:
+                return
+
+
+REGISTRY = Registry(enabled=OPT_METRICS)
+
+SCREENSHOTS = REGISTRY.counter(
+    "unique_matcher_screenshots_total",
+    "Processed screenshots by status (ok, error).",
+)
+FAILURES = REGISTRY.counter(
+    "unique_matcher_failures_total",
+    "Failed screenshots by exception type.",
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "unique_matcher_stage_seconds",
+    "Time spent in each matching stage.",
+)
+CANDIDATES = REGISTRY.histogram(
+    "unique_matcher_candidates",
+    "Candidate items of the base template matched per screenshot.",
+    COUNT_BUCKETS,
+)
+VARIANTS = REGISTRY.counter(
+    "unique_matcher_variants_matched_total",
+    "Item variants (sockets, colors) template matched.",
+)
+OCR_CALLS = REGISTRY.counter(
+    "unique_matcher_ocr_calls_total",
+    "Tesseract calls.",
+)
+TEMPLATE_CACHE = REGISTRY.counter(
+    "unique_matcher_template_cache_total",
+    "Template bank lookups by result (hit, miss).",
+)
+STAGE_CACHE = REGISTRY.counter(
+    "unique_matcher_stage_cache_total",
+    "On-disk stage cache lookups by result (hit, miss).",
+)
+
+
+def record_screenshot(
+    timings: dict[str, float],
+    counts: dict[str, int],
+    error: str | None = None,
+) -> None:
+    """Record the metrics of one processed screenshot.
+
+    `error` is the name of the exception if the screenshot failed.
+    """
+    if not REGISTRY.enabled:
+        return
+
+    SCREENSHOTS.inc(status="ok" if error is None else "error")
+
+    if error is not None:
+        FAILURES.inc(error=error)
+
+    for stage, elapsed in timings.items():
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+
+    if "candidates" in counts:
+        CANDIDATES.observe(counts["candidates"])
+
+    if variants := counts.get("variants", 0):
+        VARIANTS.inc(variants)
@@ -0,0 +1,315 @@
+"""Pipelined matching of many screenshots.
+
+Matching a screenshot goes through these stages:
+
+    load -> guides -> title -> match
+
+Every stage has its own worker threads with a bounded queue in front of it,
+so while one screenshot is being read by tesseract, the next one can already
+be searched for the control guides and the previous one matched against
+the item templates. OpenCV and tesseract (a subprocess) don't hold the GIL,
+so the throughput of a long queue is limited by the slowest stage rather than
+the sum of all stages.
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from loguru import logger
+
+from unique_matcher.matcher import metrics, utils
+from unique_matcher.matcher.exceptions import BaseUMError
+from unique_matcher.matcher.matcher import Matcher
+from unique_matcher.matcher.result import (
+    BatchResult,
+    CroppedItemInfo,
+    LocatedItem,
+    MatchResult,
+)
+
+# Names of the stages, in order
+STAGES = ["load", "guides", "title", "match"]
+
+# Default number of worker threads of each stage.
+# Reading the title runs tesseract and is usually the slowest stage.
+STAGE_WORKERS = {
+    "load": 1,
+    "guides": 1,
+    "title": 2,
+    "match": 1,
+}
+
+# Max. number of screenshots waiting in front of each stage
+QUEUE_SIZE = 8
+
+
+@dataclass
+class StageStats:
+    """Metrics of one pipeline stage."""
+
+    name: str
+    workers: int
+    processed: int = 0
+    errors: int = 0
+    busy: float = 0.0  # Total time spent processing (seconds)
+    max_latency: float = 0.0
+    depth: int = 0  # Screenshots waiting in front of the stage now
+    max_depth: int = 0
+
+    @property
+    def avg_latency(self) -> float:
+        """Return the average time to process one screenshot (seconds)."""
+        return self.busy / self.processed if self.processed else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a JSON-serializable dict."""
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "errors": self.errors,
+            "busy": self.busy,
+            "avg_latency": self.avg_latency,
+            "max_latency": self.max_latency,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+        }
+
+
+@dataclass
+class _Job:
+    """One screenshot going through the pipeline."""
+
+    index: int
+    result: BatchResult
+    data: Any = field(default=None, repr=False)  # Output of the last stage
+
+
+class Pipeline:
+    """Match screenshots in overlapping stages, see the module docstring.
+
+    Screenshots are added with submit() and their results collected with
+    completed() (e.g. from a GUI timer), or all at once with run().
+    Results come in the order they're done, errors are stored in
+    BatchResult.error.
+    """
+
+    def __init__(
+        self,
+        matcher: Matcher | None = None,
+        *,
+        workers: dict[str, int] | None = None,
+        queue_size: int = QUEUE_SIZE,
+    ) -> None:
+        self.matcher = matcher or Matcher()
+
+        workers = {**STAGE_WORKERS, **(workers or {})}
+
+        if unknown := set(workers) - set(STAGES):
+            msg = f"Unknown pipeline stage(s): {', '.join(sorted(unknown))}"
+            raise ValueError(msg)
+
+        self._functions: list[Callable[[_Job], Any]] = [
+            self._load,
+            self._guides,
+            self._title,
+            self._match,
+        ]
+        self._queues: list[queue.Queue[_Job | None]] = [
+            queue.Queue(maxsize=queue_size) for _ in STAGES
+        ]
+        self._done: queue.Queue[_Job | None] = queue.Queue()
+
+        self.stats = {name: StageStats(name=name, workers=workers[name]) for name in STAGES}
+        self._stats_lock = threading.Lock()
+
+        self._submitted = 0
+        self._threads = [
+            [
+                threading.Thread(
+                    target=self._work,
+                    args=(i,),
+                    name=f"pipeline-{name}-{n}",
+                    daemon=True,
+                )
+                for n in range(max(workers[name], 1))
+            ]
+            for i, name in enumerate(STAGES)
+        ]
+
+        for threads in self._threads:
+            for thread in threads:
+                thread.start()
+
+    def _load(self, job: _Job) -> tuple[np.ndarray, np.ndarray]:
+        return self.matcher.decode_screen(job.result.screenshot)
+
+    def _guides(self, job: _Job) -> LocatedItem:
+        job.result.located = self.matcher.locate_unique(*job.data)
+
+        return job.result.located
+
+    def _title(self, job: _Job) -> CroppedItemInfo:
+        return self.matcher.read_title(job.data)
+
+    def _match(self, job: _Job) -> MatchResult:
+        # Adds the "match" and "plugin" timings by itself
+        return self.matcher.match_cropped(job.data, job.result.timings, job.result.counts)
+
+    def _work(self, stage: int) -> None:
+        """Run the worker loop of one stage."""
+        name = STAGES[stage]
+        func = self._functions[stage]
+        stats = self.stats[name]
+        in_queue = self._queues[stage]
+        is_last = stage == len(STAGES) - 1
+
+        while (job := in_queue.get()) is not None:
+            with self._stats_lock:
+                stats.depth -= 1
+
+            t_start = time.perf_counter()
+
+            try:
+                job.data = func(job)
+            except Exception as e:  # noqa: BLE001
+                job.result.error = e
+                self._log_error(job, e)
+
+            elapsed = time.perf_counter() - t_start
+
+            if not is_last:
+                job.result.timings[name] = elapsed
+
+            with self._stats_lock:
+                stats.processed += 1
+                stats.errors += job.result.error is not None
+                stats.busy += elapsed
+                stats.max_latency = max(stats.max_latency, elapsed)
+
+            if job.result.error is None and not is_last:
+                self._enqueue(stage + 1, job)
+                continue
+
+            if job.result.error is None:
+                job.result.result = job.data
+                job.data = None
+
+            metrics.record_screenshot(
+                job.result.timings,
+                job.result.counts,
+                job.result.error.__class__.__name__ if job.result.error else None,
+            )
+            self._done.put(job)
+
+    def _enqueue(self, stage: int, job: _Job, *, block: bool = True) -> None:
+        """Put a job in front of a stage, raise queue.Full if not blocking and full."""
+        stats = self.stats[STAGES[stage]]
+
+        # Count it first, the worker may pick it up right away
+        with self._stats_lock:
+            stats.depth += 1
+            stats.max_depth = max(stats.max_depth, stats.depth)
+
+        try:
+            self._queues[stage].put(job, block=block)
+        except queue.Full:
+            with self._stats_lock:
+                stats.depth -= 1
+
+            raise
+
+    def _log_error(self, job: _Job, error: Exception) -> None:
+        source = utils.describe_source(job.result.screenshot)
+
+        if isinstance(error, BaseUMError):
+            logger.error("Cannot process {}: {}", source, error)
+        else:
+            logger.exception("Unexpected error while processing {}", source)
+
+    def submit(self, screenshot: utils.ScreenshotSource, *, block: bool = True) -> bool:
+        """Add a screenshot to the pipeline.
+
+        Return False if the pipeline is full and `block` is False.
+        """
+        job = _Job(index=self._submitted, result=BatchResult(screenshot=screenshot))
+
+        try:
+            self._enqueue(0, job, block=block)
+        except queue.Full:
+            return False
+
+        self._submitted += 1
+
+        return True
+
+    def completed(self) -> Iterator[BatchResult]:
+        """Yield the results done so far, without waiting for more."""
+        while True:
+            try:
+                job = self._done.get_nowait()
+            except queue.Empty:
+                return
+
+            if job is not None:
+                yield job.result
+
+    def close(self) -> None:
+        """Wait until all submitted screenshots are done and stop the workers.
+
+        The results are still available in completed().
+        """
+        for stage_queue, threads in zip(self._queues, self._threads, strict=True):
+            for _ in threads:
+                stage_queue.put(None)
+
+            for thread in threads:
+                thread.join()
+
+    def run(
+        self,
+        screenshots: Iterable[utils.ScreenshotSource],
+        *,
+        ordered: bool = True,
+    ) -> Iterator[BatchResult]:
+        """Process all screenshots, then close the pipeline.
+
+        Yield the results in input order, or as soon as they're done
+        if `ordered` is False.
+        """
+        next_index = self._submitted
+        waiting: dict[int, BatchResult] = {}
+
+        feeder = threading.Thread(target=self._feed, args=(screenshots,), daemon=True)
+        feeder.start()
+
+        while (job := self._done.get()) is not None:
+            if not ordered:
+                yield job.result
+                continue
+
+            waiting[job.index] = job.result
+
+            while next_index in waiting:
+                yield waiting.pop(next_index)
+                next_index += 1
+
+        feeder.join()
+
+    def _feed(self, screenshots: Iterable[utils.ScreenshotSource]) -> None:
+        """Submit all screenshots and close the pipeline, used by run()."""
+        try:
+            for screenshot in screenshots:
+                self.submit(screenshot)
+        finally:
+            self.close()
+            self._done.put(None)
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Return the metrics of all stages."""
+        with self._stats_lock:
+            return {name: stats.as_dict() for name, stats in self.stats.items()}
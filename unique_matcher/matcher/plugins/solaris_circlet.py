@@ -1,5 +1,6 @@
 import numpy as np
 
+from unique_matcher.constants import TEMPLATE_HEIGHT
 from unique_matcher.matcher.plugins.base import BaseMatcher
 from unique_matcher.matcher.result import (
     CroppedItemInfo,
@@ -22,7 +23,11 @@ class SolarisCircletMatcher(BaseMatcher):
         best_result = get_best_result(results_all, MatchingAlgorithm.DEFAULT)
 
         if best_result.item.file in ["Flamesight", "Galesight", "Thundersight"]:
-            gem = cropped_item.image.crop((25, 45, 32, 50))
+            # The gem is at (25, 45, 32, 50) at 1080p
+            scale = cropped_item.height / TEMPLATE_HEIGHT
+            gem = cropped_item.image.crop(
+                (round(25 * scale), round(45 * scale), round(32 * scale), round(50 * scale)),
+            )
             arr = np.array(gem)
 
             avg_colors = arr.mean(axis=0).mean(axis=0)[:3]
@@ -0,0 +1,267 @@
+"""Resolution profiles.
+
+The control guide templates and ITEM_MAX_SIZE are taken at 1080p.
+PoE scales its UI with the screen height, so for the other supported
+heights everything resolution dependent is scaled once into a
+ResolutionProfile, instead of resizing every screenshot:
+
+- the control guides
+- the size of the item area and the offsets of the title crop
+- a template bank, whose sets are the 1080p template sets scaled
+
+The scaled guides and template sets are cached on the disk, in a
+directory per profile named after a fingerprint of the version, the
+scaling code and the assets (see cache.fingerprint_files), so they're
+only scaled once. A template set is
+also scaled again when the item icon is newer than its cache entry.
+
+Screenshots of other heights use the 1080p profile as they always did.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import cv2
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from unique_matcher.constants import (
+    CACHE_DIR,
+    ITEM_MAX_SIZE,
+    ROOT_DIR,
+    TEMPLATE_HEIGHT,
+    TEMPLATES_DIR,
+)
+from unique_matcher.matcher.cache import fingerprint_files
+from unique_matcher.matcher.items import Item
+from unique_matcher.matcher.result import ItemTemplate
+from unique_matcher.matcher.templates import (
+    TemplateBank,
+    TemplateSet,
+    build_template_set,
+)
+
+# Screen heights with their own profile
+SUPPORTED_HEIGHTS = [720, 768, 900, 1050, 1080, 1200, 1440, 1600, 2160]
+
+# Control guide templates by name
+GUIDES = {
+    "one_line": "unique-one-line-fullhd.png",
+    "one_line_end": "unique-one-line-end-fullhd.png",
+    "two_line": "unique-two-line-fullhd.png",
+    "two_line_end": "unique-two-line-end-fullhd.png",
+    "two_line_cmp": "unique-two-line-fullhd-compressed.png",
+    "two_line_end_cmp": "unique-two-line-end-fullhd-compressed.png",
+}
+
+# Where the scaled control guides and template sets are cached
+PROFILE_CACHE_DIR = CACHE_DIR / "profiles"
+
+# Sources that change the scaled guides and template sets
+PROFILE_SOURCES = (
+    ROOT_DIR / "unique_matcher" / "matcher" / "generator.py",
+    ROOT_DIR / "unique_matcher" / "matcher" / "profiles.py",
+    ROOT_DIR / "unique_matcher" / "matcher" / "templates.py",
+)
+
+
+def scale_size(size: tuple[int, int], scale: float) -> tuple[int, int]:
+    """Scale (width, height), keeping at least 1px."""
+    return max(round(size[0] * scale), 1), max(round(size[1] * scale), 1)
+
+
+def scale_image(image: Image.Image, scale: float) -> Image.Image:
+    """Resize an image by a factor."""
+    return image.resize(scale_size(image.size, scale), Image.Resampling.LANCZOS)
+
+
+def scale_template_set(template_set: TemplateSet, scale: float) -> TemplateSet:
+    """Scale all variants and the mask of a template set."""
+    variants = [
+        ItemTemplate(image=scale_image(template.image, scale), sockets=template.sockets)
+        for template in template_set.variants
+    ]
+    mask = template_set.mask
+
+    if mask is not None:
+        # Nearest neighbour keeps the mask binary
+        height, width = mask.shape[:2]
+        mask = cv2.resize(
+            mask,
+            scale_size((width, height), scale),
+            interpolation=cv2.INTER_NEAREST,
+        )
+
+    return build_template_set(template_set.item, variants, mask)
+
+
+def _tmp_path(path: Path) -> Path:
+    """Return a temporary path to write a cache entry, unique per process and thread."""
+    return path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{path.suffix}")
+
+
+def load_template_set(path: Path, item: Item) -> TemplateSet | None:
+    """Load a scaled template set saved by save_template_set.
+
+    Return None if it's not cached, broken or older than the item icon.
+    """
+    try:
+        if path.stat().st_mtime <= Path(item.icon).stat().st_mtime:
+            return None
+
+        with np.load(path) as data:
+            variants = [
+                ItemTemplate(image=Image.fromarray(data[f"variant_{i}"]), sockets=int(sockets))
+                for i, sockets in enumerate(data["sockets"])
+            ]
+            mask = data["mask"] if "mask" in data else None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError):
+        logger.warning("Ignoring a broken template set cache entry: {}", path)
+        return None
+
+    return build_template_set(item, variants, mask)
+
+
+def save_template_set(path: Path, template_set: TemplateSet) -> None:
+    """Save the variants and the mask of a scaled template set."""
+    arrays = {
+        f"variant_{i}": np.asarray(template.image)
+        for i, template in enumerate(template_set.variants)
+    }
+    arrays["sockets"] = np.array([template.sockets for template in template_set.variants])
+
+    if template_set.mask is not None:
+        arrays["mask"] = template_set.mask
+
+    tmp_path = _tmp_path(path)
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with tmp_path.open("wb") as fwrite:
+            np.savez(fwrite, **arrays)
+
+        tmp_path.replace(path)
+    except OSError:
+        logger.warning("Cannot cache the scaled template set: {}", path)
+        tmp_path.unlink(missing_ok=True)
+
+
+def _load_image(path: Path) -> Image.Image:
+    """Load an image right away, lazily loaded images cannot be shared between threads."""
+    image = Image.open(path)
+    image.load()
+
+    return image
+
+
+@dataclass
+class ResolutionProfile:
+    """Everything that depends on the screen height, see the module docstring."""
+
+    height: int
+    guides: dict[str, Image.Image]
+    item_max_size: tuple[int, int]
+    template_bank: TemplateBank
+
+    @property
+    def scale(self) -> float:
+        """Return the scale relative to the templates."""
+        return self.height / TEMPLATE_HEIGHT
+
+    def px(self, value: int) -> int:
+        """Scale a distance in pixels at 1080p to this profile."""
+        return round(value * self.scale)
+
+
+class ProfileLoader:
+    """Resolution profiles, created on first use.
+
+    `template_bank` is the bank of the 1080p templates,
+    the banks of other profiles scale its sets.
+    """
+
+    def __init__(self, template_bank: TemplateBank, cache_dir: Path = PROFILE_CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+        self.base = ResolutionProfile(
+            height=TEMPLATE_HEIGHT,
+            guides={name: _load_image(TEMPLATES_DIR / file) for name, file in GUIDES.items()},
+            item_max_size=ITEM_MAX_SIZE,
+            template_bank=template_bank,
+        )
+        self._profiles = {TEMPLATE_HEIGHT: self.base}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_supported(height: int) -> bool:
+        """Return True if screenshots of this height have their own profile."""
+        return height in SUPPORTED_HEIGHTS
+
+    def get(self, height: int) -> ResolutionProfile:
+        """Return the profile for a screen height, the 1080p one if not supported."""
+        if not self.is_supported(height):
+            return self.base
+
+        with self._lock:
+            if (profile := self._profiles.get(height)) is None:
+                profile = self._create(height)
+                self._profiles[height] = profile
+
+        return profile
+
+    def _directory(self, height: int) -> Path:
+        """Return the cache directory of a profile."""
+        return self.cache_dir / f"{fingerprint_files(PROFILE_SOURCES)}-{height}p"
+
+    def _create(self, height: int) -> ResolutionProfile:
+        scale = height / TEMPLATE_HEIGHT
+        directory = self._directory(height) / "items"
+        logger.info("Creating resolution profile for {}p", height)
+
+        def factory(item: Item) -> TemplateSet:
+            path = directory / f"{item.file}.npz"
+
+            if (template_set := load_template_set(path, item)) is not None:
+                return template_set
+
+            template_set = scale_template_set(self.base.template_bank.get(item), scale)
+            save_template_set(path, template_set)
+
+            return template_set
+
+        return ResolutionProfile(
+            height=height,
+            guides=self._scaled_guides(height),
+            item_max_size=scale_size(ITEM_MAX_SIZE, scale),
+            template_bank=TemplateBank(factory),
+        )
+
+    def _scaled_guides(self, height: int) -> dict[str, Image.Image]:
+        """Return the control guides scaled to a height, from the disk cache if possible."""
+        directory = self._directory(height)
+        scale = height / TEMPLATE_HEIGHT
+        guides = {}
+
+        for name, file in GUIDES.items():
+            path = directory / file
+
+            if path.exists():
+                guides[name] = _load_image(path)
+                continue
+
+            guides[name] = scale_image(self.base.guides[name], scale)
+
+            try:
+                directory.mkdir(parents=True, exist_ok=True)
+                tmp_path = _tmp_path(path)
+                guides[name].save(tmp_path)
+                tmp_path.replace(path)
+            except OSError:
+                logger.warning("Cannot cache the scaled control guide: {}", path)
+
+        return guides
@@ -1,14 +1,17 @@
 """Module for everything related to match results."""
 
 import math
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 from loguru import logger
 from PIL import Image
 
+from unique_matcher.constants import TEMPLATE_HEIGHT
+from unique_matcher.matcher.context import ScreenshotContext
 from unique_matcher.matcher.exceptions import CannotIdentifyUniqueItemError
 from unique_matcher.matcher.items import Item
+from unique_matcher.matcher.utils import ScreenshotSource
 
 # Threshold for discarding results based on the distance
 # in either min_val or hist_val between the best result
@@ -27,6 +30,31 @@ class CroppedItemInfo:
     name: str
     identified: bool
 
+    # Height of the screenshot, see matcher.profiles
+    height: int = TEMPLATE_HEIGHT
+
+    # Crops of `image` shared by all candidate items and plugins
+    context: ScreenshotContext = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.context = ScreenshotContext(self.image)
+
+
+@dataclass
+class LocatedItem:
+    """The unique item and its title cropped out of a screenshot, before reading the title."""
+
+    image: Image.Image
+    title: Image.Image
+    identified: bool
+
+    # Locations of the start and end control guides in the screenshot
+    start: tuple[int, int] = (0, 0)
+    end: tuple[int, int] = (0, 0)
+
+    # Height of the screenshot, see matcher.profiles
+    height: int = TEMPLATE_HEIGHT
+
 
 class MatchingAlgorithm(Enum):
     """Enum for matching algorithm during get_best_result."""
@@ -81,6 +109,35 @@ class MatchResult:
     hist_val: float = 0.0
     template: ItemTemplate | None = None
 
+    def as_dict(self) -> dict[str, str | float | bool | None]:
+        """Return the result as a JSON-serializable dict."""
+        return {
+            "item": self.item.name,
+            "file": self.item.file,
+            "base": self.item.base,
+            "matched_by": self.matched_by.name,
+            "identified": self.identified,
+            "min_val": self.min_val,
+            "hist_val": self.hist_val,
+        }
+
+
+@dataclass
+class BatchResult:
+    """Result of one screenshot processed by Matcher.find_items.
+
+    Either `result` or `error` is set.
+    """
+
+    screenshot: ScreenshotSource
+    result: MatchResult | None = None
+    error: Exception | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+
+    # Set by the Pipeline once the item is located
+    located: LocatedItem | None = field(default=None, repr=False)
+
 
 def get_distance_from_best(results: list[MatchResult]) -> tuple[float, float]:
     """Get the distance in min_val and hist_val between 1st and 2nd result.
@@ -0,0 +1,140 @@
+"""Masked TM_SQDIFF_NORMED with precomputed template terms.
+
+With a mask M, OpenCV computes for every location of the template T
+over the image I:
+
+    sum((T - I)^2 * M) / sqrt(sum(T^2 * M) * sum(I^2 * M))
+
+(uint8 masks are binary, so M^2 = M). Expanding the square gives
+
+    sum(T^2 * M) - 2 * sum((T * M) * I) + sum(I^2 * M)
+
+cv2.matchTemplate with a mask recomputes all of it for every call.
+But the template terms, T * M and its energy sum(T^2 * M), are the same
+for every screenshot, so they're computed once per template set,
+and the image energy sum(I^2 * M) is the same for all variants of an
+item, which share the mask. Per variant, only the correlation of the
+image with T * M remains, which is a plain TM_CCORR (DFT based for
+larger templates).
+
+Pixels outside of the mask don't contribute to any of the terms, so
+the templates and the mask are trimmed to the bounding box of the mask.
+Icons often have wide transparent margins, so this makes the
+correlations a lot smaller. The image is cut by the same margins,
+which keeps the result, its size and locations the same as with
+the full template.
+"""
+
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class MaskedTemplates:
+    """Template terms of all variants of one item, in the order of the variants.
+
+    `mask` and `weighted` are trimmed to `box`.
+    """
+
+    # The mask as 0 or 1
+    mask: np.ndarray
+
+    # The variants multiplied by the mask (T * M)
+    weighted: list[np.ndarray]
+
+    # Energy of the masked variants, sum(T^2 * M)
+    energies: list[float]
+
+    # Size of the untrimmed templates (width, height)
+    size: tuple[int, int]
+
+    # Bounding box of the mask in the untrimmed templates (left, top, right, bottom)
+    box: tuple[int, int, int, int]
+
+
+@dataclass
+class ImageTerms:
+    """Image terms shared by all variants of one item."""
+
+    image: np.ndarray
+
+    # Energy of the masked image, sum(I^2 * M) at every location
+    energy: np.ndarray
+
+
+def mask_box(mask: np.ndarray) -> tuple[int, int, int, int]:
+    """Return the bounding box (left, top, right, bottom) of the nonzero pixels of a mask.
+
+    An empty mask has nothing to trim, its box is the whole mask.
+    """
+    height, width = mask.shape[:2]
+    x, y, box_width, box_height = cv2.boundingRect((mask != 0).astype(np.uint8))
+
+    if box_width == 0 or box_height == 0:
+        return 0, 0, width, height
+
+    return x, y, x + box_width, y + box_height
+
+
+def prepare_masked(grays: list[np.ndarray], mask: np.ndarray) -> MaskedTemplates:
+    """Precompute the template terms of grayscale variants with a mask."""
+    height, width = mask.shape[:2]
+    left, top, right, bottom = box = mask_box(mask)
+    binary = (mask[top:bottom, left:right] != 0).astype(np.float32)
+    weighted = []
+
+    for gray in grays:
+        if gray.shape != mask.shape:
+            msg = f"Mask size {mask.shape} doesn't match template size {gray.shape}"
+            raise ValueError(msg)
+
+        weighted.append(gray[top:bottom, left:right].astype(np.float32) * binary)
+
+    return MaskedTemplates(
+        mask=binary,
+        weighted=weighted,
+        energies=[float(np.square(w, dtype=np.float64).sum()) for w in weighted],
+        size=(width, height),
+        box=box,
+    )
+
+
+def image_terms(screen: np.ndarray, masked: MaskedTemplates) -> ImageTerms:
+    """Compute the image terms of a grayscale screenshot.
+
+    The screenshot is cut by the trimmed margins of the templates,
+    see the module docstring.
+    """
+    screen_height, screen_width = screen.shape[:2]
+    width, height = masked.size
+    left, top, right, bottom = masked.box
+
+    image = screen[
+        top : screen_height - height + bottom,
+        left : screen_width - width + right,
+    ].astype(np.float32)
+
+    return ImageTerms(
+        image=image,
+        energy=cv2.matchTemplate(np.square(image), masked.mask, cv2.TM_CCORR),
+    )
+
+
+def sqdiff_normed(terms: ImageTerms, masked: MaskedTemplates, index: int) -> np.ndarray:
+    """Return the masked TM_SQDIFF_NORMED result of one variant.
+
+    Locations where either the template or the image is all black
+    under the mask are a complete mismatch (1).
+    """
+    energy = masked.energies[index]
+    cross = cv2.matchTemplate(terms.image, masked.weighted[index], cv2.TM_CCORR)
+
+    num = energy - 2 * cross + terms.energy
+    den = np.sqrt(energy * np.maximum(terms.energy, 0))
+
+    result = np.ones_like(num)
+    np.divide(num, den, out=result, where=den > 0)
+
+    return np.clip(result, 0, 1, out=result)
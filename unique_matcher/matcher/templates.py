@@ -0,0 +1,136 @@
+"""Cache for item templates."""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from unique_matcher.matcher import metrics, sqdiff, utils
+from unique_matcher.matcher.items import Item
+from unique_matcher.matcher.result import ItemTemplate
+
+# How many items' templates to keep in memory
+TEMPLATE_BANK_SIZE = 32
+
+
+@dataclass
+class TemplateSet:
+    """Everything needed to match one item.
+
+    `grays` and `hists` are the grayscale images and normalized
+    histograms of `variants`, in the same order. With a mask,
+    `masked` has the precomputed terms of masked matching.
+    """
+
+    item: Item
+    variants: list[ItemTemplate]
+    grays: list[np.ndarray]
+    hists: list[np.ndarray]
+    mask: np.ndarray | None = None
+    masked: sqdiff.MaskedTemplates | None = None
+
+
+def build_template_set(
+    item: Item,
+    variants: list[ItemTemplate],
+    mask: np.ndarray | None = None,
+) -> TemplateSet:
+    """Create the template set of item variants, with everything precomputed for matching."""
+    grays = [cv2.cvtColor(np.array(template.image), cv2.COLOR_RGBA2GRAY) for template in variants]
+
+    return TemplateSet(
+        item=item,
+        variants=variants,
+        grays=grays,
+        hists=[utils.calc_normalized_histogram(template.image) for template in variants],
+        mask=mask,
+        masked=sqdiff.prepare_masked(grays, mask) if mask is not None else None,
+    )
+
+
+class TemplateBank:
+    """LRU cache of template sets.
+
+    Generating the socket variants, their masks and histograms is
+    the same work for every screenshot, so keep the recently
+    used items around. Items of one base are typically matched
+    together, so even a small bank gets a lot of hits.
+
+    The bank can be shared between threads.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[Item], TemplateSet],
+        max_size: int = TEMPLATE_BANK_SIZE,
+    ) -> None:
+        self.factory = factory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._sets: OrderedDict[str, TemplateSet] = OrderedDict()
+        # Template sets being created, by item file
+        self._pending: dict[str, Future[TemplateSet]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, item: Item) -> TemplateSet:
+        """Return the template set of an item, creating it if needed.
+
+        The set is created outside of the lock, so other items can be
+        taken from the bank meanwhile. Threads that want the same item
+        wait for the one creating it.
+        """
+        with self._lock:
+            if (template_set := self._sets.get(item.file)) is not None:
+                self._sets.move_to_end(item.file)
+                self.hits += 1
+                metrics.TEMPLATE_CACHE.inc(result="hit")
+                return template_set
+
+            if (future := self._pending.get(item.file)) is None:
+                self.misses += 1
+                metrics.TEMPLATE_CACHE.inc(result="miss")
+                future = self._pending[item.file] = Future()
+                creating = True
+            else:
+                # Created by another thread, not generated again
+                self.hits += 1
+                metrics.TEMPLATE_CACHE.inc(result="hit")
+                creating = False
+
+        if not creating:
+            return future.result()
+
+        try:
+            template_set = self.factory(item)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[item.file]
+
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[item.file]
+            self._sets[item.file] = template_set
+
+            if len(self._sets) > self.max_size:
+                evicted, _ = self._sets.popitem(last=False)
+                logger.debug("Evicted templates of {} from the bank", evicted)
+
+        future.set_result(template_set)
+
+        return template_set
+
+    def clear(self) -> None:
+        """Drop all cached templates."""
+        with self._lock:
+            self._sets.clear()
+
+    def __len__(self) -> int:
+        return len(self._sets)
@@ -9,6 +9,7 @@ from loguru import logger
 from PIL import Image, ImageOps
 
 from unique_matcher.constants import OPT_FIND_BY_NAME_RAISE, TESSERACT_PATH
+from unique_matcher.matcher import metrics
 from unique_matcher.matcher.exceptions import CannotFindItemBaseError
 from unique_matcher.matcher.items import ItemLoader
 from unique_matcher.matcher.utils import normalize_item_name
@@ -159,12 +160,20 @@ class TitleParser:
 
         return name
 
+    def prepare_image(self, title_img: Image.Image) -> Image.Image:
+        """Prepare the cropped out title image for tesseract."""
+        # Add 1px white border to help tesseract
+        return ImageOps.expand(title_img, border=1, fill="white")
+
     def parse_title(self, title_img: Image.Image, *, is_identified: bool) -> tuple[str, str]:
         """Get the item base and name from the cropped out title image."""
-        # Add 1px white border to help tesseract
-        title_img = ImageOps.expand(title_img, border=1, fill="white")
+        metrics.OCR_CALLS.inc()
+        title_raw = pytesseract.image_to_string(self.prepare_image(title_img), "eng")
+
+        return self.parse_raw_title(title_raw, is_identified=is_identified)
 
-        title_raw = pytesseract.image_to_string(title_img, "eng")
+    def parse_raw_title(self, title_raw: str, *, is_identified: bool) -> tuple[str, str]:
+        """Get the item base and name from the title as read by tesseract."""
         title_raw = self._clean_title(title_raw)
 
         if is_identified:
@@ -1,18 +1,184 @@
 """Various utility functions."""
 
 import csv
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, TypeAlias
 
 import cv2
 import numpy as np
 from PIL import Image
 
+from unique_matcher.matcher import frames
+
+# Anything a screenshot can be loaded from:
+# - path to an image file or a raw frame dump (see frames)
+# - encoded image (PNG, JPEG, BMP, ...) or raw frame as bytes or a binary file object
+# - decoded image as a NumPy array in OpenCV channel order (BGR or BGRA)
+# - PIL image
+ScreenshotSource: TypeAlias = (
+    str | Path | bytes | bytearray | memoryview | BinaryIO | np.ndarray | Image.Image
+)
+
 
 def normalize_item_name(name: str) -> str:
     """Convert item name to file."""
     return name.replace("'", "").replace(" ", "_").replace(",", "")
 
 
+@contextmanager
+def timed(timings: dict[str, float], stage: str) -> Iterator[None]:
+    """Add the time spent in the with block to timings[stage] (seconds)."""
+    t_start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - t_start
+
+
+def add_count(counts: dict[str, int], name: str, value: int = 1) -> None:
+    """Add value to counts[name]."""
+    counts[name] = counts.get(name, 0) + value
+
+
+def describe_source(source: ScreenshotSource) -> str:
+    """Return a short description of a screenshot source for logging."""
+    if isinstance(source, str | Path):
+        return str(source)
+
+    if isinstance(source, np.ndarray):
+        return f"<array {source.shape[1]}x{source.shape[0]}>"
+
+    if isinstance(source, Image.Image):
+        return f"<image {source.width}x{source.height}>"
+
+    return f"<{source.__class__.__name__}>"
+
+
+def _decode(buffer: bytes | bytearray | memoryview) -> np.ndarray:
+    """Decode an encoded image into a BGR array, raw frames are used as they are."""
+    if frames.is_raw_frame(buffer):
+        return frames.parse_raw_frame(np.frombuffer(buffer, dtype=np.uint8))
+
+    screen = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    if screen is None:
+        msg = "Cannot decode screenshot"
+        raise ValueError(msg)
+
+    return screen
+
+
+def _load_file(file: str | Path) -> np.ndarray | None:
+    """Memory-map an uncompressed screenshot file, None if it has to be decoded."""
+    suffix = Path(file).suffix.lower()
+
+    try:
+        if suffix == frames.RAW_SUFFIX:
+            return frames.load_raw_frame(file)
+
+        if suffix == ".bmp":
+            return frames.load_bmp(file)
+    except (OSError, ValueError) as e:
+        msg = f"Cannot read screenshot: {file}"
+        raise ValueError(msg) from e
+
+    return None
+
+
+def read_source(source: ScreenshotSource) -> ScreenshotSource:
+    """Read a screenshot file into bytes, other sources are returned as they are.
+
+    A file that cannot be read is returned as it is,
+    load_screenshot then reports the error.
+    """
+    if isinstance(source, str | Path):
+        try:
+            return Path(source).read_bytes()
+        except OSError:
+            return source
+
+    return source
+
+
+def load_screenshot(source: ScreenshotSource) -> np.ndarray:
+    """Load a screenshot into a BGR(A) array, decoding it only once.
+
+    Arrays are returned as they are (no copy), they must be uint8
+    with 3 (BGR) or 4 (BGRA) channels. Raw frames and uncompressed
+    BMP files are returned as read-only views, see frames.
+    """
+    if isinstance(source, np.ndarray):
+        if source.dtype != np.uint8 or source.shape[2:] not in ((3,), (4,)):
+            msg = f"Expected a uint8 BGR(A) array, got {source.dtype} with shape {source.shape}"
+            raise ValueError(msg)
+
+        return source
+
+    if isinstance(source, Image.Image):
+        return cv2.cvtColor(np.asarray(source.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+    if isinstance(source, bytes | bytearray | memoryview):
+        return _decode(source)
+
+    if isinstance(source, str | Path):
+        if (screen := _load_file(source)) is not None:
+            return screen
+
+        screen = cv2.imread(str(source), cv2.IMREAD_COLOR)
+
+        if screen is None:
+            msg = f"Cannot read screenshot: {source}"
+            raise ValueError(msg)
+
+        return screen
+
+    # Binary file object
+    return _decode(source.read())
+
+
+def screen_to_gray(screen: np.ndarray) -> np.ndarray:
+    """Convert a BGR(A) screenshot into grayscale for template matching.
+
+    NOTE: This intentionally treats the BGR data as RGB, which is what
+          cv2.imread + COLOR_RGB2GRAY always did. All the thresholds
+          are tuned to this weighting, so don't "fix" it.
+    """
+    if screen.shape[2] == 4:  # noqa: PLR2004
+        return cv2.cvtColor(screen, cv2.COLOR_RGBA2GRAY)
+
+    return cv2.cvtColor(screen, cv2.COLOR_RGB2GRAY)
+
+
+def crop_screen(screen: np.ndarray, box: tuple[int, int, int, int]) -> Image.Image:
+    """Crop a BGR(A) screenshot into an RGB PIL image.
+
+    Behaves like Image.crop, i.e. areas outside of the screenshot are black.
+    """
+    left, top, right, bottom = box
+
+    if right < left or bottom < top:
+        msg = f"Invalid crop box: {box}"
+        raise ValueError(msg)
+
+    height, width = screen.shape[:2]
+    cropped = np.zeros((bottom - top, right - left, 3), dtype=np.uint8)
+
+    # Intersection of the box and the screenshot
+    src_left, src_top = max(left, 0), max(top, 0)
+    src_right, src_bottom = min(right, width), min(bottom, height)
+
+    if src_right > src_left and src_bottom > src_top:
+        # BGR(A) -> RGB
+        region = screen[src_top:src_bottom, src_left:src_right, 2::-1]
+        cropped[src_top - top : src_bottom - top, src_left - left : src_right - left] = region
+
+    return Image.fromarray(cropped)
+
+
 def image_to_cv(image: Image.Image) -> np.ndarray:
     """Convert a PIL image into CV2 format."""
     image_cv: np.ndarray = np.array(image)
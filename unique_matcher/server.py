@@ -0,0 +1,281 @@
+"""Local matching service.
+
+Keeps a pool of warm Matcher instances and serves match requests over
+localhost HTTP and/or a Unix socket, so that capture tools don't have to
+go through the file queue or construct their own Matcher.
+
+API:
+
+    GET  /health  -> {"status": "ok", "version": ..., "workers": N, "idle": N}
+    GET  /metrics -> metrics in the Prometheus text format
+    POST /match   -> MatchResult as JSON
+
+The body of POST /match is either the encoded screenshot (PNG, JPEG, ...)
+or, with `Content-Type: application/json`, `{"path": "<screenshot path>"}`.
+"""
+
+import json
+import queue
+import socketserver
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from unique_matcher.constants import VERSION
+from unique_matcher.matcher import metrics, utils
+from unique_matcher.matcher.exceptions import BaseUMError
+from unique_matcher.matcher.matcher import Matcher
+
+DEFAULT_PORT = 8765
+
+# How long a request waits for a free Matcher before giving up (seconds)
+ACQUIRE_TIMEOUT = 30.0
+
+# Refuse screenshots larger than this (bytes)
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+
+class PoolExhaustedError(Exception):
+    """When no Matcher becomes available in time."""
+
+
+class MatcherPool:
+    """Pool of warm Matcher instances, one request uses one Matcher at a time."""
+
+    def __init__(self, size: int, factory: Callable[[], Matcher] = Matcher) -> None:
+        self.size = size
+        self._pool: queue.Queue[Matcher] = queue.Queue()
+
+        for _ in range(size):
+            self._pool.put(factory())
+
+        logger.info("Matcher pool ready with {} instance(s)", size)
+
+    @property
+    def idle(self) -> int:
+        """Return the number of idle Matchers."""
+        return self._pool.qsize()
+
+    @contextmanager
+    def acquire(self, timeout: float = ACQUIRE_TIMEOUT) -> Iterator[Matcher]:
+        """Borrow a Matcher from the pool."""
+        try:
+            matcher = self._pool.get(timeout=timeout)
+        except queue.Empty as e:
+            raise PoolExhaustedError from e
+
+        try:
+            yield matcher
+        finally:
+            self._pool.put(matcher)
+
+
+class MatchRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler for the match API."""
+
+    server_version = f"UniqueMatcher/{VERSION}"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def pool(self) -> MatcherPool:
+        """Return the Matcher pool of the server."""
+        return self.server.pool  # type: ignore[attr-defined]
+
+    def address_string(self) -> str:
+        """Return the client address, Unix socket clients don't have one."""
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+
+        return "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Log into loguru instead of stderr."""
+        logger.debug("{} - {}", self.address_string(), format % args)
+
+    def _send_json(self, status: HTTPStatus, data: dict[str, Any]) -> None:
+        body = json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Handle GET requests."""
+        if self.path == "/metrics":
+            body = metrics.REGISTRY.to_prometheus().encode()
+
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self.path != "/health":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "status": "ok",
+                "version": VERSION,
+                "workers": self.pool.size,
+                "idle": self.pool.idle,
+            },
+        )
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Handle POST requests."""
+        if self.path != "/match":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"})
+            return
+
+        if length <= 0 or length > MAX_BODY_SIZE:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid body size"})
+            return
+
+        body = self.rfile.read(length)
+
+        if self.headers.get_content_type() == "application/json":
+            try:
+                screenshot = Path(json.loads(body)["path"])
+            except (ValueError, KeyError, TypeError):
+                self._send_json(HTTPStatus.BAD_REQUEST, {"error": 'Expected {"path": ...}'})
+                return
+
+            status, data = self._match_path(screenshot)
+        else:
+            status, data = self._match_bytes(body)
+
+        self._send_json(status, data)
+
+    def _match_path(self, screenshot: Path) -> tuple[HTTPStatus, dict[str, Any]]:
+        """Match a screenshot file."""
+        if not screenshot.is_file():
+            return HTTPStatus.NOT_FOUND, {"error": f"File not found: {screenshot}"}
+
+        return self._match(screenshot)
+
+    def _match_bytes(self, body: bytes) -> tuple[HTTPStatus, dict[str, Any]]:
+        """Match an encoded screenshot sent in the request body."""
+        try:
+            screen = utils.load_screenshot(body)
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+
+        return self._match(screen)
+
+    def _match(self, screenshot: utils.ScreenshotSource) -> tuple[HTTPStatus, dict[str, Any]]:
+        """Match a screenshot with a Matcher from the pool."""
+        t_start = time.perf_counter()
+
+        try:
+            with self.pool.acquire() as matcher:
+                result = matcher.find_item(screenshot)
+                timings = dict(matcher.timings)
+                counts = dict(matcher.counts)
+        except PoolExhaustedError:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "All matchers are busy"}
+        except BaseUMError as e:
+            return HTTPStatus.UNPROCESSABLE_ENTITY, {
+                "error": e.__class__.__name__,
+                "message": str(e),
+            }
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Unexpected error during matching")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                "error": e.__class__.__name__,
+                "message": str(e),
+            }
+
+        return HTTPStatus.OK, {
+            **result.as_dict(),
+            "elapsed": time.perf_counter() - t_start,
+            "timings": timings,
+            "counts": counts,
+        }
+
+
+class MatchHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server on localhost."""
+
+    daemon_threads = True
+
+    def __init__(self, pool: MatcherPool, port: int = DEFAULT_PORT) -> None:
+        self.pool = pool
+        super().__init__(("127.0.0.1", port), MatchRequestHandler)
+
+
+if sys.platform != "win32":
+
+    class MatchUnixServer(socketserver.ThreadingUnixStreamServer):
+        """Threaded HTTP server on a Unix socket."""
+
+        daemon_threads = True
+
+        def __init__(self, pool: MatcherPool, socket_path: Path) -> None:
+            self.pool = pool
+
+            # Remove a stale socket from the previous run
+            socket_path.unlink(missing_ok=True)
+
+            super().__init__(str(socket_path), MatchRequestHandler)
+
+
+def serve(
+    *,
+    workers: int = 1,
+    port: int | None = DEFAULT_PORT,
+    socket_path: Path | None = None,
+) -> None:
+    """Run the matching service until interrupted."""
+    pool = MatcherPool(workers)
+    servers: list[socketserver.BaseServer] = []
+
+    if port is not None:
+        http_server = MatchHTTPServer(pool, port)
+        logger.info("Listening on http://127.0.0.1:{}", http_server.server_address[1])
+        servers.append(http_server)
+
+    if socket_path is not None:
+        if sys.platform == "win32":
+            msg = "Unix sockets are not supported on Windows"
+            raise ValueError(msg)
+
+        servers.append(MatchUnixServer(pool, socket_path))
+        logger.info("Listening on unix:{}", socket_path)
+
+    threads = [threading.Thread(target=server.serve_forever, daemon=True) for server in servers]
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)